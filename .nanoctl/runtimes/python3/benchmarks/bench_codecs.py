@@ -0,0 +1,53 @@
+import argparse
+import json
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+from util import message_manager
+from benchmarks.fixtures import CONTEXTS
+
+def candidates() -> List[Tuple[str, Callable[[Any], Any], Callable[[Any], Any]]]:
+    # stdlib json is always measured so the accelerated backend has a reference
+    result = [("json", json.dumps, json.loads)]
+    if message_manager.json_backend != "json":
+        result.append((message_manager.json_backend, message_manager.json_dumps, message_manager.json_loads))
+    for message_type in ("MSGPACK", "CBOR"):
+        if message_type in message_manager.codecs:
+            codec = message_manager.codecs[message_type]
+            result.append((message_type.lower(), codec.encode, codec.decode))
+    return result
+
+def measure(fn: Callable[[], Any], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+def run(number: int) -> List[Dict[str, Any]]:
+    results = []
+    for size, factory in CONTEXTS.items():
+        context = factory()
+        for name, encode, decode in candidates():
+            payload = encode(context)
+            results.append({
+                "context": size,
+                "codec": name,
+                "bytes": len(payload),
+                "encode_us": measure(lambda: encode(context), number) * 1e6,
+                "decode_us": measure(lambda: decode(payload), number) * 1e6,
+            })
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare message codecs on workflow context payloads")
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.number)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'context':<8} {'codec':<8} {'bytes':>10} {'encode us':>12} {'decode us':>12}")
+    for row in results:
+        print(f"{row['context']:<8} {row['codec']:<8} {row['bytes']:>10} {row['encode_us']:>12.1f} {row['decode_us']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from benchmarks.fixtures import sales_data
+from nodes.generate_pdf.document import render_report
+
+ROWS = (10, 1000, 100000)
+
+def render(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    data = b"".join(render_report("Top Films by Revenue", rows))
+    return {"bytes": len(data), "render_ms": (time.perf_counter() - start) * 1e3}
+
+def stream(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Chunks are dropped as they arrive, like a gRPC stream would hand them over
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_chunk = None
+    chunks = 0
+    for _ in render_report("Top Films by Revenue", rows):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        chunks += 1
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"chunks": chunks, "first_chunk_ms": first_chunk * 1e3, "stream_peak_kb": peak / 1024}
+
+def run(sizes: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        rows = sales_data(size)
+        results.append({"rows": size, **render(rows), **stream(rows)})
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure generate-pdf rendering for small to very large reports")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROWS))
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.rows)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'rows':>8} {'bytes':>12} {'render ms':>12} {'chunks':>8} {'first chunk ms':>15} {'stream peak KiB':>16}")
+    for row in results:
+        print(f"{row['rows']:>8} {row['bytes']:>12} {row['render_ms']:>12.1f} {row['chunks']:>8} {row['first_chunk_ms']:>15.2f} {row['stream_peak_kb']:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from typing import Any, Dict, List
+
+# Context payloads shaped like the ones the workflow runner sends to ExecuteNode
+
+def _request(method: str = "GET", body: Any = None) -> Dict[str, Any]:
+    return {
+        "method": method,
+        "url": "/",
+        "path": "/",
+        "params": {"function": "", "id": ""},
+        "query": {},
+        "headers": {
+            "host": "localhost:4000",
+            "user-agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)",
+            "accept": "application/json",
+            "accept-encoding": "gzip, deflate, br",
+            "connection": "keep-alive",
+        },
+        "body": body if body is not None else {},
+    }
+
+def _env(size: int = 40) -> Dict[str, str]:
+    env = {
+        "PROJECT_NAME": "trigger-http-server",
+        "PROJECT_VERSION": "0.0.1",
+        "PORT": "4000",
+        "WORKFLOWS_PATH": "/usr/src/app/workflows",
+        "NODES_PATH": "/usr/src/app/src/nodes",
+        "CONSOLE_LOG_ACTIVE": "true",
+        "APP_NAME": "nanoservice-http",
+    }
+    for index in range(size):
+        env[f"SETTING_{index}"] = f"value-{index}-" + "x" * 24
+    return env
+
+def _context(workflow: str, inputs: Dict[str, Any], request: Dict[str, Any], data: Any) -> Dict[str, Any]:
+    return {
+        "id": "8b1f2f3e-0c3a-4a8e-9f0e-3d1f6e5b9c21",
+        "workflow_name": workflow,
+        "workflow_path": f"/usr/src/app/workflows/json/{workflow}.json",
+        "request": request,
+        "response": {"data": data, "error": None, "success": True, "contentType": "application/json"},
+        "error": {"message": "", "code": 0, "json": None, "stack": None, "name": None},
+        "logger": {},
+        "config": inputs,
+        "func": {},
+        "vars": {},
+        "env": _env(),
+    }
+
+def sales_data(rows: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "product": f"Film title number {index}",
+            "quantity": index % 37 + 1,
+            "price": round(0.99 + (index % 7), 2),
+            "total": round((index % 37 + 1) * (0.99 + (index % 7)), 2),
+            "rental_month": "2005-07-01T00:00:00.000Z",
+        }
+        for index in range(rows)
+    ]
+
+def api_call_context() -> Dict[str, Any]:
+    inputs = {
+        "url": "https://countriesnow.space/api/v0.1/countries/capital",
+        "method": "GET",
+        "headers": {"Content-Type": "application/json"},
+        "responseType": "application/json",
+    }
+    return _context("World Countries", inputs, _request(), {})
+
+def sentiment_context() -> Dict[str, Any]:
+    body = {
+        "id": "42",
+        "title": "Great service",
+        "comment": "The support team answered quickly and solved the issue, thanks! " * 4,
+        "sentiment": "",
+        "createdAt": "2025-03-12T10:15:00.000Z",
+    }
+    inputs = {key: "${" + key + "}" for key in body}
+    return _context("feedback", inputs, _request("POST", body), body)
+
+def pdf_context(rows: int = 1000) -> Dict[str, Any]:
+    inputs = {"title": "Top Films by Revenue", "sales_data": "js/ctx.response.data"}
+    return _context("rentals-pdf", inputs, _request(), sales_data(rows))
+
+def huge_context(rows: int = 20000) -> Dict[str, Any]:
+    return pdf_context(rows)
+
+def placeholder_template(count: int = 50) -> str:
+    # Data lookups mixed with expressions, like long mapped URLs or message bodies
+    parts = []
+    for index in range(count):
+        if index % 5 == 0:
+            parts.append("${ctx.workflow_name}")
+        else:
+            parts.append("${field_" + str(index) + "}")
+    return "/api/" + "/".join(parts) + "?trace=${ctx.id}"
+
+def placeholder_data(count: int = 50) -> Dict[str, Any]:
+    return {f"field_{index}": f"value-{index}" for index in range(count)}
+
+def deep_config(depth: int = 6, width: int = 3) -> Dict[str, Any]:
+    if depth == 0:
+        return {"static": "unchanged", "mapped": "${field_1}", "mixed": "id-${field_2}-${field_3}"}
+    node: Dict[str, Any] = {f"child_{index}": deep_config(depth - 1, width) for index in range(width)}
+    node["label"] = "level-" + str(depth)
+    return node
+
+CONTEXTS = {
+    "small": api_call_context,
+    "medium": sentiment_context,
+    "large": pdf_context,
+}
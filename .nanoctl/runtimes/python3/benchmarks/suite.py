@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import gen.node_pb2 as node_pb2
+from benchmarks import fixtures
+from core.node_base import NodeBase
+from core.util.mapper import Mapper
+from nodes.generate_pdf.node import GeneratePDF
+from nodes.sentiment.node import Sentiment
+from runner import Runner
+from util.message_manager import decode_message, encode_message, encode_payload, encode_sections, json_loads
+from util.session_cache import SessionCache, diff
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+BENCH_THRESHOLD = float(os.getenv("BENCH_THRESHOLD", "0.3"))
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "9"))
+# Measured in every run, throughput is compared relative to it so baselines
+# recorded on one machine still hold on a faster or slower one
+REFERENCE_CASE = "reference[pure python]"
+
+Case = Callable[[], Callable[[], Any]]
+
+def copy_tree(value: Any) -> Any:
+    # replace_object_strings mutates its input, every run needs a fresh tree
+    if isinstance(value, dict):
+        return {key: copy_tree(item) for key, item in value.items()}
+    return value
+
+def context_of(factory: Callable[[], Dict[str, Any]]):
+    return Runner.create_context(factory())
+
+def mapper_replace_string() -> Callable[[], Any]:
+    mapper = Mapper()
+    ctx = context_of(fixtures.sentiment_context)
+    template = fixtures.placeholder_template()
+    data = fixtures.placeholder_data()
+    return lambda: mapper.replace_string(template, ctx, data)
+
+def mapper_replace_object_strings() -> Callable[[], Any]:
+    mapper = Mapper()
+    ctx = context_of(fixtures.sentiment_context)
+    config = fixtures.deep_config()
+    data = fixtures.placeholder_data()
+    return lambda: mapper.replace_object_strings(copy_tree(config), ctx, data)
+
+def blueprint_resolve() -> Callable[[], Any]:
+    node = Sentiment()
+    node.name = "deep-config"
+    ctx = context_of(fixtures.sentiment_context)
+    config = fixtures.deep_config()
+    data = fixtures.placeholder_data()
+    return lambda: NodeBase.resolveBlueprint(node, ctx, config, data)
+
+def decode(factory: Callable[[], Dict[str, Any]]) -> Case:
+    def case() -> Callable[[], Any]:
+        request = node_pb2.NodeRequest(Name="bench", Payload=encode_payload(factory(), "JSON"), Encoding="RAW", Type="JSON")
+        return lambda: decode_message(request)
+    return case
+
+def encode(factory: Callable[[], Dict[str, Any]]) -> Case:
+    def case() -> Callable[[], Any]:
+        message = factory()
+        return lambda: encode_message(message, "JSON")
+    return case
+
+def validate_sentiment() -> Callable[[], Any]:
+    node = Sentiment()
+    inputs = fixtures.sentiment_context()["request"]["body"]
+    return lambda: node.validate(inputs, node.input_schema)
+
+def validate_pdf() -> Callable[[], Any]:
+    node = GeneratePDF()
+    inputs = {"title": "Top Films by Revenue", "sales_data": fixtures.sales_data(1000)}
+    return lambda: node.validate(inputs, node.input_schema)
+
+def create_context(factory: Callable[[], Dict[str, Any]]) -> Case:
+    def case() -> Callable[[], Any]:
+        message = factory()
+        return lambda: Runner.create_context(message)
+    return case
+
+def decode_to_context(factory: Callable[[], Dict[str, Any]]) -> Case:
+    # Decoding plus context creation, the baseline of the lazy sections case
+    def case() -> Callable[[], Any]:
+        request = node_pb2.NodeRequest(Name="bench", Payload=encode_payload(factory(), "JSON"), Encoding="RAW", Type="JSON")
+        return lambda: Runner.create_context(decode_message(request))
+    return case
+
+def decode_lazy(factory: Callable[[], Dict[str, Any]]) -> Case:
+    # Decoding plus context creation with the large sections sent apart and never read
+    def case() -> Callable[[], Any]:
+        rest, sections = encode_sections(factory(), "JSON")
+        request = node_pb2.NodeRequest(Name="bench", Payload=encode_payload(rest, "JSON"), Encoding="RAW", Type="JSON", Sections=sections)
+        return lambda: Runner.create_context(decode_message(request), request.Sections, json_loads)
+    return case
+
+def decode_delta(factory: Callable[[], Dict[str, Any]]) -> Case:
+    # A later step of the same run: only config changed since the cached version
+    def case() -> Callable[[], Any]:
+        cache = SessionCache()
+        base = factory()
+        cache.resolve(base["id"], 1, 0, base)
+        delta, removed = diff(base, {**base, "config": {"title": "Next step"}})
+        request = node_pb2.NodeRequest(Name="bench", Payload=encode_payload(delta, "JSON"), Encoding="RAW", Type="JSON")
+        return lambda: cache.resolve(base["id"], 1, 1, decode_message(request), removed)[0]
+    return case
+
+def reference() -> Callable[[], Any]:
+    # Plain interpreter work that none of the runtime code affects
+    words = [f"word{index % 97}" for index in range(2000)]
+    return lambda: sorted({word: len(word) for word in words}.items())
+
+CASES: Dict[str, Case] = {
+    REFERENCE_CASE: reference,
+    "mapper.replace_string[50 placeholders]": mapper_replace_string,
+    "mapper.replace_object_strings[deep]": mapper_replace_object_strings,
+    "blueprint.resolve[deep]": blueprint_resolve,
+    "message.decode[small]": decode(fixtures.api_call_context),
+    "message.decode[medium]": decode(fixtures.sentiment_context),
+    "message.decode[huge]": decode(fixtures.huge_context),
+    "message.decode[huge, session delta]": decode_delta(fixtures.huge_context),
+    "message.encode[small]": encode(fixtures.api_call_context),
+    "message.encode[medium]": encode(fixtures.sentiment_context),
+    "message.encode[huge]": encode(fixtures.huge_context),
+    "nanoservice.validate[sentiment]": validate_sentiment,
+    "nanoservice.validate[pdf 1000 rows]": validate_pdf,
+    "runner.create_context[small]": create_context(fixtures.api_call_context),
+    "runner.create_context[huge]": create_context(fixtures.huge_context),
+    "message.decode_to_context[huge]": decode_to_context(fixtures.huge_context),
+    "message.decode_to_context[huge, lazy sections]": decode_lazy(fixtures.huge_context),
+}
+
+def timings(fn: Callable[[], Any], repeat: int) -> List[float]:
+    # Seconds per call of each repeat
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+
+def allocated(fn: Callable[[], Any]) -> float:
+    # Peak memory allocated by a single call, on top of what was already live
+    tracemalloc.start()
+    try:
+        fn()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - current) / 1024
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    # The median is compared against the baseline, a single lucky or unlucky repeat doesn't move it
+    return {"ops_per_sec": 1 / statistics.median(timings(fn, repeat)), "alloc_kb": allocated(fn)}
+
+def run_cases(names: List[str], repeat: int = BENCH_REPEAT) -> Dict[str, Dict[str, float]]:
+    # The reference is timed before and after the cases so the scale reflects the
+    # host during the whole run, not one moment of it
+    reference = CASES[REFERENCE_CASE]()
+    samples = timings(reference, repeat)
+    results = {REFERENCE_CASE: {}}
+    for name in names:
+        if name != REFERENCE_CASE:
+            results[name] = measure(CASES[name](), repeat)
+    samples += timings(reference, repeat)
+    results[REFERENCE_CASE] = {"ops_per_sec": 1 / statistics.median(samples), "alloc_kb": allocated(reference)}
+    return results
+
+def run(pattern: str = "", repeat: int = BENCH_REPEAT) -> Dict[str, Dict[str, float]]:
+    return run_cases([name for name in CASES if pattern in name], repeat)
+
+def median_results(rounds: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    # Per case median of several full runs, used for baselines so one noisy run isn't recorded
+    return {
+        name: {metric: statistics.median(result[name][metric] for result in rounds) for metric in rounds[0][name]}
+        for name in rounds[0]
+    }
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baselines: Dict[str, Dict[str, float]],
+    threshold: float,
+    check_alloc: bool = True,
+) -> List[Tuple[str, str, float, float]]:
+    # Slower throughput or more allocation than the baseline allows are both regressions.
+    # The baseline throughput is scaled by how fast the reference case ran on this host.
+    scale = 1.0
+    if REFERENCE_CASE in results and REFERENCE_CASE in baselines:
+        scale = results[REFERENCE_CASE]["ops_per_sec"] / baselines[REFERENCE_CASE]["ops_per_sec"]
+
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None or name == REFERENCE_CASE:
+            continue
+        expected = baseline["ops_per_sec"] * scale
+        if result["ops_per_sec"] < expected * (1 - threshold):
+            regressions.append((name, "ops_per_sec", result["ops_per_sec"], expected))
+        if check_alloc and result["alloc_kb"] > baseline["alloc_kb"] * (1 + threshold) + 1:
+            regressions.append((name, "alloc_kb", result["alloc_kb"], baseline["alloc_kb"]))
+    return regressions
+
+def current_platform() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": platform.machine()}
+
+def same_platform(document: Dict[str, Any]) -> bool:
+    # Allocation sizes change between Python minor versions, not between hosts
+    python = lambda version: ".".join(str(version).split(".")[:2])
+    current = current_platform()
+    return python(document.get("python")) == python(current["python"]) and document.get("machine") == current["machine"]
+
+def load_document(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"cases": {}}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def load_baselines(path: str) -> Dict[str, Dict[str, float]]:
+    return load_document(path)["cases"]
+
+def save_baselines(path: str, results: Dict[str, Dict[str, float]]) -> None:
+    cases = load_baselines(path)
+    cases.update(results)
+    document = {**current_platform(), "cases": cases}
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the runtime hot paths")
+    parser.add_argument("-k", "--pattern", default="", help="only run cases containing this text")
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEAT)
+    parser.add_argument("--rounds", type=int, default=1, help="run the suite this many times and keep the median")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baselines")
+    parser.add_argument("--check", action="store_true", help="fail when a case regressed past the threshold")
+    parser.add_argument("--threshold", type=float, default=BENCH_THRESHOLD)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = median_results([run(args.pattern, args.repeat) for _ in range(max(1, args.rounds))])
+    document = load_document(args.baselines)
+    baselines = document["cases"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'case':<48} {'ops/sec':>14} {'baseline':>14} {'change':>8} {'alloc KiB':>10}")
+        for name, result in results.items():
+            baseline = baselines.get(name)
+            if baseline:
+                change = f"{(result['ops_per_sec'] / baseline['ops_per_sec'] - 1) * 100:+.1f}%"
+                reference = f"{baseline['ops_per_sec']:.1f}"
+            else:
+                change, reference = "-", "-"
+            print(f"{name:<48} {result['ops_per_sec']:>14.1f} {reference:>14} {change:>8} {result['alloc_kb']:>10.1f}")
+        if REFERENCE_CASE in results and REFERENCE_CASE in baselines:
+            speed = results[REFERENCE_CASE]["ops_per_sec"] / baselines[REFERENCE_CASE]["ops_per_sec"]
+            print(f"This host runs the reference case at {speed:.2f}x the baseline speed, --check scales the baselines by it")
+
+    if args.save:
+        save_baselines(args.baselines, results)
+        print(f"Baselines written to {args.baselines}")
+
+    if args.check:
+        check_alloc = not baselines or same_platform(document)
+        if not check_alloc:
+            print(
+                f"WARNING baselines were recorded with Python {document.get('python')} on {document.get('machine')}, "
+                f"this is Python {platform.python_version()} on {platform.machine()}: allocations are not checked"
+            )
+        regressions = compare(results, baselines, args.threshold, check_alloc)
+        if regressions:
+            # A busy host can slow a case for a moment, only cases that regress again are reported
+            retry = run_cases(sorted({name for name, *_ in regressions}), args.repeat)
+            confirmed = compare(retry, baselines, args.threshold, check_alloc)
+            regressions = [regression for regression in regressions if regression[:2] in {found[:2] for found in confirmed}]
+        for name, metric, value, baseline in regressions:
+            print(f"REGRESSION {name}: {metric} {value:.1f} vs baseline {baseline:.1f} (threshold {args.threshold:.0%})")
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from core.util.metrics import registry
+
+NODE_MAX_CONCURRENCY = int(os.getenv("NODE_MAX_CONCURRENCY", "0"))
+NODE_MAX_QUEUE = int(os.getenv("NODE_MAX_QUEUE", "100"))
+NODE_QUEUE_TIMEOUT_MS = float(os.getenv("NODE_QUEUE_TIMEOUT_MS", "1000"))
+# Per node overrides: {"generate-pdf": {"max_concurrency": 2, "max_queue": 10, "queue_timeout_ms": 5000}}
+NODE_LIMITS = os.getenv("NODE_LIMITS", "")
+
+active_gauge = registry.gauge("node_admission_active", "Executions currently running", ("node",))
+queue_gauge = registry.gauge("node_admission_queue_depth", "Executions waiting for a slot", ("node",))
+queue_wait_histogram = registry.histogram("node_admission_queue_wait_seconds", "Time spent waiting for a slot", ("node",))
+rejected_counter = registry.counter("node_admission_rejected_total", "Executions rejected by admission control", ("node", "reason"))
+
+class AdmissionRejected(Exception):
+    def __init__(self, node: str, reason: str):
+        Exception.__init__(self, f"Node {node} is overloaded ({reason}), try again later")
+        self.node = node
+        self.reason = reason
+
+class NodeLimits:
+    __slots__ = ("max_concurrency", "max_queue", "queue_timeout_ms")
+
+    def __init__(self, max_concurrency: int = NODE_MAX_CONCURRENCY, max_queue: int = NODE_MAX_QUEUE, queue_timeout_ms: float = NODE_QUEUE_TIMEOUT_MS):
+        # max_concurrency 0 leaves the node unlimited
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_ms = queue_timeout_ms
+
+class NodeLimiter:
+    def __init__(self, node: str, limits: NodeLimits):
+        self.node = node
+        self.limits = limits
+        self.active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    async def acquire(self) -> None:
+        limits = self.limits
+        if limits.max_concurrency <= 0 or (self.active < limits.max_concurrency and not self._waiters):
+            self.active += 1
+            active_gauge.inc(self.node)
+            return
+
+        if len(self._waiters) >= limits.max_queue:
+            rejected_counter.inc(self.node, "queue_full")
+            raise AdmissionRejected(self.node, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queue_gauge.inc(self.node)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, limits.queue_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            rejected_counter.inc(self.node, "timeout")
+            raise AdmissionRejected(self.node, "timeout")
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before the caller went away
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                queue_gauge.dec(self.node)
+            queue_wait_histogram.observe(time.perf_counter() - start, self.node)
+
+    def release(self) -> None:
+        # The slot goes straight to the oldest waiter, active stays the same
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            queue_gauge.dec(self.node)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self.active -= 1
+        active_gauge.dec(self.node)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrency": self.limits.max_concurrency,
+            "max_queue": self.limits.max_queue,
+        }
+
+def parse_limits(value: str) -> Dict[str, NodeLimits]:
+    if not value:
+        return {}
+
+    limits = {}
+    for node, options in json.loads(value).items():
+        limits[node] = NodeLimits(
+            int(options.get("max_concurrency", NODE_MAX_CONCURRENCY)),
+            int(options.get("max_queue", NODE_MAX_QUEUE)),
+            float(options.get("queue_timeout_ms", NODE_QUEUE_TIMEOUT_MS)),
+        )
+    return limits
+
+class AdmissionControl:
+    def __init__(self, default: Optional[NodeLimits] = None, limits: Optional[Dict[str, NodeLimits]] = None):
+        self.default = default or NodeLimits()
+        self.limits = parse_limits(NODE_LIMITS) if limits is None else limits
+        self._limiters: Dict[str, NodeLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, node: str) -> NodeLimiter:
+        limiter = self._limiters.get(node)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(node)
+                if limiter is None:
+                    limiter = self._limiters[node] = NodeLimiter(node, self.limits.get(node, self.default))
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, node: str) -> AsyncIterator[None]:
+        limiter = self.limiter(node)
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {node: limiter.stats() for node, limiter in self._limiters.items()}
+
+admission = AdmissionControl()
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from core.types.context import Context
+from core.util.metrics import SIZE_BUCKETS, registry
+
+# Batching is opt-in, a node or the deployment raises the size above 1 to enable it.
+# Every invocation of a batch then waits up to NODE_BATCH_MAX_WAIT_MS for the others.
+NODE_BATCH_MAX_SIZE = int(os.getenv("NODE_BATCH_MAX_SIZE", "1"))
+NODE_BATCH_MAX_WAIT_MS = float(os.getenv("NODE_BATCH_MAX_WAIT_MS", "5"))
+
+batch_size_histogram = registry.histogram("node_batch_size", "Invocations per handle_batch call", ("node",), SIZE_BUCKETS)
+queue_wait_histogram = registry.histogram("node_batch_queue_wait_seconds", "Time an invocation waited for its batch", ("node",))
+
+BatchHandler = Callable[[List[Context], List[Dict[str, Any]]], Awaitable[List[Any]]]
+PendingItem = Tuple[Context, Dict[str, Any], "asyncio.Future[Any]", float]
+
+class MicroBatcher:
+    def __init__(self, name: str, handler: BatchHandler, max_size: int = NODE_BATCH_MAX_SIZE, max_wait_ms: float = NODE_BATCH_MAX_WAIT_MS):
+        self.name = name
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: List[PendingItem] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks, running batches are held here
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def submit(self, ctx: Context, inputs: Dict[str, Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((ctx, inputs, future, time.perf_counter()))
+
+        # A batch leaves when it is full or when its oldest item waited max_wait
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self.run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def run(self, batch: List[PendingItem]) -> None:
+        now = time.perf_counter()
+        for item in batch:
+            queue_wait_histogram.observe(now - item[3], self.name)
+        batch_size_histogram.observe(len(batch), self.name)
+
+        try:
+            results = await self.handler([item[0] for item in batch], [item[1] for item in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"handle_batch of {self.name} returned {len(results)} results for {len(batch)} inputs")
+        except Exception as error:
+            for item in batch:
+                if not item[2].done():
+                    item[2].set_exception(error)
+            return
+        except BaseException:
+            # Cancelled, e.g. at shutdown, the callers are cancelled too instead of waiting forever
+            for item in batch:
+                item[2].cancel()
+            raise
+
+        # Scatter the results back, callers that went away are skipped
+        for item, result in zip(batch, results):
+            if not item[2].done():
+                item[2].set_result(result)
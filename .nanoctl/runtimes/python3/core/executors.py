@@ -0,0 +1,168 @@
+import asyncio
+import concurrent.futures
+import copy
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+from core.types.context import Context
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+EXECUTION_MODES = (INLINE, THREAD, PROCESS)
+
+CPU_COUNT = os.cpu_count() or 1
+NODE_THREAD_POOL_SIZE = int(os.getenv("NODE_THREAD_POOL_SIZE", str(min(32, CPU_COUNT + 4))))
+NODE_PROCESS_POOL_SIZE = int(os.getenv("NODE_PROCESS_POOL_SIZE", str(CPU_COUNT)))
+# Items a thread may produce ahead of the consumer of stream()
+NODE_STREAM_QUEUE_SIZE = int(os.getenv("NODE_STREAM_QUEUE_SIZE", "8"))
+NODE_PROCESS_START_METHOD = os.getenv("NODE_PROCESS_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# Worker side state, one node instance and one event loop per worker thread or process
+_worker = threading.local()
+
+def worker_loop() -> asyncio.AbstractEventLoop:
+    loop = getattr(_worker, "loop", None)
+    if loop is None:
+        loop = _worker.loop = asyncio.new_event_loop()
+    return loop
+
+def worker_node(node_class: type, name: Optional[str], node_id: Optional[str]) -> Any:
+    nodes: Dict[type, Any] = getattr(_worker, "nodes", None)
+    if nodes is None:
+        nodes = _worker.nodes = {}
+
+    node = nodes.get(node_class)
+    if node is None:
+        node = nodes[node_class] = node_class()
+    node.name = name
+    node.node = node_id
+    return node
+
+def warm_worker(modules: Tuple[str, ...]) -> None:
+    # Import node modules up front so the first request doesn't pay for it
+    for module in modules:
+        __import__(module)
+    worker_loop()
+
+def run_in_worker(node_class: type, name: Optional[str], node_id: Optional[str], method: str, args: Tuple[Any, ...]) -> Any:
+    node = worker_node(node_class, name, node_id)
+    return worker_loop().run_until_complete(getattr(node, method)(*args))
+
+def run_in_thread(node: Any, method: str, args: Tuple[Any, ...]) -> Any:
+    return worker_loop().run_until_complete(getattr(node, method)(*args))
+
+def portable(arg: Any) -> Any:
+    # The logger holds sockets or handlers and stays in the parent process
+    if isinstance(arg, Context):
+        arg = copy.copy(arg)
+        arg.logger = None
+    elif isinstance(arg, list):
+        arg = [portable(item) for item in arg]
+    return arg
+
+class ExecutorPool:
+    def __init__(self, thread_workers: int = NODE_THREAD_POOL_SIZE, process_workers: int = NODE_PROCESS_POOL_SIZE, start_method: str = NODE_PROCESS_START_METHOD):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.start_method = start_method
+        self.warm_modules: Tuple[str, ...] = ()
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="nano-node")
+            return self._threads
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=warm_worker,
+                    initargs=(self.warm_modules,),
+                )
+            return self._processes
+
+    def start(self, node_modules: Tuple[str, ...] = ()) -> None:
+        # Spawning up front keeps the worker start cost out of the first requests
+        self.warm_modules = node_modules
+        pool = self.process_pool()
+        for _ in range(self.process_workers):
+            pool.submit(os.getpid)
+
+    async def run(self, mode: str, node: Any, method: str, *args: Any) -> Any:
+        if mode == INLINE:
+            return await getattr(node, method)(*args)
+
+        loop = asyncio.get_running_loop()
+        if mode == THREAD:
+            return await loop.run_in_executor(self.thread_pool(), run_in_thread, node, method, args)
+        if mode == PROCESS:
+            # Only the node class travels, inputs and results must be picklable
+            args = tuple(portable(arg) for arg in args)
+            return await loop.run_in_executor(self.process_pool(), run_in_worker, type(node), node.name, node.node, method, args)
+
+        raise ValueError(f"Unsupported execution mode: {mode}")
+
+    async def stream(self, produce: Callable[..., Iterable[Any]], *args: Any) -> AsyncIterator[Any]:
+        # Iterates a blocking generator on the thread pool, the items come back through a
+        # bounded queue so the event loop only relays them and a slow consumer holds the
+        # producer back. Leaving the loop early stops the producer after its current item.
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[bool, Any]]" = asyncio.Queue(NODE_STREAM_QUEUE_SIZE)
+        stopped = threading.Event()
+
+        def put(done: bool, item: Any) -> bool:
+            future = asyncio.run_coroutine_threadsafe(queue.put((done, item)), loop)
+            while not stopped.is_set():
+                try:
+                    future.result(0.1)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    continue
+            future.cancel()
+            return False
+
+        def run() -> None:
+            try:
+                for item in produce(*args):
+                    if not put(False, item):
+                        return
+            except BaseException as error:
+                put(True, error)
+            else:
+                put(True, None)
+
+        producer = loop.run_in_executor(self.thread_pool(), run)
+        try:
+            while True:
+                done, item = await queue.get()
+                if done:
+                    if item is not None:
+                        raise item
+                    break
+                yield item
+        finally:
+            stopped.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.shield(producer)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        if threads is not None:
+            threads.shutdown(wait=wait)
+        if processes is not None:
+            processes.shutdown(wait=wait, cancel_futures=True)
+
+# Owned by the server lifecycle, started and shut down in serve()
+executors = ExecutorPool()
@@ -1,25 +1,40 @@
 from abc import abstractmethod
-from typing import Any, Dict, List, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from jsonschema import Draft7Validator, ValidationError # type: ignore
-from copy import deepcopy
 import time
-import logging
 from core.types.context import Context
 from core.types.response import ResponseContext
 from core.types.nanoservice_response import NanoServiceResponse
 from core.node_base import NodeBase
+from core.util.validation import ValidationPolicy, validator_cache
+from core.executors import INLINE, executors
+from core.batching import NODE_BATCH_MAX_SIZE, NODE_BATCH_MAX_WAIT_MS, MicroBatcher
+from core.util.metrics import observe_phase
+from core.util.logger import logger
 
 class NanoService(NodeBase):
+    # Optional async generator variant of handle, yields the output in chunks
+    handle_stream: Optional[Callable[['Context', Dict[str, Any]], AsyncIterator[Union[bytes, str]]]] = None
+    # Optional, one response per input in the same order, used once batch_max_size is above 1
+    handle_batch: Optional[Callable[[List['Context'], List[Dict[str, Any]]], Awaitable[List[NanoServiceResponse]]]] = None
+
     def __init__(self):
         NodeBase.__init__(self)
         self.input_schema: Any = {}
         self.output_schema: Any = {}
-        self.validator = Draft7Validator(self.input_schema)
+        self.validation_mode: Optional[str] = None
+        self.validation_sample_rate: Optional[int] = None
+        self._validators: Dict[str, Tuple[Any, Draft7Validator]] = {}
+        self._validation_policy: Optional[ValidationPolicy] = None
+        self.streamType = "BINARY"
+        self.batch_max_size: int = NODE_BATCH_MAX_SIZE
+        self.batch_max_wait_ms: float = NODE_BATCH_MAX_WAIT_MS
+        self._batcher: Optional[MicroBatcher] = None
+        self.execution_mode: str = INLINE
 
     def setSchemas(self, input_schema: Any, output_schema: Any) -> None:
         self.input_schema = input_schema
         self.output_schema = output_schema
-        self.validator = Draft7Validator(self.input_schema)
 
     def getSchemas(self) -> Dict[str, Any]:
         return {
@@ -34,20 +49,31 @@ class NanoService(NodeBase):
         response.error = None
 
         start = time.time()
-        logging.info(f"Running node: {self.name} [{ctx.config}]")
+        node = self.node or self.name
+        logger.debug("Running node", id=ctx.id, node=node, config=ctx.config)
+
+        phase = time.perf_counter()
+        config = self.resolveConfig(ctx)
+        phase = observe_phase(node, "blueprint", phase)
 
-        config = deepcopy(ctx.config)
-        data = ctx.response.get('data') or ctx.request.get('body')
+        policy = self.getValidationPolicy()
+        if policy.validate_input():
+            self.validate(config, self.input_schema)
+            phase = observe_phase(node, "input_validation", phase)
 
-        config = self.blueprintMapper(config, ctx, data)
-        self.validate(config, self.input_schema)
+        # Process node custom logic, batching nodes share one handle_batch call
+        if self.supportsBatch() and self.batch_max_size > 1:
+            result = await self.getBatcher().submit(ctx, config)
+        else:
+            result = await self.dispatch("handle", ctx, config)
+        phase = observe_phase(node, "handle", phase)
 
-        # Process node custom logic
-        result = await self.handle(ctx, config)
-        self.validator.validate(result, self.output_schema)
+        if policy.validate_output():
+            self.validate(result, self.output_schema)
+            observe_phase(node, "output_validation", phase)
         end = time.time()
 
-        logging.info(f"Executed node: {self.name} in {(end - start) * 1000:.2f}ms")
+        logger.info("Executed node", id=ctx.id, node=node, duration_ms=round((end - start) * 1000, 2))
 
         if result.error is not None:
             response.error = result.error.to_dict()
@@ -57,15 +83,82 @@ class NanoService(NodeBase):
 
         return response
 
+    async def run_stream(self, ctx: Context) -> AsyncIterator[Any]:
+        if not self.supportsStream():
+            async for chunk in NodeBase.run_stream(self, ctx):
+                yield chunk
+            return
+
+        start = time.time()
+        node = self.node or self.name
+        logger.debug("Streaming node", id=ctx.id, node=node)
+
+        config = self.resolveConfig(ctx)
+
+        if self.getValidationPolicy().validate_input():
+            self.validate(config, self.input_schema)
+
+        # Output is not validated, it is never held in memory as a whole
+        async for chunk in self.handle_stream(ctx, config):
+            yield chunk
+
+        end = time.time()
+        logger.info("Streamed node", id=ctx.id, node=node, duration_ms=round((end - start) * 1000, 2))
+
+    def supportsStream(self) -> bool:
+        return self.handle_stream is not None
+
+    def supportsBatch(self) -> bool:
+        return self.handle_batch is not None
+
+    def getBatcher(self) -> MicroBatcher:
+        # One batcher per node definition, every bound copy submits to it
+        definition = self.definition
+        if definition._batcher is None:
+            handler = lambda ctx_list, inputs_list: definition.dispatch("handle_batch", ctx_list, inputs_list)
+            definition._batcher = MicroBatcher(self.node or self.name, handler, self.batch_max_size, self.batch_max_wait_ms)
+        return definition._batcher
+
+    async def dispatch(self, method: str, *args: Any) -> Any:
+        # CPU bound or blocking nodes run off the event loop (execution_mode thread or process)
+        return await executors.run(self.execution_mode, self, method, *args)
+
     def validate(self, obj: Dict[str, Any], schema: Any) -> None:
-        try:
-            self.validator.validate(obj, schema)
-        except ValidationError as e:
-            errors: List[str] = []
-            for error in sorted(self.validator.evolve(schema=schema).iter_errors(obj), key=str):
-                errors.append(f"{error.path} {error.message}")
-
-            raise ValidationError(", ".join(errors)) from e
+        # An empty schema accepts everything, skip the validator entirely
+        if isinstance(schema, dict) and not schema:
+            return
+
+        validator = self.getValidator(schema)
+        if validator.is_valid(obj):
+            return
+
+        errors: List[str] = []
+        for error in sorted(validator.iter_errors(obj), key=str):
+            errors.append(f"{error.path} {error.message}")
+
+        raise ValidationError(", ".join(errors))
+
+    def getValidator(self, schema: Any) -> Draft7Validator:
+        if schema is self.input_schema:
+            kind = "input"
+        elif schema is self.output_schema:
+            kind = "output"
+        else:
+            return validator_cache.get(schema)
+
+        # Avoid hashing the schema on every call while it is still the same object
+        cached = self._validators.get(kind)
+        if cached is None or cached[0] is not schema:
+            cached = (schema, validator_cache.get(schema))
+            self._validators[kind] = cached
+
+        return cached[1]
+
+    def getValidationPolicy(self) -> ValidationPolicy:
+        definition = self.definition
+        if definition._validation_policy is None:
+            definition._validation_policy = ValidationPolicy(self.validation_mode, self.validation_sample_rate)
+        return definition._validation_policy
 
     @abstractmethod
     async def handle(self, ctx: 'Context', inputs: Dict[str, Any]) -> Union[NanoServiceResponse, List['NanoService[Dict[str, Any]]']]:
@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Union
+from copy import deepcopy
+from typing import Any, AsyncIterator, Dict, Union
 from core.types.context import Context
 from core.types.config import ConfigContext
 from core.types.response import ResponseContext
 from core.util.mapper import Mapper
+from core.util.blueprint import plan_cache
+from core.util.logger import logger
 from core.types.error import ErrorContext
 from core.types.global_error import GlobalError
 
@@ -19,6 +22,23 @@ class NodeBase(ABC):
         self.stop = False
         self.originalConfig: Dict[str, Any] = {}
         self.set_var = False
+        self.resolvedConfig: Any = None
+        # Bound copies point back to the shared node they were made from
+        self.definition: 'NodeBase' = self
+
+    def bind(self, config: Dict[str, Any]) -> 'NodeBase':
+        # Per-invocation state lives on a shallow copy, schemas, validators and
+        # pooled resources stay shared with the definition, the singleton is never mutated
+        node = object.__new__(type(self))
+        node.__dict__.update(self.__dict__)
+        node.node = config.get('node')
+        node.name = config.get('name')
+        node.active = config.get('active', True)
+        node.stop = config.get('stop', False)
+        node.set_var = config.get('set_var', False)
+        node.originalConfig = config
+        node.resolvedConfig = None
+        return node
 
     async def process(self, ctx: Context) -> ResponseContext:
         response: ResponseContext = ResponseContext()
@@ -26,8 +46,7 @@ class NodeBase(ABC):
         response.data = None
         response.error = None
 
-        self.originalConfig = ctx.config.copy()
-        ctx.config = self.blueprintMapper(ctx.config, ctx)
+        self.resolveConfig(ctx)
 
         response = await self.run(ctx)
         if response.error is not None:
@@ -36,6 +55,12 @@ class NodeBase(ABC):
         ctx.response = response
 
         return response
+
+    async def process_stream(self, ctx: Context) -> AsyncIterator[Any]:
+        self.resolveConfig(ctx)
+
+        async for chunk in self.run_stream(ctx):
+            yield chunk
     
     def blueprintMapper(self, obj: Dict[str, Any], ctx: Context, data: Dict[str, Any] = None) -> Dict[str, Any]:
         new_obj: Dict[str, Any] = obj
@@ -46,14 +71,49 @@ class NodeBase(ABC):
             else:
                 mapper.replace_object_strings(new_obj, ctx, data)
         except Exception as e:
-            print("MAPPER ERROR", e)
+            logger.error("Mapper could not resolve config", id=getattr(ctx, "id", None), node=self.node or self.name, error=e)
 
         return new_obj
 
+    def resolveConfig(self, ctx: Context) -> Dict[str, Any]:
+        # ctx.config is resolved once per invocation, run reuses what process resolved
+        if ctx.config is not self.resolvedConfig:
+            self.originalConfig = ctx.config
+            self.resolvedConfig = self.resolveBlueprint(ctx, ctx.config, self.getInputData(ctx))
+            ctx.config = self.resolvedConfig
+        return self.resolvedConfig
+
+    def getInputData(self, ctx: Context) -> Any:
+        # Output of the previous step, or the request body for the first one
+        response = ctx.response if isinstance(ctx.response, dict) else {}
+        request = ctx.request if isinstance(ctx.request, dict) else {}
+        return response.get('data') or request.get('body')
+
+    def resolveBlueprint(self, ctx: Context, config: Dict[str, Any], data: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Resolves the config without mutating it, static branches are shared with the input
+        if not isinstance(config, dict):
+            return self.blueprintMapper(deepcopy(config), ctx, data)
+
+        try:
+            plan = plan_cache.plan(getattr(ctx, 'workflow_name', ''), self.name, config)
+            return plan.resolve(config, ctx, data, mapper)
+        except Exception as e:
+            logger.error("Mapper could not resolve config", id=getattr(ctx, "id", None), node=self.node or self.name, error=e)
+
+        return config
+
     @abstractmethod
     async def run(self, ctx: Context) -> ResponseContext:
         pass
 
+    async def run_stream(self, ctx: Context) -> AsyncIterator[Any]:
+        # Nodes without incremental output produce their whole result as one item
+        response = await self.run(ctx)
+        if response.error is not None:
+            raise Exception(response.error)
+
+        yield response.data
+
     def runJs(self, str: str, ctx: Context, data: Dict[str, Any] = {}, func: Dict[str, Any] = {}, vars: Dict[str, Any] = {}) -> Dict[str, Any]:
         return eval(f"lambda ctx, data, func, vars: ({str})")(ctx, data, func, vars)
 
@@ -0,0 +1,154 @@
+import asyncio
+import cProfile
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Optional, Sequence
+from core.executors import executors
+from core.util.logger import logger
+from core.util.metrics import registry
+
+CPROFILE = "cprofile"
+SAMPLING = "sampling"
+PROFILE_MODES = (CPROFILE, SAMPLING)
+PROFILE_METADATA_KEY = "x-nano-profile"
+
+PROFILE_MODE = os.getenv("PROFILE_MODE", CPROFILE)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "nano-profiles"))
+# Nodes profiled without being asked through metadata, comma separated or *
+PROFILE_NODES = os.getenv("PROFILE_NODES", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1"))
+PROFILE_MAX_PER_MINUTE = int(os.getenv("PROFILE_MAX_PER_MINUTE", "6"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+profiles_counter = registry.counter("node_profiles_total", "Profiles written", ("node", "mode"))
+skipped_counter = registry.counter("node_profiles_skipped_total", "Profiles skipped by the rate limit", ("node",))
+
+class SamplingProfiler:
+    # Samples the stack of one thread from a background thread and counts the
+    # collapsed stacks, the output feeds flamegraph.pl or speedscope directly
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.sample, name="nano-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+class Profiler:
+    def __init__(
+        self,
+        mode: str = PROFILE_MODE,
+        directory: str = PROFILE_DIR,
+        nodes: Sequence[str] = tuple(name.strip() for name in PROFILE_NODES.split(",") if name.strip()),
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        max_per_minute: int = PROFILE_MAX_PER_MINUTE,
+    ):
+        self.mode = mode if mode in PROFILE_MODES else CPROFILE
+        self.directory = directory
+        self.nodes = set(nodes)
+        self.sample_rate = sample_rate
+        self.max_per_minute = max_per_minute
+        self._recent: Deque[float] = deque()
+        self._active = False
+        self._lock = threading.Lock()
+
+    def select(self, node: str, requested: Optional[str] = None) -> Optional[str]:
+        # requested comes from the x-nano-profile metadata: 1, true, cprofile or sampling
+        if requested:
+            mode = requested if requested in PROFILE_MODES else self.mode
+        elif ("*" in self.nodes or node in self.nodes) and random.random() < self.sample_rate:
+            mode = self.mode
+        else:
+            return None
+
+        if not self.acquire():
+            skipped_counter.inc(node)
+            return None
+        return mode
+
+    def acquire(self) -> bool:
+        # One profile at a time and at most max_per_minute of them
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self._active or len(self._recent) >= self.max_per_minute:
+                return False
+            self._recent.append(now)
+            self._active = True
+            return True
+
+    def path(self, node: str, mode: str) -> str:
+        extension = "pstats" if mode == CPROFILE else "collapsed"
+        name = "".join(char if char.isalnum() or char in "-_" else "_" for char in node)
+        return os.path.join(self.directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.monotonic_ns()}.{extension}")
+
+    def save(self, path: str, write: Callable[[str], None]) -> bool:
+        # Runs on the thread pool, a profile that can't be written never fails the node
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write(path)
+            return True
+        except OSError as error:
+            logger.warning("Profile could not be written", path=path, error=error)
+            return False
+
+    @asynccontextmanager
+    async def profile(self, node: str, mode: Optional[str]) -> AsyncIterator[Optional[str]]:
+        # Everything the event loop runs meanwhile is captured too, nodes in
+        # process mode have to be profiled with their own worker
+        if mode is None:
+            yield None
+            return
+
+        try:
+            path = self.path(node, mode)
+            if mode == CPROFILE:
+                recorder = cProfile.Profile()
+                recorder.enable()
+                stop, write = recorder.disable, recorder.dump_stats
+            else:
+                sampler = SamplingProfiler(threading.get_ident())
+                sampler.start()
+                stop, write = sampler.stop, sampler.write
+
+            try:
+                yield path
+            finally:
+                stop()
+                loop = asyncio.get_running_loop()
+                if await loop.run_in_executor(executors.thread_pool(), self.save, path, write):
+                    profiles_counter.inc(node, mode)
+        finally:
+            with self._lock:
+                self._active = False
+
+profiler = Profiler()
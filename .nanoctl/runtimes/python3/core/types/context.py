@@ -1,18 +1,59 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional
 from core.types.response import ResponseContext
 from core.types.error import ErrorContext
 from core.types.config import ConfigContext
 
+# Sections the caller can send on their own, they stay raw bytes until read
+LAZY_SECTIONS = ("request", "response", "error", "vars", "env")
+
+class RawSection:
+    __slots__ = ("data", "decode")
+
+    def __init__(self, data: bytes, decode: Callable[[bytes], Any]):
+        self.data = data
+        self.decode = decode
+
+def section(slot: str) -> property:
+    def get(self: "Context") -> Any:
+        value = getattr(self, slot)
+        if type(value) is RawSection:
+            value = value.decode(value.data)
+            setattr(self, slot, value)
+        return value
+
+    def set(self: "Context", value: Any) -> None:
+        setattr(self, slot, value)
+
+    return property(get, set)
+
 class Context:
+    # __dict__ is kept for nodes that attach their own attributes, it is only
+    # allocated when one does
+    __slots__ = ("id", "workflow_name", "workflow_path", "logger", "config", "func", "_request", "_response", "_error", "_vars", "_env", "__dict__")
+
     def __init__(self):
         self.id: str = ""
         self.workflow_name: str = ""
         self.workflow_path: str = ""
-        self.request: Dict[str, Any] = {}
-        self.response: ResponseContext = {}
-        self.error: ErrorContext = {}
+        self._request: Dict[str, Any] = {}
+        self._response: ResponseContext = {}
+        self._error: ErrorContext = {}
         self.logger: Optional[Any] = None
         self.config: Dict[str, Any] = {}
         self.func: Dict[str, Any] = {}
-        self.vars: Dict[str, Any] = {}
-        self.env: Dict[str, Any] = {}
\ No newline at end of file
+        self._vars: Dict[str, Any] = {}
+        self._env: Dict[str, Any] = {}
+
+    request = section("_request")
+    response = section("_response")
+    error = section("_error")
+    vars = section("_vars")
+    env = section("_env")
+
+    def setRawSection(self, name: str, data: bytes, decode: Callable[[bytes], Any]) -> None:
+        setattr(self, f"_{name}", RawSection(data, decode))
+
+    def getRawSection(self, name: str) -> Optional[bytes]:
+        # The bytes as received while the section has not been read, None afterwards
+        value = getattr(self, f"_{name}")
+        return value.data if type(value) is RawSection else None
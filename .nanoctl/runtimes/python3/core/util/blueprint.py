@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Hashable, Optional
+from core.util.lru import LRUCache
+from core.util.mapper import JS_PREFIX, PLACEHOLDER_REGEX, Mapper
+
+PLAN_CACHE_SIZE = int(os.getenv("BLUEPRINT_PLAN_CACHE_SIZE", "512"))
+
+# Nested dict of the keys that lead to dynamic leaves, a leaf is marked with None
+PlanTree = Dict[str, Optional["PlanTree"]]
+
+def is_dynamic(value: str) -> bool:
+    return value.startswith(JS_PREFIX) or PLACEHOLDER_REGEX.search(value) is not None
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    encoded = json.dumps(config, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+class BlueprintPlan:
+    __slots__ = ("tree",)
+
+    def __init__(self, config: Dict[str, Any]):
+        self.tree: PlanTree = self.analyze(config)
+
+    def analyze(self, obj: Dict[str, Any]) -> PlanTree:
+        tree: PlanTree = {}
+        for key, value in obj.items():
+            if isinstance(value, str):
+                if is_dynamic(value):
+                    tree[key] = None
+            elif isinstance(value, dict):
+                subtree = self.analyze(value)
+                if subtree:
+                    tree[key] = subtree
+        return tree
+
+    def is_static(self) -> bool:
+        return not self.tree
+
+    def resolve(self, config: Dict[str, Any], ctx: Any, data: Dict[str, Any], mapper: Mapper) -> Dict[str, Any]:
+        if not self.tree:
+            return config
+        return self._resolve(config, self.tree, ctx, data, mapper)
+
+    def _resolve(self, obj: Dict[str, Any], tree: PlanTree, ctx: Any, data: Dict[str, Any], mapper: Mapper) -> Dict[str, Any]:
+        # Only the dicts on the way to a dynamic leaf are copied, everything else is shared
+        new_obj = obj.copy()
+        for key, subtree in tree.items():
+            if subtree is None:
+                new_obj[key] = mapper.replace_string(obj[key], ctx, data)
+            else:
+                new_obj[key] = self._resolve(obj[key], subtree, ctx, data, mapper)
+        return new_obj
+
+class PlanCache:
+    def __init__(self, maxsize: int = PLAN_CACHE_SIZE):
+        self.plans = LRUCache(maxsize)
+
+    def plan(self, workflow_name: Hashable, step_name: Hashable, config: Dict[str, Any]) -> BlueprintPlan:
+        # One plan per step, a step whose config changed replaces its own plan
+        # instead of pushing the plans of other steps out of the cache. NodeBase
+        # resolves a config once per invocation, so this runs once per request.
+        key = (workflow_name, step_name)
+        fingerprint = config_fingerprint(config)
+        entry = self.plans.get(key)
+        if entry is None or entry[0] != fingerprint:
+            entry = (fingerprint, BlueprintPlan(config))
+            self.plans.set(key, entry)
+        return entry[1]
+
+    def clear(self) -> None:
+        self.plans.clear()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return self.plans.stats()
+
+plan_cache = PlanCache()
@@ -0,0 +1,258 @@
+import base64
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, TextIO, Tuple
+from core.types.logger import LoggerContext
+from core.util.metrics import registry
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Share of records kept per level, the levels not listed keep everything: DEBUG=0.01,INFO=0.1
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# At most LOG_ERROR_BURST identical warnings or errors per LOG_ERROR_WINDOW seconds
+LOG_ERROR_BURST = int(os.getenv("LOG_ERROR_BURST", "10"))
+LOG_ERROR_WINDOW = float(os.getenv("LOG_ERROR_WINDOW", "60"))
+
+ROOT_LOGGER = "nanoservice"
+RESERVED = ("ts", "level", "logger", "msg")
+
+dropped_counter = registry.counter("log_records_dropped_total", "Log records dropped before being written", ("reason",))
+
+def parse_sample_rates(value: str) -> Dict[int, float]:
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            level, rate = item.split("=", 1)
+            rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+class Sampler(logging.Filter):
+    # Runs in the calling thread before a record is queued, so dropped records
+    # are never formatted. Repeated warnings and errors are limited per call
+    # site, the next record let through reports how many were suppressed.
+    def __init__(
+        self,
+        rates: Optional[Dict[int, float]] = None,
+        burst: int = LOG_ERROR_BURST,
+        window: float = LOG_ERROR_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        logging.Filter.__init__(self)
+        self.rates = parse_sample_rates(LOG_SAMPLE_RATES) if rates is None else rates
+        self.burst = burst
+        self.window = window
+        self.clock = clock
+        self._seen: Dict[Tuple[Any, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            dropped_counter.inc("sampled")
+            return False
+
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = self.clock()
+        with self._lock:
+            # [window start, records let through, records suppressed]
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state is not None else 0
+                self._seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = int(suppressed)
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+
+        dropped_counter.inc("rate_limited")
+        return False
+
+class JsonFormatter(logging.Formatter):
+    # One JSON document per line, the fields of the record become top level keys
+    def format(self, record: logging.LogRecord) -> str:
+        document: Dict[str, Any] = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            document[key if key not in RESERVED else f"field_{key}"] = value
+        if getattr(record, "suppressed", 0):
+            document["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document["exc"] = record.exc_text
+        return json.dumps(document, default=str)
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = dict(getattr(record, "fields", {}))
+        if getattr(record, "suppressed", 0):
+            fields["suppressed"] = record.suppressed
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    # The stdlib handler formats the message before queueing it, this one leaves
+    # msg and args to the listener thread. Only tracebacks are rendered here,
+    # their frames change once the caller moves on.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Logging never blocks a request, a full queue drops the record
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_counter.inc("queue_full")
+
+class LogListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Waits for room instead of failing when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+class LogPipeline:
+    def __init__(
+        self,
+        level: str = LOG_LEVEL,
+        log_format: str = LOG_FORMAT,
+        queue_size: int = LOG_QUEUE_SIZE,
+        stream: Optional[TextIO] = None,
+        sampler: Optional[Sampler] = None,
+    ):
+        self.level = level
+        self.log_format = log_format
+        self.queue_size = queue_size
+        self.stream = stream
+        self.sampler = sampler
+        self.queue: Optional["queue.Queue[logging.LogRecord]"] = None
+        self._handler: Optional[LazyQueueHandler] = None
+        self._listener: Optional[LogListener] = None
+
+    def start(self) -> None:
+        if self._listener is not None:
+            return
+
+        writer = logging.StreamHandler(self.stream or sys.stdout)
+        writer.setFormatter(TextFormatter() if self.log_format == "text" else JsonFormatter())
+
+        self.queue = queue.Queue(self.queue_size)
+        self._handler = LazyQueueHandler(self.queue)
+        self._handler.addFilter(self.sampler or Sampler())
+        self._listener = LogListener(self.queue, writer)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(self.level)
+        root.addHandler(self._handler)
+        root.propagate = False
+        self._listener.start()
+
+    def stop(self) -> None:
+        # Writes out everything still queued before returning
+        if self._listener is None:
+            return
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.removeHandler(self._handler)
+        root.propagate = True
+        self._listener.stop()
+        self._listener = None
+        self._handler = None
+
+class Logger(LoggerContext):
+    # Structured logger, fields (id, node...) are attached to each record and
+    # the message is only formatted by the writer thread. keep > 0 also holds
+    # the last records in memory for getLogs.
+    def __init__(self, name: str = ROOT_LOGGER, fields: Optional[Dict[str, Any]] = None, keep: int = 0):
+        self.name = name
+        self.fields = fields or {}
+        self.keep = keep
+        self._logger = logging.getLogger(name)
+        self._records: Deque[logging.LogRecord] = deque(maxlen=keep or None)
+
+    def bind(self, **fields: Any) -> "Logger":
+        return Logger(self.name, {**self.fields, **fields}, self.keep)
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def write(self, level: int, message: str, args: Tuple[Any, ...], fields: Dict[str, Any], exc_info: Any = None) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+
+        record = self._logger.makeRecord(self.name, level, "(unknown file)", 0, message, args, exc_info)
+        record.fields = {**self.fields, **fields} if self.fields else fields
+        # The call site identifies repeated errors for the rate limit
+        frame = sys._getframe(2)
+        record.pathname = frame.f_code.co_filename
+        record.lineno = frame.f_lineno
+        record.funcName = frame.f_code.co_name
+
+        if self.keep:
+            self._records.append(record)
+        self._logger.handle(record)
+
+    def debug(self, message: str, *args: Any, **fields: Any) -> None:
+        self.write(logging.DEBUG, message, args, fields)
+
+    def info(self, message: str, *args: Any, **fields: Any) -> None:
+        self.write(logging.INFO, message, args, fields)
+
+    def warning(self, message: str, *args: Any, **fields: Any) -> None:
+        self.write(logging.WARNING, message, args, fields)
+
+    def exception(self, message: str, *args: Any, **fields: Any) -> None:
+        self.write(logging.ERROR, message, args, fields, sys.exc_info())
+
+    def log(self, message: str, *args: Any, **fields: Any) -> None:
+        self.write(logging.INFO, message, args, fields)
+
+    def logLevel(self, level: str, message: str, *args: Any, **fields: Any) -> None:
+        levelno = logging.getLevelName(level.upper())
+        self.write(levelno if isinstance(levelno, int) else logging.INFO, message, args, fields)
+
+    def error(self, message: str, stack: Optional[str] = None, **fields: Any) -> None:
+        if stack:
+            fields["stack"] = stack
+        self.write(logging.ERROR, message, (), fields)
+
+    def getLogs(self) -> List[str]:
+        return [f"{record.levelname} {record.getMessage()}" for record in self._records]
+
+    def getLogsAsText(self) -> str:
+        return "\n".join(self.getLogs())
+
+    def getLogsAsBase64(self) -> str:
+        return base64.b64encode(self.getLogsAsText().encode("utf-8")).decode("ascii")
+
+logger = Logger()
+log_pipeline = LogPipeline()
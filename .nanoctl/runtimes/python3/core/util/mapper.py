@@ -1,12 +1,77 @@
+import os
 import re
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional
+from core.util.lru import LRUCache
+from core.util.logger import logger
 
 ParamsDictionary = Dict[str, Any]
 Context = Dict[str, Any]
 FunctionContext = Dict[str, Any]
 VarsContext = Dict[str, Any]
+Expression = Callable[[Context, ParamsDictionary, FunctionContext, VarsContext], Any]
+
+PLACEHOLDER_REGEX = re.compile(r'\${(.*?)}')
+JS_PREFIX = "js/"
+CACHE_SIZE = int(os.getenv("MAPPER_CACHE_SIZE", "2048"))
+
+def compile_expression(str_: str) -> Expression:
+    try:
+        return eval(compile(f"lambda ctx, data, func, vars: {str_}", "<mapper>", "eval"))
+    except SyntaxError as error:
+        # Cache the failure too, so a broken expression is not re-parsed on every call
+        args = error.args
+        def raise_error(ctx: Context, data: ParamsDictionary, func: FunctionContext, vars: VarsContext) -> Any:
+            raise SyntaxError(*args)
+        return raise_error
+
+class CompiledTemplate:
+    __slots__ = ("text", "literals", "keys", "expressions", "is_static", "is_js")
+
+    def __init__(self, text: str, expressions: List[Expression]):
+        parts = PLACEHOLDER_REGEX.split(text)
+        self.text = text
+        self.literals: List[str] = parts[0::2]
+        self.keys: List[str] = parts[1::2]
+        self.expressions = expressions
+        self.is_static = len(self.keys) == 0
+        self.is_js = text.startswith(JS_PREFIX)
+
+class TemplateCache:
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.templates = LRUCache(maxsize)
+        self.expressions = LRUCache(maxsize)
+
+    def template(self, text: str) -> CompiledTemplate:
+        template = self.templates.get(text)
+        if template is None:
+            keys = PLACEHOLDER_REGEX.findall(text)
+            template = CompiledTemplate(text, [self.expression(key) for key in keys])
+            self.templates.set(text, template)
+        return template
+
+    def expression(self, str_: str) -> Expression:
+        fn = self.expressions.get(str_)
+        if fn is None:
+            fn = compile_expression(str_)
+            self.expressions.set(str_, fn)
+        return fn
+
+    def clear(self) -> None:
+        self.templates.clear()
+        self.expressions.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Optional[int]]]:
+        return {
+            "templates": self.templates.stats(),
+            "expressions": self.expressions.stats(),
+        }
+
+template_cache = TemplateCache()
 
 class Mapper:
+    def __init__(self, cache: Optional[TemplateCache] = None):
+        self.cache = cache or template_cache
+
     def replace_object_strings(self, obj: ParamsDictionary, ctx: Context, data: ParamsDictionary) -> None:
         for key, value in obj.items():
             if isinstance(value, str):
@@ -15,30 +80,42 @@ class Mapper:
                 self.replace_object_strings(value, ctx, data)
 
     def replace_string(self, str_data: str, ctx: Context, data: ParamsDictionary) -> str:
-        str_ = str_data
-        regex = re.compile(r'\${(.*?)}')
-        matches = regex.findall(str_)
-
-        if matches:
-            for match in matches:
-                try:
-                    key = match
-                    value = data.get(key) or self.run_js(key, ctx, data)
-                    str_ = str_.replace(f"${{{match}}}", str(value))
-                except Exception as e:
-                    print("Mapper Error 1", e)
+        template = self.cache.template(str_data)
+        if template.is_static:
+            if not template.is_js:
+                return str_data
+            return str(self.js_mapper(str_data, ctx, data))
 
+        str_ = self.render(template, ctx, data)
         result = self.js_mapper(str_, ctx, data)
         return str(result)
 
+    def render(self, template: CompiledTemplate, ctx: Context, data: ParamsDictionary) -> str:
+        literals = template.literals
+        parts: List[str] = [literals[0]]
+
+        for index, key in enumerate(template.keys):
+            try:
+                value = data.get(key) or template.expressions[index](ctx, data, {}, {})
+                parts.append(str(value))
+            except Exception as e:
+                logger.warning("Mapper could not resolve placeholder", id=getattr(ctx, "id", None), placeholder=key, error=e)
+                parts.append(f"${{{key}}}")
+            parts.append(literals[index + 1])
+
+        return "".join(parts)
+
     def run_js(self, str_: str, ctx: Context, data: ParamsDictionary = {}, func: FunctionContext = {}, vars: VarsContext = {}) -> ParamsDictionary:
-        return eval(f"lambda ctx, data, func, vars: {str_}")(ctx, data, func, vars)
+        return self.cache.expression(str_)(ctx, data, func, vars)
 
     def js_mapper(self, str_: str, ctx: Context, data: ParamsDictionary) -> ParamsDictionary | str:
         try:
-            if isinstance(str_, str) and str_.startswith("js/"):
-                fn = str_.replace("js/", "")
+            if isinstance(str_, str) and str_.startswith(JS_PREFIX):
+                fn = str_.replace(JS_PREFIX, "")
                 return self.run_js(fn, ctx, data, ctx.get('func', {}), ctx.get('vars', {}))
         except Exception as error:
-            print("Mapper Error 2", error)
+            logger.warning("Mapper could not evaluate expression", id=getattr(ctx, "id", None), expression=str_, error=error)
         return str_
+
+    def cache_stats(self) -> Dict[str, Dict[str, Optional[int]]]:
+        return self.cache.stats()
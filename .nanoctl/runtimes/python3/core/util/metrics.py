@@ -0,0 +1,171 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Phase timings are only recorded when something can scrape them
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true" if METRICS_PORT else "false").lower() == "true"
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._lock = threading.Lock()
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        Metric.__init__(self, name, description, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self.values.get(label_values, 0.0)
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        Metric.__init__(self, name, description, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self.values[label_values] = value
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def value(self, *label_values: str) -> float:
+        return self.values.get(label_values, 0.0)
+
+class HistogramValue:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        # One slot per bucket plus the +Inf bucket, counts are not cumulative
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        Metric.__init__(self, name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[LabelValues, HistogramValue] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.values.get(label_values)
+            if histogram is None:
+                histogram = self.values[label_values] = HistogramValue(len(self.buckets))
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def value(self, *label_values: str) -> HistogramValue:
+        return self.values.get(label_values) or HistogramValue(len(self.buckets))
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, description, labels)
+
+    def gauge(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, description, labels, buckets=buckets)
+
+    def _register(self, cls: type, name: str, description: str, labels: Tuple[str, ...], **options: Any) -> Metric:
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, labels, **options)
+                self.metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def collect(self) -> List[Metric]:
+        return list(self.metrics.values())
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def render_prometheus(metrics: MetricsRegistry) -> str:
+    # Prometheus text exposition format 0.0.4
+    lines: List[str] = []
+    for metric in sorted(metrics.collect(), key=lambda metric: metric.name):
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        with metric._lock:
+            items = sorted(metric.values.items())
+        for label_values, value in items:
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), value.counts):
+                    cumulative += count
+                    le = 'le="' + format_value(bound) + '"'
+                    lines.append(f"{metric.name}_bucket{format_labels(metric.labels, label_values, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{format_labels(metric.labels, label_values)} {format_value(value.sum)}")
+                lines.append(f"{metric.name}_count{format_labels(metric.labels, label_values)} {value.count}")
+            else:
+                lines.append(f"{metric.name}{format_labels(metric.labels, label_values)} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+phase_histogram = registry.histogram("node_phase_seconds", "Time spent per execution phase", ("node", "phase"))
+errors_counter = registry.counter("node_errors_total", "Failed executions", ("node",))
+payload_bytes_counter = registry.counter("node_payload_bytes_total", "Request and response payload bytes", ("node", "direction"))
+
+def observe_phase(node: str, phase: str, start: float) -> float:
+    # Returns the end time so consecutive phases can be chained
+    now = time.perf_counter()
+    if METRICS_ENABLED:
+        phase_histogram.observe(now - start, node, phase)
+    return now
+
+def observe_bytes(node: str, direction: str, size: int) -> None:
+    if METRICS_ENABLED:
+        payload_bytes_counter.inc(node, direction, amount=size)
+
+def observe_error(node: str) -> None:
+    if METRICS_ENABLED:
+        errors_counter.inc(node)
@@ -0,0 +1,59 @@
+import itertools
+import json
+import os
+from typing import Any, Dict, Optional
+from jsonschema import Draft7Validator # type: ignore
+from core.util.lru import LRUCache
+
+FULL = "full"
+SAMPLED = "sampled"
+INPUT_ONLY = "input-only"
+OFF = "off"
+VALIDATION_MODES = (FULL, SAMPLED, INPUT_ONLY, OFF)
+
+VALIDATION_MODE = os.getenv("VALIDATION_MODE", FULL)
+VALIDATION_SAMPLE_RATE = int(os.getenv("VALIDATION_SAMPLE_RATE", "100"))
+VALIDATOR_CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", "256"))
+
+def schema_key(schema: Any) -> str:
+    return json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+
+class ValidatorCache:
+    def __init__(self, maxsize: int = VALIDATOR_CACHE_SIZE):
+        self.validators = LRUCache(maxsize)
+
+    def get(self, schema: Any) -> Draft7Validator:
+        key = schema_key(schema)
+        validator = self.validators.get(key)
+        if validator is None:
+            validator = Draft7Validator(schema)
+            self.validators.set(key, validator)
+        return validator
+
+    def clear(self) -> None:
+        self.validators.clear()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return self.validators.stats()
+
+# Shared by every node instance of the process
+validator_cache = ValidatorCache()
+
+class ValidationPolicy:
+    def __init__(self, mode: Optional[str] = None, sample_rate: Optional[int] = None):
+        self.mode = mode or VALIDATION_MODE
+        if self.mode not in VALIDATION_MODES:
+            raise ValueError(f"Unsupported validation mode: {self.mode}")
+
+        self.sample_rate = max(1, sample_rate or VALIDATION_SAMPLE_RATE)
+        self._counter = itertools.count()
+
+    def validate_input(self) -> bool:
+        return self.mode != OFF
+
+    def validate_output(self) -> bool:
+        if self.mode == FULL:
+            return True
+        if self.mode == SAMPLED:
+            return next(self._counter) % self.sample_rate == 0
+        return False
@@ -24,21 +24,35 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nnode.proto\x12\x17nanoservice.workflow.v1\"L\n\x0bNodeRequest\x12\x0c\n\x04Name\x18\x01 \x01(\t\x12\x0f\n\x07Message\x18\x02 \x01(\t\x12\x10\n\x08\x45ncoding\x18\x03 \x01(\t\x12\x0c\n\x04Type\x18\x04 \x01(\t\"?\n\x0cNodeResponse\x12\x0f\n\x07Message\x18\x01 \x01(\t\x12\x10\n\x08\x45ncoding\x18\x02 \x01(\t\x12\x0c\n\x04Type\x18\x03 \x01(\t*)\n\x0fMessageEncoding\x12\n\n\x06\x42\x41SE64\x10\x00\x12\n\n\x06STRING\x10\x01*@\n\x0bMessageType\x12\x08\n\x04TEXT\x10\x00\x12\x08\n\x04JSON\x10\x01\x12\x07\n\x03XML\x10\x02\x12\x08\n\x04HTML\x10\x03\x12\n\n\x06\x42INARY\x10\x04\x32k\n\x0bNodeService\x12\\\n\x0b\x45xecuteNode\x12$.nanoservice.workflow.v1.NodeRequest\x1a%.nanoservice.workflow.v1.NodeResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\nnode.proto\x12\x17nanoservice.workflow.v1\"\xa0\x02\n\x0bNodeRequest\x12\x0c\n\x04Name\x18\x01 \x01(\t\x12\x0f\n\x07Message\x18\x02 \x01(\t\x12\x10\n\x08\x45ncoding\x18\x03 \x01(\t\x12\x0c\n\x04Type\x18\x04 \x01(\t\x12\x0f\n\x07Payload\x18\x05 \x01(\x0c\x12\x44\n\x08Sections\x18\x06 \x03(\x0b\x32\x32.nanoservice.workflow.v1.NodeRequest.SectionsEntry\x12\x0f\n\x07Version\x18\x07 \x01(\x04\x12\x13\n\x0b\x42\x61seVersion\x18\x08 \x01(\x04\x12\x0f\n\x07Removed\x18\t \x03(\t\x12\x13\n\x0b\x43ompression\x18\n \x01(\t\x1a/\n\rSectionsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c:\x02\x38\x01\"\xed\x01\n\x0cNodeResponse\x12\x0f\n\x07Message\x18\x01 \x01(\t\x12\x10\n\x08\x45ncoding\x18\x02 \x01(\t\x12\x0c\n\x04Type\x18\x03 \x01(\t\x12\x0f\n\x07Payload\x18\x04 \x01(\x0c\x12\x45\n\x08Sections\x18\x05 \x03(\x0b\x32\x33.nanoservice.workflow.v1.NodeResponse.SectionsEntry\x12\x0e\n\x06Status\x18\x06 \x01(\t\x12\x13\n\x0b\x43ompression\x18\x07 \x01(\t\x1a/\n\rSectionsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c:\x02\x38\x01\"z\n\tNodeChunk\x12\x0c\n\x04\x44\x61ta\x18\x01 \x01(\x0c\x12\x0c\n\x04Last\x18\x02 \x01(\x08\x12\x0f\n\x07Success\x18\x03 \x01(\x08\x12\x0c\n\x04Type\x18\x04 \x01(\t\x12\r\n\x05\x45rror\x18\x05 \x01(\t\x12\x0e\n\x06Status\x18\x06 \x01(\t\x12\x13\n\x0b\x43ompression\x18\x07 \x01(\t\"_\n\x10NodeBatchRequest\x12\x36\n\x08Requests\x18\x01 \x03(\x0b\x32$.nanoservice.workflow.v1.NodeRequest\x12\x13\n\x0bParallelism\x18\x02 \x01(\x05\"M\n\x11NodeBatchResponse\x12\x38\n\tResponses\x18\x01 \x03(\x0b\x32%.nanoservice.workflow.v1.NodeResponse*2\n\x0fMessageEncoding\x12\n\n\x06\x42\x41SE64\x10\x00\x12\n\n\x06STRING\x10\x01\x12\x07\n\x03RAW\x10\x02*W\n\x0bMessageType\x12\x08\n\x04TEXT\x10\x00\x12\x08\n\x04JSON\x10\x01\x12\x07\n\x03XML\x10\x02\x12\x08\n\x04HTML\x10\x03\x12\n\n\x06\x42INARY\x10\x04\x12\x0b\n\x07MSGPACK\x10\x05\x12\x08\n\x04\x43\x42OR\x10\x06\x32\xbb\x02\n\x0bNodeService\x12\\\n\x0b\x45xecuteNode\x12$.nanoservice.workflow.v1.NodeRequest\x1a%.nanoservice.workflow.v1.NodeResponse\"\x00\x12\x61\n\x11\x45xecuteNodeStream\x12$.nanoservice.workflow.v1.NodeRequest\x1a\".nanoservice.workflow.v1.NodeChunk\"\x00\x30\x01\x12k\n\x10\x45xecuteNodeBatch\x12).nanoservice.workflow.v1.NodeBatchRequest\x1a*.nanoservice.workflow.v1.NodeBatchResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'node_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_MESSAGEENCODING']._serialized_start=182
-  _globals['_MESSAGEENCODING']._serialized_end=223
-  _globals['_MESSAGETYPE']._serialized_start=225
-  _globals['_MESSAGETYPE']._serialized_end=289
-  _globals['_NODEREQUEST']._serialized_start=39
-  _globals['_NODEREQUEST']._serialized_end=115
-  _globals['_NODERESPONSE']._serialized_start=117
-  _globals['_NODERESPONSE']._serialized_end=180
-  _globals['_NODESERVICE']._serialized_start=291
-  _globals['_NODESERVICE']._serialized_end=398
+  _globals['_NODEREQUEST_SECTIONSENTRY']._loaded_options = None
+  _globals['_NODEREQUEST_SECTIONSENTRY']._serialized_options = b'8\001'
+  _globals['_NODERESPONSE_SECTIONSENTRY']._loaded_options = None
+  _globals['_NODERESPONSE_SECTIONSENTRY']._serialized_options = b'8\001'
+  _globals['_MESSAGEENCODING']._serialized_start=870
+  _globals['_MESSAGEENCODING']._serialized_end=920
+  _globals['_MESSAGETYPE']._serialized_start=922
+  _globals['_MESSAGETYPE']._serialized_end=1009
+  _globals['_NODEREQUEST']._serialized_start=40
+  _globals['_NODEREQUEST']._serialized_end=328
+  _globals['_NODEREQUEST_SECTIONSENTRY']._serialized_start=281
+  _globals['_NODEREQUEST_SECTIONSENTRY']._serialized_end=328
+  _globals['_NODERESPONSE']._serialized_start=331
+  _globals['_NODERESPONSE']._serialized_end=568
+  _globals['_NODERESPONSE_SECTIONSENTRY']._serialized_start=281
+  _globals['_NODERESPONSE_SECTIONSENTRY']._serialized_end=328
+  _globals['_NODECHUNK']._serialized_start=570
+  _globals['_NODECHUNK']._serialized_end=692
+  _globals['_NODEBATCHREQUEST']._serialized_start=694
+  _globals['_NODEBATCHREQUEST']._serialized_end=789
+  _globals['_NODEBATCHRESPONSE']._serialized_start=791
+  _globals['_NODEBATCHRESPONSE']._serialized_end=868
+  _globals['_NODESERVICE']._serialized_start=1012
+  _globals['_NODESERVICE']._serialized_end=1327
 # @@protoc_insertion_point(module_scope)
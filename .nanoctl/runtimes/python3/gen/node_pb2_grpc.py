@@ -39,6 +39,16 @@ class NodeServiceStub(object):
                 request_serializer=node__pb2.NodeRequest.SerializeToString,
                 response_deserializer=node__pb2.NodeResponse.FromString,
                 _registered_method=True)
+        self.ExecuteNodeStream = channel.unary_stream(
+                '/nanoservice.workflow.v1.NodeService/ExecuteNodeStream',
+                request_serializer=node__pb2.NodeRequest.SerializeToString,
+                response_deserializer=node__pb2.NodeChunk.FromString,
+                _registered_method=True)
+        self.ExecuteNodeBatch = channel.unary_unary(
+                '/nanoservice.workflow.v1.NodeService/ExecuteNodeBatch',
+                request_serializer=node__pb2.NodeBatchRequest.SerializeToString,
+                response_deserializer=node__pb2.NodeBatchResponse.FromString,
+                _registered_method=True)
 
 
 class NodeServiceServicer(object):
@@ -50,6 +60,18 @@ class NodeServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ExecuteNodeStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ExecuteNodeBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_NodeServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +80,16 @@ def add_NodeServiceServicer_to_server(servicer, server):
                     request_deserializer=node__pb2.NodeRequest.FromString,
                     response_serializer=node__pb2.NodeResponse.SerializeToString,
             ),
+            'ExecuteNodeStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.ExecuteNodeStream,
+                    request_deserializer=node__pb2.NodeRequest.FromString,
+                    response_serializer=node__pb2.NodeChunk.SerializeToString,
+            ),
+            'ExecuteNodeBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.ExecuteNodeBatch,
+                    request_deserializer=node__pb2.NodeBatchRequest.FromString,
+                    response_serializer=node__pb2.NodeBatchResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'nanoservice.workflow.v1.NodeService', rpc_method_handlers)
@@ -95,3 +127,57 @@ class NodeService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ExecuteNodeStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/nanoservice.workflow.v1.NodeService/ExecuteNodeStream',
+            node__pb2.NodeRequest.SerializeToString,
+            node__pb2.NodeChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ExecuteNodeBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/nanoservice.workflow.v1.NodeService/ExecuteNodeBatch',
+            node__pb2.NodeBatchRequest.SerializeToString,
+            node__pb2.NodeBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import grpc.aio # type: ignore
+import gen.node_pb2 as node_pb2
+import gen.node_pb2_grpc as node_pb2_grpc
+from util.compression import ACCEPT_ENCODING_METADATA_KEY, decompress
+from util.message_manager import encode_payload, json_loads
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_DIR = os.path.dirname(LOADTEST_DIR)
+PAYLOADS_DIR = os.path.join(LOADTEST_DIR, "payloads")
+RESULTS_DIR = os.path.join(LOADTEST_DIR, "results")
+
+Call = Callable[[], Awaitable[Optional[str]]]
+
+def payload_names() -> List[str]:
+    return sorted(name[:-5] for name in os.listdir(PAYLOADS_DIR) if name.endswith(".json"))
+
+def load_payload(node: str, upstream_url: Optional[str] = None) -> Dict[str, Any]:
+    with open(os.path.join(PAYLOADS_DIR, f"{node}.json"), "r", encoding="utf-8") as file:
+        context = json.load(file)
+
+    # Recorded api_call payloads are pointed at the local upstream, the path is kept
+    url = context.get("config", {}).get("url")
+    if upstream_url and isinstance(url, str) and "://" in url:
+        path = url.split("://", 1)[1].partition("/")[2]
+        context["config"]["url"] = f"{upstream_url}/{path}"
+    return context
+
+def percentile(values: List[float], q: float) -> float:
+    # Nearest rank on sorted values
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Counter = Counter()
+        self.dropped = 0
+
+    def record(self, start: float, error: Optional[str]) -> None:
+        self.latencies.append(time.perf_counter() - start)
+        if error is not None:
+            self.errors[error] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        ms = lambda value: round(value * 1000, 3)
+        return {
+            "requests": requests,
+            "errors": sum(self.errors.values()),
+            "error_kinds": dict(self.errors),
+            "dropped": self.dropped,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": ms(sum(latencies) / requests) if requests else 0.0,
+                "p50": ms(percentile(latencies, 50)),
+                "p95": ms(percentile(latencies, 95)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(latencies[-1]) if latencies else 0.0,
+            },
+        }
+
+async def timed(call: Call, recorder: Recorder, start: float) -> None:
+    try:
+        error = await call()
+    except grpc.aio.AioRpcError as e:
+        error = e.code().name
+    except Exception as e:
+        error = type(e).__name__
+    recorder.record(start, error)
+
+async def closed_loop(call: Call, recorder: Recorder, concurrency: int, duration: float) -> None:
+    # concurrency callers, each sends its next request once the previous answered
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await timed(call, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def open_loop(call: Call, recorder: Recorder, rate: float, duration: float, max_in_flight: int) -> None:
+    # Requests start on a fixed schedule whether or not the server keeps up.
+    # Latency counts from the scheduled time, so queueing in the client is not hidden.
+    begin = time.perf_counter()
+    total = int(rate * duration)
+    in_flight: set = set()
+
+    for index in range(total):
+        scheduled = begin + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            recorder.dropped += 1
+            continue
+        task = asyncio.ensure_future(timed(call, recorder, scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+def execute_call(stub: node_pb2_grpc.NodeServiceStub, request: node_pb2.NodeRequest, accept_encoding: Optional[str] = None) -> Call:
+    metadata = ((ACCEPT_ENCODING_METADATA_KEY, accept_encoding),) if accept_encoding else None
+
+    async def call() -> Optional[str]:
+        response = await stub.ExecuteNode(request, metadata=metadata)
+        # Node failures come back as a JSON error document, not a gRPC status
+        if response.Type == "JSON":
+            payload = decompress(response.Payload, response.Compression) if response.Compression else response.Payload
+            body = json_loads(payload)
+            if isinstance(body, dict) and "stack" in body:
+                return "node_error"
+        return None
+    return call
+
+async def drive(
+    target: str,
+    node: str,
+    context: Dict[str, Any],
+    concurrency: int = 16,
+    rate: float = 0,
+    duration: float = 10,
+    warmup: float = 1,
+    max_in_flight: int = 1000,
+    accept_encoding: Optional[str] = None,
+) -> Dict[str, Any]:
+    request = node_pb2.NodeRequest(Name=node, Payload=encode_payload(context, "JSON"), Encoding="RAW", Type="JSON")
+
+    async with grpc.aio.insecure_channel(target) as channel:
+        await asyncio.wait_for(channel.channel_ready(), 30)
+        call = execute_call(node_pb2_grpc.NodeServiceStub(channel), request, accept_encoding)
+
+        # Warm up connections, caches and lazily loaded nodes without recording
+        if warmup > 0:
+            await closed_loop(call, Recorder(), concurrency, warmup)
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        if rate > 0:
+            await open_loop(call, recorder, rate, duration, max_in_flight)
+        else:
+            await closed_loop(call, recorder, concurrency, duration)
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "node": node,
+        "target": target,
+        "mode": "rate" if rate > 0 else "concurrency",
+        "concurrency": concurrency if rate <= 0 else None,
+        "rate": rate if rate > 0 else None,
+        "request_bytes": len(request.Payload),
+        "accept_encoding": accept_encoding,
+    }
+    result.update(recorder.summary(elapsed))
+    return result
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), 0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Nothing listening on port {port} after {timeout:g}s")
+
+def start_process(args: List[str], port: int, env: Dict[str, str], verbose: bool) -> subprocess.Popen:
+    output = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen([sys.executable, *args], cwd=RUNTIME_DIR, env=env, stdout=output, stderr=output)
+    wait_for_port(port, process)
+    return process
+
+def stop_process(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def compare(result: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+    lines = []
+    for label, current, before in (
+        ("throughput_rps", result["throughput_rps"], previous["throughput_rps"]),
+        ("p50_ms", result["latency_ms"]["p50"], previous["latency_ms"]["p50"]),
+        ("p99_ms", result["latency_ms"]["p99"], previous["latency_ms"]["p99"]),
+    ):
+        change = f"{(current / before - 1) * 100:+.1f}%" if before else "-"
+        lines.append(f"{label:<16} {before:>12.2f} -> {current:>12.2f} {change:>8}")
+    return lines
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test ExecuteNode over a local gRPC channel")
+    parser.add_argument("node", choices=payload_names(), help="recorded payload in loadtest/payloads")
+    parser.add_argument("--target", help="host:port of a running server, by default one is started")
+    parser.add_argument("--concurrency", type=int, default=16, help="callers in flight (closed loop)")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second (open loop), overrides --concurrency")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open loop requests over this are dropped")
+    parser.add_argument("--duration", type=float, default=10, help="seconds measured")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds run before measuring")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=0)
+    parser.add_argument("--upstream-size", type=int, default=2048, help="upstream response body in bytes")
+    parser.add_argument("--accept-encoding", help="compression the client accepts, e.g. gzip or \"deflate;level=1\"")
+    parser.add_argument("--output", help="result file, defaults to loadtest/results/<node>-<time>.json")
+    parser.add_argument("--compare", help="previous result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show server and upstream output")
+    args = parser.parse_args(argv)
+
+    processes: List[subprocess.Popen] = []
+    upstream = None
+    try:
+        upstream_url = None
+        if args.node == "api_call":
+            port = free_port()
+            processes.append(start_process(
+                ["-m", "loadtest.upstream", "--port", str(port), "--latency-ms", str(args.upstream_latency_ms),
+                 "--jitter-ms", str(args.upstream_jitter_ms), "--size", str(args.upstream_size)],
+                port, dict(os.environ), args.verbose,
+            ))
+            upstream_url = f"http://127.0.0.1:{port}"
+            upstream = {"latency_ms": args.upstream_latency_ms, "jitter_ms": args.upstream_jitter_ms, "payload_bytes": args.upstream_size}
+
+        target = args.target
+        if target is None:
+            # The server reads its settings (SERVER_MODE, NODE_LIMITS...) from this environment
+            port = free_port()
+            processes.append(start_process(["server.py"], port, {**os.environ, "SERVER_PORT": str(port)}, args.verbose))
+            target = f"127.0.0.1:{port}"
+
+        context = load_payload(args.node, upstream_url)
+        result = asyncio.run(drive(target, args.node, context, args.concurrency, args.rate, args.duration, args.warmup, args.max_in_flight, args.accept_encoding))
+    finally:
+        for process in reversed(processes):
+            stop_process(process)
+
+    result["upstream"] = upstream
+    result["started_at"] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    result["python"] = platform.python_version()
+    result["cpus"] = os.cpu_count()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.node}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+        file.write("\n")
+
+    latency = result["latency_ms"]
+    print(f"{result['node']}: {result['requests']} requests, {result['errors']} errors, {result['throughput_rps']:.1f} req/s")
+    print(f"latency ms: p50 {latency['p50']:.2f}  p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            for line in compare(result, json.load(file)):
+                print(line)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
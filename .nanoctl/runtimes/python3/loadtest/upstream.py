@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+from typing import Optional
+from aiohttp import web # type: ignore
+
+UPSTREAM_LATENCY_MS = float(os.getenv("UPSTREAM_LATENCY_MS", "20"))
+UPSTREAM_JITTER_MS = float(os.getenv("UPSTREAM_JITTER_MS", "0"))
+UPSTREAM_PAYLOAD_BYTES = int(os.getenv("UPSTREAM_PAYLOAD_BYTES", "2048"))
+
+def payload(size: int) -> bytes:
+    # A JSON document of roughly size bytes, shaped like a list API response
+    items = []
+    length = 2
+    index = 0
+    while length < size:
+        item = {"id": index, "name": f"item-{index}", "value": "x" * 32}
+        length += len(json.dumps(item)) + 2
+        items.append(item)
+        index += 1
+    return json.dumps({"error": False, "msg": "ok", "data": items}).encode("utf-8")
+
+class Upstream:
+    # Stands in for the HTTP APIs api_call talks to, every path answers with
+    # the same JSON body after the configured latency. ?latency_ms= and ?size=
+    # override the defaults per request.
+    def __init__(
+        self,
+        port: int = 0,
+        host: str = "127.0.0.1",
+        latency_ms: float = UPSTREAM_LATENCY_MS,
+        jitter_ms: float = UPSTREAM_JITTER_MS,
+        payload_bytes: int = UPSTREAM_PAYLOAD_BYTES,
+    ):
+        self.port = port
+        self.host = host
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.body = payload(payload_bytes)
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        latency = float(request.query.get("latency_ms", self.latency_ms))
+        if self.jitter_ms:
+            latency += random.uniform(0, self.jitter_ms)
+        body = self.body
+        if "size" in request.query:
+            body = payload(int(request.query["size"]))
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        return web.Response(body=body, content_type="application/json")
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 binds a free port, report the one the OS picked
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+async def serve(upstream: Upstream) -> None:
+    await upstream.start()
+    print(f"Upstream listening on {upstream.url} ({upstream.latency_ms:g} ms, {len(upstream.body)} bytes)", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await upstream.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local HTTP upstream for load testing api_call")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=UPSTREAM_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=UPSTREAM_JITTER_MS)
+    parser.add_argument("--size", type=int, default=UPSTREAM_PAYLOAD_BYTES, help="response body size in bytes")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(Upstream(args.port, args.host, args.latency_ms, args.jitter_ms, args.size)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
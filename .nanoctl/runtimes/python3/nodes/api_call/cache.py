@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+HTTP_CACHE_MAX_ENTRY_BYTES = int(os.getenv("HTTP_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+HTTP_CACHE_DEFAULT_TTL = float(os.getenv("HTTP_CACHE_DEFAULT_TTL", "60"))
+
+# Bookkeeping of an entry on top of its body and header bytes
+ENTRY_OVERHEAD = 256
+
+HeaderValues = Tuple[Tuple[str, str], ...]
+CacheKey = Tuple[str, str, HeaderValues]
+
+def select_headers(headers: Mapping[str, Any], names: Iterable[str]) -> HeaderValues:
+    # Values of the named headers, matched case-insensitively, "" when missing
+    lowered = {str(name).lower(): str(value) for name, value in headers.items()}
+    return tuple((name.lower(), lowered.get(name.lower(), "")) for name in sorted(names))
+
+def vary_names(headers: Mapping[str, str]) -> Optional[Tuple[str, ...]]:
+    # Request headers the response depends on, None for Vary: * which is never reused
+    values = headers.getall("Vary", []) if hasattr(headers, "getall") else [headers.get("Vary") or ""]
+    names = {name.strip().lower() for value in values for name in value.split(",") if name.strip()}
+    return None if "*" in names else tuple(sorted(names))
+
+class HttpResult:
+    __slots__ = ("status", "headers", "body", "charset")
+
+    def __init__(self, status: int, headers: Mapping[str, str], body: bytes, charset: Optional[str] = None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+
+    def text(self) -> str:
+        return self.body.decode(self.charset or "utf-8", errors="replace")
+
+class CachedResponse:
+    __slots__ = ("result", "etag", "expires_at", "vary", "size")
+
+    def __init__(self, result: HttpResult, etag: Optional[str], expires_at: float, vary: HeaderValues = ()):
+        self.result = result
+        self.etag = etag
+        self.expires_at = expires_at
+        # The request's values of the headers named by Vary, other values don't reuse it
+        self.vary = vary
+        self.size = len(result.body) + sum(len(name) + len(value) for name, value in result.headers.items()) + ENTRY_OVERHEAD
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def matches(self, headers: Mapping[str, Any]) -> bool:
+        return select_headers(headers, [name for name, _ in self.vary]) == self.vary
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    if not value:
+        return directives
+
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+def freshness_ttl(headers: Mapping[str, str], default_ttl: float) -> Optional[float]:
+    # None means the response must not be stored at all
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name) is not None:
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+
+    return default_ttl
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = HTTP_CACHE_MAX_BYTES, max_entry_bytes: int = HTTP_CACHE_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stores = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[CacheKey, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, method: str, url: str, headers: Mapping[str, Any], vary: Iterable[str] = ()) -> CacheKey:
+        return (method.upper(), url, select_headers(headers, vary))
+
+    def lookup(self, key: CacheKey) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(
+        self,
+        key: CacheKey,
+        result: HttpResult,
+        ttl: float,
+        now: Optional[float] = None,
+        request_headers: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[CachedResponse]:
+        names = vary_names(result.headers)
+        if names is None:
+            return None
+        vary = select_headers(request_headers or {}, names)
+        entry = CachedResponse(result, result.headers.get("ETag"), (now or time.monotonic()) + ttl, vary)
+        if entry.size > self.max_entry_bytes or entry.size > self.max_bytes:
+            return None
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.size
+            self.stores += 1
+
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+
+        return entry
+
+    def hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def revalidate(self, key: CacheKey, entry: CachedResponse, ttl: Optional[float], now: Optional[float] = None) -> None:
+        # A 304 keeps the stored body, its headers decide for how long, None drops it
+        with self._lock:
+            self.revalidations += 1
+            if ttl is None:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            else:
+                entry.expires_at = (now or time.monotonic()) + ttl
+
+    def discard(self, key: CacheKey) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+            self.stores = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.revalidations + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.revalidations) / requests if requests else 0.0,
+        }
+
+response_cache = ResponseCache()
@@ -2,9 +2,18 @@ from core.nanoservice import NanoService
 from core.types.context import Context
 from core.types.nanoservice_response import NanoServiceResponse
 from core.types.global_error import GlobalError
-from typing import Any, Dict
-import aiohttp # type: ignore
+from typing import Any, AsyncIterator, Dict, Optional
+from util.http_pool import http_pool
+from util.message_manager import json_loads
+from util.singleflight import SingleFlight
+from nodes.api_call.cache import HTTP_CACHE_DEFAULT_TTL, HttpResult, freshness_ttl, response_cache
 import traceback
+import time
+import os
+
+STREAM_READ_SIZE = int(os.getenv("API_CALL_STREAM_READ_SIZE", str(64 * 1024)))
+
+in_flight = SingleFlight("api_call")
 
 class ApiCall(NanoService):
     def __init__(self):
@@ -31,6 +40,16 @@ class ApiCall(NanoService):
                 "responseType": {
                     "type": "string",
                 },
+                "coalesce": {
+                    "type": "boolean",
+                },
+                "cache": {
+                    "type": ["boolean", "object"],
+                    "properties": {
+                        "ttl": {"type": "number"},
+                        "headers": {"type": "array", "items": {"type": "string"}},
+                    },
+                },
             },
             "required": ["url", "method"],
         }
@@ -50,29 +69,21 @@ class ApiCall(NanoService):
                 if ctx.response is not None:
                     body = ctx.response.get('data', {})
 
-            async with aiohttp.ClientSession() as session:
-                if method == "GET" or method == "DELETE":
-                    async with session.get(url, headers=headers) as resp:
-                        if responseType == "application/json":
-                            if resp.status != 200:
-                                throw_error = await resp.text()
-                                raise Exception(throw_error)
-                            
-                            result = await resp.json()
-                        else:
-                            result = await resp.text()
-                        response.setSuccess(result)
-                else:
-                    async with session.request(method, url, headers=headers, json=body) as resp:
-                        if responseType == "application/json":
-                            if resp.status != 200:
-                                throw_error = await resp.text()
-                                raise Exception(throw_error)
-                            
-                            result = await resp.json()
-                        else:
-                            result = await resp.text()
-                        response.setSuccess(result)
+            # Coalescing is opt-in, a shared GET sees one upstream response for every caller
+            coalesce = inputs.get('coalesce', False)
+            cache = self.cacheOptions(inputs.get('cache'))
+            if cache is not None and method == "GET":
+                result = await self.fetchCached(url, headers, cache, coalesce)
+            else:
+                result = await self.fetch(method, url, headers, body, coalesce)
+
+            if responseType == "application/json":
+                if result.status != 200:
+                    raise Exception(result.text())
+
+                response.setSuccess(json_loads(result.body))
+            else:
+                response.setSuccess(result.text())
         except Exception as error:
             err = GlobalError(error)
             err.setCode(500)
@@ -83,4 +94,84 @@ class ApiCall(NanoService):
             response.success = False
             response.setError(err)
 
-        return response
\ No newline at end of file
+        return response
+
+    def cacheOptions(self, options: Any) -> Optional[Dict[str, Any]]:
+        # Caching is opt-in: "cache": true or "cache": { "ttl": 60, "headers": ["Authorization"] }
+        if options is True:
+            return {"ttl": HTTP_CACHE_DEFAULT_TTL, "headers": []}
+        if isinstance(options, dict):
+            return {"ttl": options.get("ttl", HTTP_CACHE_DEFAULT_TTL), "headers": options.get("headers", [])}
+        return None
+
+    async def fetch(self, method: str, url: str, headers: Dict[str, Any], body: Any, coalesce: bool = False) -> HttpResult:
+        # Identical concurrent GETs share one upstream request, every waiter gets its result or error
+        if coalesce and method == "GET":
+            key = (method, url, tuple(sorted((str(name).lower(), str(value)) for name, value in headers.items())))
+            return await in_flight.do(key, lambda: self.request(method, url, headers, body))
+
+        return await self.request(method, url, headers, body)
+
+    async def request(self, method: str, url: str, headers: Dict[str, Any], body: Any) -> HttpResult:
+        session = http_pool.session()
+        if method == "GET" or method == "DELETE":
+            request = session.get(url, headers=headers)
+        else:
+            request = session.request(method, url, headers=headers, json=body)
+
+        async with request as resp:
+            return HttpResult(resp.status, resp.headers, await resp.read(), resp.charset)
+
+    async def fetchCached(self, url: str, headers: Dict[str, Any], options: Dict[str, Any], coalesce: bool = False) -> HttpResult:
+        key = response_cache.key("GET", url, headers, options["headers"])
+        entry = response_cache.lookup(key)
+        if entry is not None and not entry.matches(headers):
+            # Stored for other values of the headers the response varies on
+            entry = None
+        now = time.monotonic()
+
+        if entry is not None and entry.is_fresh(now):
+            response_cache.hit()
+            return entry.result
+
+        # Stale entries with an ETag are revalidated instead of downloaded again
+        request_headers = headers
+        if entry is not None and entry.etag:
+            request_headers = {**headers, "If-None-Match": entry.etag}
+
+        result = await self.fetch("GET", url, request_headers, None, coalesce)
+        if entry is not None and result.status == 304:
+            response_cache.revalidate(key, entry, freshness_ttl(result.headers, options["ttl"]), now)
+            return entry.result
+
+        response_cache.miss()
+        if result.status == 200:
+            ttl = freshness_ttl(result.headers, options["ttl"])
+            if ttl is not None:
+                response_cache.store(key, result, ttl, now, headers)
+
+        return result
+
+    async def handle_stream(self, ctx: Context, inputs: Dict[str, Any]) -> AsyncIterator[bytes]:
+        method = inputs.get('method', 'GET')
+        url = inputs.get('url', '')
+        headers = inputs.get('headers', {})
+        body = inputs.get('body', None)
+        if body is None:
+            if ctx.response is not None:
+                body = ctx.response.get('data', {})
+
+        # The body is relayed as it arrives, it is never buffered whole
+        session = http_pool.session()
+        if method == "GET" or method == "DELETE":
+            request = session.get(url, headers=headers)
+        else:
+            request = session.request(method, url, headers=headers, json=body)
+
+        async with request as resp:
+            if resp.status != 200:
+                throw_error = await resp.text()
+                raise Exception(throw_error)
+
+            async for chunk in resp.content.iter_chunked(STREAM_READ_SIZE):
+                yield chunk
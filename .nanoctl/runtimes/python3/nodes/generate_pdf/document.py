@@ -0,0 +1,142 @@
+import zlib
+from typing import Any, Dict, Iterable, Iterator
+from fpdf import FPDF # type: ignore
+
+# Report layout, shared by every render
+TITLE_FONT = ("Arial", "B", 16)
+HEADER_FONT = ("Arial", "B", 12)
+ROW_FONT = ("Arial", "", 12)
+ROW_HEIGHT = 10
+PAGE_MARGIN = 15
+COLUMNS = (("Product", 50), ("Quantity", 30), ("Price", 30), ("Total", 30))
+
+class StreamingPDF(FPDF):
+    # FPDF keeps every page and the whole document as one growing string until
+    # output(). Here each page is written out when it ends and drain() hands the
+    # bytes over, so memory stays bounded by one page whatever the table size.
+    # Links and alias_nb_pages are not supported, both need the finished document.
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        FPDF.__init__(self, *args, **kwargs)
+        self.flushed = 0
+
+    def drain(self) -> bytes:
+        data = self.buffer.encode("latin-1")
+        self.flushed += len(data)
+        self.buffer = ""
+        return data
+
+    def _offset(self) -> int:
+        return self.flushed + len(self.buffer)
+
+    def _newobj(self) -> None:
+        self.n += 1
+        self.offsets[self.n] = self._offset()
+        self._out(str(self.n) + " 0 obj")
+
+    def _endpage(self) -> None:
+        FPDF._endpage(self)
+        self._putpage(self.page)
+
+    def _pagesize(self):
+        if self.def_orientation == "P":
+            return self.fw_pt, self.fh_pt
+        return self.fh_pt, self.fw_pt
+
+    def _putpage(self, n: int) -> None:
+        if n == 1:
+            self._putheader()
+
+        w_pt, h_pt = self._pagesize()
+        self._newobj()
+        self._out("<</Type /Page")
+        self._out("/Parent 1 0 R")
+        if n in self.orientation_changes:
+            self._out("/MediaBox [0 0 %.2f %.2f]" % (h_pt, w_pt))
+        self._out("/Resources 2 0 R")
+        if self.pdf_version > "1.3":
+            self._out("/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>")
+        self._out("/Contents " + str(self.n + 1) + " 0 R>>")
+        self._out("endobj")
+
+        content = self.pages[n].encode("latin-1")
+        self.pages[n] = ""
+        if self.compress:
+            content = zlib.compress(content)
+        self._newobj()
+        self._out("<<" + ("/Filter /FlateDecode " if self.compress else "") + "/Length " + str(len(content)) + ">>")
+        self._putstream(content)
+        self._out("endobj")
+
+    def _putpages(self) -> None:
+        # Pages were written as they ended, only the root is left
+        w_pt, h_pt = self._pagesize()
+        self.offsets[1] = self._offset()
+        self._out("1 0 obj")
+        self._out("<</Type /Pages")
+        self._out("/Kids [" + "".join(str(3 + 2 * i) + " 0 R " for i in range(self.page)) + "]")
+        self._out("/Count " + str(self.page))
+        self._out("/MediaBox [0 0 %.2f %.2f]" % (w_pt, h_pt))
+        self._out(">>")
+        self._out("endobj")
+
+    def _putresources(self) -> None:
+        # FPDF records the resources offset from the unflushed buffer alone
+        FPDF._putresources(self)
+        self.offsets[2] += self.flushed
+
+    def _enddoc(self) -> None:
+        self._putpages()
+        self._putresources()
+        self._newobj()
+        self._out("<<")
+        self._putinfo()
+        self._out(">>")
+        self._out("endobj")
+        self._newobj()
+        self._out("<<")
+        self._putcatalog()
+        self._out(">>")
+        self._out("endobj")
+
+        offset = self._offset()
+        self._out("xref")
+        self._out("0 " + str(self.n + 1))
+        self._out("0000000000 65535 f ")
+        self._out("".join("%010d 00000 n \n" % self.offsets[i] for i in range(1, self.n + 1)).rstrip("\n"))
+        self._out("trailer")
+        self._out("<<")
+        self._puttrailer()
+        self._out(">>")
+        self._out("startxref")
+        self._out(offset)
+        self._out("%%EOF")
+        self.state = 3
+
+def render_report(title: str, sales_data: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    pdf = StreamingPDF()
+    pdf.set_auto_page_break(auto=True, margin=PAGE_MARGIN)
+    pdf.add_page()
+    pdf.set_font(*TITLE_FONT)
+    pdf.cell(200, ROW_HEIGHT, title, ln=True, align="C")
+
+    # Table Headers
+    pdf.set_font(*HEADER_FONT)
+    for label, width in COLUMNS:
+        pdf.cell(width, ROW_HEIGHT, label, 1)
+    pdf.ln()
+
+    # Table Data, finished pages are handed over as soon as a row breaks the page
+    pdf.set_font(*ROW_FONT)
+    widths = [width for _, width in COLUMNS]
+    for item in sales_data:
+        pdf.cell(widths[0], ROW_HEIGHT, item["product"], 1)
+        pdf.cell(widths[1], ROW_HEIGHT, str(item["quantity"]), 1)
+        pdf.cell(widths[2], ROW_HEIGHT, f"${item['price']:.2f}", 1)
+        pdf.cell(widths[3], ROW_HEIGHT, f"${item['total']:.2f}", 1)
+        pdf.ln()
+        if pdf.buffer:
+            yield pdf.drain()
+
+    pdf.close()
+    yield pdf.drain()
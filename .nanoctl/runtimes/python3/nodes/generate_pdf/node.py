@@ -1,11 +1,12 @@
 import base64
 from core.nanoservice import NanoService
+from core.executors import PROCESS, executors
 from core.types.context import Context
 from core.types.nanoservice_response import NanoServiceResponse
 from core.types.global_error import GlobalError
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 import traceback
-from fpdf import FPDF # type: ignore
+from nodes.generate_pdf.document import render_report
 
 class GeneratePDF(NanoService):
     def __init__(self):
@@ -16,6 +17,7 @@ class GeneratePDF(NanoService):
             "type": "object",
             "properties": {
                 "title": {"type": "string"},
+                "output": {"type": "string", "enum": ["base64", "binary"]},
                 "sales_data": {
                     "type": "array",
                     "items": {
@@ -34,44 +36,20 @@ class GeneratePDF(NanoService):
         }
         self.output_schema = {}
         self.contentType = "application/pdf"
+        self.execution_mode = PROCESS
 
     async def handle(self, ctx: Context, inputs: Dict[str, Any]) -> NanoServiceResponse:
 
         response = NanoServiceResponse()
 
         try:
-            title = inputs["title"]
-            sales_data = inputs["sales_data"]
-            pdf = FPDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-            pdf.set_font("Arial", "B", 16)
-            pdf.cell(200, 10, title, ln=True, align="C")
-            
-            # Table Headers
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(50, 10, "Product", 1)
-            pdf.cell(30, 10, "Quantity", 1)
-            pdf.cell(30, 10, "Price", 1)
-            pdf.cell(30, 10, "Total", 1)
-            pdf.ln()
+            # Rendered in memory, concurrent requests share no file
+            pdf_data = b"".join(render_report(inputs["title"], inputs["sales_data"]))
 
-            # Table Data
-            pdf.set_font("Arial", "", 12)
-            for item in sales_data:
-                pdf.cell(50, 10, item["product"], 1)
-                pdf.cell(30, 10, str(item["quantity"]), 1)
-                pdf.cell(30, 10, f"${item['price']:.2f}", 1)
-                pdf.cell(30, 10, f"${item['total']:.2f}", 1)
-                pdf.ln()
-
-            # Save PDF File
-            file_path = "sales_report.pdf"
-            pdf.output(file_path)
-
-            # Read PDF File
-            with open(file_path, "rb") as file:
-                pdf_data = file.read()
+            # Binary output is sent as is over RAW encoded responses
+            if inputs.get("output") == "binary":
+                response.setSuccess(pdf_data)
+                return response
 
             # Transformation to Base64
             pdf_data = base64.b64encode(pdf_data).decode("utf-8")
@@ -89,3 +67,10 @@ class GeneratePDF(NanoService):
             response.setError(err)
 
         return response
+
+    async def handle_stream(self, ctx: Context, inputs: Dict[str, Any]) -> AsyncIterator[bytes]:
+        # Pages go out as they are finished, memory stays bounded for very large tables.
+        # Streams bypass execution_mode, the pages render on the thread pool instead
+        # so the event loop keeps serving other calls during a long report.
+        async for chunk in executors.stream(render_report, inputs["title"], inputs["sales_data"]):
+            yield chunk
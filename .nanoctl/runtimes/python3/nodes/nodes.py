@@ -1,12 +1,160 @@
-from nodes.api_call.node import ApiCall
-from nodes.sentiment.node import Sentiment
-from nodes.generate_pdf.node import GeneratePDF
-
-nodes = {
-    "api_call": ApiCall(),
-    "generate-sentiment": Sentiment(),
-    "generate-pdf": GeneratePDF()
+import ast
+import importlib
+import os
+import threading
+import time
+from collections.abc import Mapping
+from importlib import metadata
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from core.executors import EXECUTION_MODES, PROCESS
+
+ENTRY_POINT_GROUP = "nanoservice.nodes"
+NODE_BASES = ("NanoService", "NodeBase")
+NODES_PRELOAD = os.getenv("NODES_PRELOAD", "")
+NODES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Nodes are referenced as "module:Class" and only imported when first used. An
+# execution mode can follow in brackets, the entry point extras syntax, so the
+# process pool can import the node before its first request.
+builtin_nodes = {
+    "api_call": "nodes.api_call.node:ApiCall",
+    "generate-sentiment": "nodes.sentiment.node:Sentiment [process]",
+    "generate-pdf": "nodes.generate_pdf.node:GeneratePDF [process]",
 }
 
+def base_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return ""
+
+def discover_package(path: str = NODES_DIR, package: str = "nodes") -> Dict[str, str]:
+    # Reads nodes/<name>/node.py with ast, nothing is imported
+    specs: Dict[str, str] = {}
+    for entry in sorted(os.listdir(path)):
+        module_path = os.path.join(path, entry, "node.py")
+        if not os.path.isfile(module_path):
+            continue
+
+        with open(module_path, "r", encoding="utf-8") as file:
+            tree = ast.parse(file.read(), module_path)
+
+        for item in tree.body:
+            if isinstance(item, ast.ClassDef) and any(base_name(base) in NODE_BASES for base in item.bases):
+                specs[entry] = f"{package}.{entry}.node:{item.name}"
+                break
+    return specs
+
+def parse_spec(spec: str) -> Tuple[str, str, Optional[str]]:
+    # "module:Class [mode]" into module, class and the declared mode, None without one
+    target, _, extras = spec.partition("[")
+    module_name, _, class_name = target.strip().partition(":")
+    mode = extras.strip().rstrip("]").strip() or None
+    if mode is not None and mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode {mode} in node spec {spec}")
+    return module_name, class_name, mode
+
+def discover_entry_points(group: str = ENTRY_POINT_GROUP) -> Dict[str, str]:
+    return {entry_point.name: entry_point.value for entry_point in metadata.entry_points(group=group)}
+
+def discover() -> Dict[str, str]:
+    # Explicit names win over directory names, packages can only add new nodes
+    specs = {}
+    known_modules = {parse_spec(spec)[0] for spec in builtin_nodes.values()}
+    for name, spec in discover_package().items():
+        if parse_spec(spec)[0] not in known_modules:
+            specs[name] = spec
+    specs.update(builtin_nodes)
+    for name, spec in discover_entry_points().items():
+        specs.setdefault(name, spec)
+    return specs
+
+class NodeRegistry(Mapping):
+    def __init__(self, specs: Dict[str, str]):
+        self.specs = dict(specs)
+        self.load_times: Dict[str, float] = {}
+        self._nodes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Any:
+        node = self._nodes.get(name)
+        if node is None:
+            node = self.load(name)
+        return node
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def __contains__(self, name: object) -> bool:
+        # Mapping's default goes through __getitem__ and would import the node
+        return name in self.specs
+
+    def load(self, name: str) -> Any:
+        spec = self.specs[name]
+        with self._lock:
+            node = self._nodes.get(name)
+            if node is None:
+                start = time.perf_counter()
+                module_name, class_name, mode = parse_spec(spec)
+                node = getattr(importlib.import_module(module_name), class_name)()
+                # The declared mode is the one the process pool was warmed for
+                if mode is not None:
+                    node.execution_mode = mode
+                self.load_times[name] = time.perf_counter() - start
+                self._nodes[name] = node
+        return node
+
+    def preload(self, names: Iterable[str]) -> None:
+        for name in names:
+            self.load(name)
+
+    def process_modules(self) -> Tuple[str, ...]:
+        # Modules of the process mode nodes, the worker pool imports them when it starts.
+        # Nodes not loaded yet count when their spec declares the process mode.
+        modules = set()
+        for name, spec in self.specs.items():
+            node = self._nodes.get(name)
+            module_name, _, mode = parse_spec(spec)
+            if node is not None:
+                mode = getattr(node, "execution_mode", None)
+                module_name = type(node).__module__
+            if mode == PROCESS:
+                modules.add(module_name)
+        return tuple(sorted(modules))
+
+    def loaded(self) -> Dict[str, Any]:
+        return dict(self._nodes)
+
+    def report(self) -> List[Dict[str, Any]]:
+        # Import and construction time per node, dependencies shared with an earlier node count once
+        return [
+            {
+                "node": name,
+                "module": parse_spec(spec)[0],
+                "loaded": name in self._nodes,
+                "load_ms": self.load_times[name] * 1e3 if name in self.load_times else None,
+            }
+            for name, spec in self.specs.items()
+        ]
+
+def preload_names(value: str = NODES_PRELOAD) -> List[str]:
+    if value.strip() == "*":
+        return list(nodes)
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+nodes = NodeRegistry(discover())
+
 def get_nodes():
     return nodes
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    nodes.preload(preload_names() or list(nodes))
+    for row in nodes.report():
+        load_ms = "-" if row["load_ms"] is None else f"{row['load_ms']:.1f}"
+        print(f"{row['node']:<24} {row['module']:<32} {load_ms:>10} ms")
+    print(f"{'total':<24} {'':<32} {(time.perf_counter() - start) * 1e3:>10.1f} ms")
@@ -1,41 +1,58 @@
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Callable, Dict, Mapping, Optional
 from nodes.nodes import get_nodes
 from core.node_base import NodeBase
-from core.types.context import Context
+from core.types.context import LAZY_SECTIONS, Context
+from core.util.logger import logger
+from util.message_manager import json_loads
 
 class Runner:
-    def __init__(self, node_name: str, ctx: Dict[str, Any]):
+    def __init__(self, node_name: str, ctx: Dict[str, Any], sections: Optional[Mapping[str, bytes]] = None, decode: Callable[[bytes], Any] = json_loads):
         self.nodes = get_nodes()
-        self.ctx = self.create_context(ctx)
+        self.ctx = self.create_context(ctx, sections, decode)
+        # Nodes log through ctx.logger, its records carry the run id and the node
+        self.ctx.logger = logger.bind(id=self.ctx.id, node=node_name)
         self.node_name = node_name
+        self.node: Optional[NodeBase] = None
 
     async def run(self):
         node: NodeBase = self.node_resolver(self.node_name, self.ctx.config)
         model = await node.process(self.ctx)
         return model.data
+
+    async def stream(self) -> AsyncIterator[Any]:
+        node: NodeBase = self.node_resolver(self.node_name, self.ctx.config)
+        self.node = node
+
+        async for chunk in node.process_stream(self.ctx):
+            yield chunk
     
     def node_resolver(self, node_name: str, config: Dict[str, Any]) -> NodeBase:
-        node: NodeBase = self.nodes[node_name]
-        node.node = config.get('node')
-        node.name = config.get('name')
-        node.active = config.get('active', True)
-        node.stop = config.get('stop', False)
-        node.set_var = config.get('set_var', False)
-        node.originalConfig = config
+        node = self.nodes[node_name].bind(config)
+        # Metrics and batches are labelled by node, the registry name keeps the labels
+        # bounded whatever the config sends
+        node.node = node_name
         return node
     
-    def create_context(self, ctx: Dict[str, Any]) -> Context:
+    @staticmethod
+    def create_context(ctx: Dict[str, Any], sections: Optional[Mapping[str, bytes]] = None, decode: Callable[[bytes], Any] = json_loads) -> Context:
         context = Context()
         context.id = ctx.get('id', '')
         context.workflow_name = ctx.get('workflow_name', '')
         context.workflow_path = ctx.get('workflow_path', '')
-        context.request = ctx.get('request', {})
-        context.response = ctx.get('response', {})
-        context.error = ctx.get('error', None)
+        # The section slots are set directly, their properties only matter for reads
+        context._request = ctx.get('request', {})
+        context._response = ctx.get('response', {})
+        context._error = ctx.get('error', None)
         context.logger = ctx.get('logger', None)
         context.config = ctx.get('config', {})
         context.func = ctx.get('func', None)
-        context.vars = ctx.get('vars', {})
-        context.env = ctx.get('env', {})
+        context._vars = ctx.get('vars', {})
+        context._env = ctx.get('env', {})
+
+        # Sections sent on their own replace the payload ones, they are decoded on first read
+        if sections:
+            for name, data in sections.items():
+                if name in LAZY_SECTIONS:
+                    context.setRawSection(name, data, decode)
 
         return context
\ No newline at end of file
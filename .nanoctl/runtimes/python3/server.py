@@ -2,66 +2,314 @@ import json
 import grpc.aio # type: ignore
 import asyncio
 import os
+import signal
+import sys
+import time
 import gen.node_pb2 as node_pb2
 import gen.node_pb2_grpc as node_pb2_grpc
-from util.message_manager import decode_message, encode_message
+from util.message_manager import context_sections, decode_message, encode_message, encode_payload, get_codec
 from runner import Runner
 import traceback
-from core.types.context import Context
+from util.http_pool import http_pool
+from util.session_cache import RESEND_FULL, SessionMissing, session_cache
+from util.compression import ACCEPT_ENCODING_METADATA_KEY, compression, parse_accept
+from util.metrics_server import MetricsServer
+from core.util.metrics import METRICS_PORT, observe_bytes, observe_error, observe_phase
+from core.executors import executors
+from core.admission import AdmissionRejected, admission
+from core.profiling import PROFILE_METADATA_KEY, profiler
+from core.util.logger import log_pipeline
+from nodes.nodes import get_nodes, preload_names
+from supervisor import SERVER_WORKERS, Supervisor
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(64 * 1024)))
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "16"))
+SERVER_MODE = os.getenv("SERVER_MODE", "single")
+SHUTDOWN_GRACE = float(os.getenv("SHUTDOWN_GRACE", "3"))
+# Label of every name that is not a registered node, callers can't create new series
+UNKNOWN_NODE = "unknown"
+
+def node_label(name):
+    # Admission limiters and metric series are kept per registered node only
+    return name if name in get_nodes() else UNKNOWN_NODE
+
+def response_type(request_type, message):
+    if isinstance(message, (bytes, bytearray)):
+        return "BINARY"
+
+    # Answer with the same structured codec the caller used (JSON, MSGPACK, CBOR...)
+    try:
+        if get_codec(request_type).structured:
+            return request_type
+    except ValueError:
+        pass
+
+    return "JSON"
+
+def chunk_bytes(data, size):
+    view = memoryview(data)
+    for offset in range(0, len(view), size):
+        yield bytes(view[offset:offset + size])
+
+def error_message(e):
+    stack_trace = traceback.format_exc()
+
+    message = {
+        "error": str(e),
+        "stack": stack_trace
+    }
+
+    # Check if the exception message is a valid JSON
+    if isinstance(e, Exception):
+        try:
+            message = json.loads(str(e))
+        except json.JSONDecodeError:
+            pass
+
+    return message
+
+def requested_profile(context):
+    # Callers ask for a profile of one call with the x-nano-profile metadata
+    if context is None:
+        return None
+    for key, value in context.invocation_metadata() or ():
+        if key == PROFILE_METADATA_KEY and value not in ("", "0", "false"):
+            return value
+    return None
+
+def accepted_compression(context):
+    # Callers list the codecs they can decompress in x-nano-accept-encoding, e.g. "gzip;level=9, deflate"
+    if context is None:
+        return []
+    for key, value in context.invocation_metadata() or ():
+        if key == ACCEPT_ENCODING_METADATA_KEY:
+            return parse_accept(value)
+    return []
+
+def wire_bytes(message):
+    # Body and sections as sent, compressed or not
+    return len(message.Payload) + len(message.Message) + sum(len(data) for data in message.Sections.values())
+
+async def compress_response(name, result, accepted):
+    # The compressed body always goes in Payload, Message is left empty. The
+    # sections are compressed with the same codec, Compression covers them all.
+    body = result.Payload if result.Encoding == "RAW" else result.Message.encode("utf-8")
+    names = list(result.Sections)
+    parts, codec = await compression.compress_parts(name, [body, *(result.Sections[section] for section in names)], accepted)
+    if codec:
+        result.Payload = parts[0]
+        result.Message = ""
+        result.Compression = codec
+        result.Sections.update(zip(names, parts[1:]))
+    return result
+
+async def decompressed_request(request):
+    # The body and the sections, inflated on the thread pool when large and together
+    # kept under the decompression limit. The body is None when it wasn't compressed.
+    if not request.Compression:
+        return None, request.Sections
+    budget = compression.max_decompressed_bytes
+    body = await compression.decompress(request.Payload, request.Compression, budget)
+    budget -= len(body)
+    sections = {}
+    for section, data in request.Sections.items():
+        sections[section] = await compression.decompress(data, request.Compression, budget)
+        budget -= len(sections[section])
+    return body, sections
+
+def session_context(request, message, sections):
+    # Requests with a Version take part in the session cache, deltas are merged with their
+    # base. Returns the context and the sections sent apart, cached ones included.
+    if not request.Version:
+        return message, sections
+    size = len(request.Payload) + len(request.Message) + sum(len(data) for data in sections.values())
+    return session_cache.resolve(message.get("id", ""), request.Version, request.BaseVersion, message, request.Removed, size, sections=sections)
+
+def create_response(message, message_type, encoding):
+    # Callers sending RAW payloads get RAW payloads back, everyone else keeps BASE64
+    if encoding == "RAW":
+        return node_pb2.NodeResponse(Payload=encode_payload(message, message_type), Encoding="RAW", Type=message_type)
+
+    return node_pb2.NodeResponse(Message=encode_message(message, message_type), Encoding="BASE64", Type=message_type)
 
 # Implement the service
 class NodeService(node_pb2_grpc.NodeServiceServicer):
     async def ExecuteNode(self, request, context):
         try:
-            # Decode the message
-            name = request.Name
-            context: Context = decode_message(request)
+            async with admission.slot(node_label(request.Name)):
+                return await self.execute(request, requested_profile(context), accepted_compression(context))
+        except AdmissionRejected as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
 
-            # Run the node
-            runner = Runner(name, context)
+    async def ExecuteNodeBatch(self, request, context):
+        # The caller can lower the parallelism, never raise it above the server limit
+        parallelism = BATCH_PARALLELISM
+        if request.Parallelism > 0:
+            parallelism = min(request.Parallelism, BATCH_PARALLELISM)
+        semaphore = asyncio.Semaphore(parallelism)
+        profile = requested_profile(context)
+        accepted = accepted_compression(context)
 
-            response = await runner.run()
-            encode_response = encode_message(response, "JSON")
+        async def execute(item):
+            async with semaphore:
+                try:
+                    async with admission.slot(node_label(item.Name)):
+                        return await self.execute(item, profile, accepted)
+                except AdmissionRejected as e:
+                    error = error_message(e)
+                    return create_response(error, response_type(item.Type, error), item.Encoding)
 
-            return node_pb2.NodeResponse(Message=encode_response, Encoding="BASE64", Type="JSON")
+        # Failures are encoded per item by execute, one error doesn't fail the batch
+        responses = await asyncio.gather(*(execute(item) for item in request.Requests))
+        return node_pb2.NodeBatchResponse(Responses=responses)
+
+    async def execute(self, request, profile=None, accepted=()):
+        name = node_label(request.Name)
+        observe_bytes(name, "in", wire_bytes(request))
+        try:
+            # Decode the message
+            phase = time.perf_counter()
+            body, sections = await decompressed_request(request)
+            context, sections = session_context(request, decode_message(request, body), sections)
+            phase = observe_phase(name, "decode", phase)
+
+            # Run the node, sections sent apart stay encoded until the node reads them
+            runner = Runner(request.Name, context, sections, get_codec(request.Type).decode)
+            observe_phase(name, "context", phase)
+
+            async with profiler.profile(name, profiler.select(name, profile)):
+                response = await runner.run()
+            phase = time.perf_counter()
+            result = create_response(response, response_type(request.Type, response), request.Encoding)
+            if sections:
+                result.Sections.update(context_sections(runner.ctx, sections, request.Type))
+            observe_phase(name, "encode", phase)
+        except SessionMissing:
+            result = node_pb2.NodeResponse(Encoding=request.Encoding, Type=request.Type, Status=RESEND_FULL)
         except Exception as e:
-            stack_trace = traceback.format_exc()
+            observe_error(name)
+            error = error_message(e)
+            result = create_response(error, response_type(request.Type, error), request.Encoding)
 
-            error_message = {
-                "error": str(e),
-                "stack": stack_trace
-            }
+        if accepted and not result.Status:
+            phase = time.perf_counter()
+            result = await compress_response(name, result, accepted)
+            observe_phase(name, "compress", phase)
 
-            # Check if the exception message is a valid JSON
-            if isinstance(e, Exception):
-                try:
-                    error_message = json.loads(str(e))
-                except json.JSONDecodeError:
-                    pass
+        observe_bytes(name, "out", wire_bytes(result))
+        return result
+
+    async def ExecuteNodeStream(self, request, context):
+        # The slot is held until the last chunk is sent
+        try:
+            async with admission.slot(node_label(request.Name)):
+                async for chunk in self.stream(request, requested_profile(context), accepted_compression(context)):
+                    yield chunk
+        except AdmissionRejected as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+
+    async def stream(self, request, profile=None, accepted=()):
+        name = node_label(request.Name)
+        observe_bytes(name, "in", wire_bytes(request))
+        try:
+            # Decode the message
+            phase = time.perf_counter()
+            body, sections = await decompressed_request(request)
+            context, sections = session_context(request, decode_message(request, body), sections)
+            phase = observe_phase(name, "decode", phase)
 
-            encode_error = encode_message(error_message, "JSON")
-            return node_pb2.NodeResponse(Message=encode_error, Encoding="BASE64", Type="JSON")
+            # Run the node, streaming nodes yield bytes, the others a single result
+            runner = Runner(request.Name, context, sections, get_codec(request.Type).decode)
+            observe_phase(name, "context", phase)
+            message_type = "BINARY"
+
+            # The profile spans the whole stream, sending the chunks included
+            async with profiler.profile(name, profiler.select(name, profile)):
+                async for item in runner.stream():
+                    if isinstance(item, str):
+                        message_type = "TEXT"
+                        item = item.encode("utf-8")
+                    elif isinstance(item, (bytes, bytearray)):
+                        message_type = getattr(runner.node, "streamType", "BINARY")
+                    else:
+                        message_type = response_type(request.Type, item)
+                        item = encode_payload(item, message_type)
+
+                    for chunk in chunk_bytes(item, STREAM_CHUNK_SIZE):
+                        chunk, codec = await compression.compress(name, chunk, accepted)
+                        observe_bytes(name, "out", len(chunk))
+                        yield node_pb2.NodeChunk(Data=chunk, Compression=codec)
+
+            yield node_pb2.NodeChunk(Last=True, Success=True, Type=message_type)
+        except SessionMissing:
+            yield node_pb2.NodeChunk(Last=True, Success=False, Status=RESEND_FULL)
+        except Exception as e:
+            observe_error(name)
+            error = error_message(e)
+            yield node_pb2.NodeChunk(Last=True, Success=False, Type="JSON", Error=json.dumps(error))
+
+def preload_nodes(names=None):
+    # Nodes not listed in NODES_PRELOAD are imported on their first request
+    registry = get_nodes()
+    registry.preload(preload_names() if names is None else names)
+    for row in registry.report():
+        if row["loaded"]:
+            print(f"Node {row['node']} loaded from {row['module']} in {row['load_ms']:.1f} ms")
 
 # Start the server
-async def serve():
-    server = grpc.aio.server()
+async def serve(preload=True, metrics_port=METRICS_PORT):
+    # SO_REUSEPORT lets every worker of the supervisor bind the same port
+    server = grpc.aio.server(options=[("grpc.so_reuseport", 1)])
     node_pb2_grpc.add_NodeServiceServicer_to_server(NodeService(), server)
 
     port = os.getenv("SERVER_PORT", "50051")
     server.add_insecure_port(f"0.0.0.0:{port}")
 
-    print(f"Server started on port {port}...")
+    print(f"Server started on port {port} (pid {os.getpid()})...")
+
+    metrics_server = MetricsServer(metrics_port)
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, lambda: asyncio.ensure_future(server.stop(grace=SHUTDOWN_GRACE)))
 
     try:
+        log_pipeline.start()
+        if preload:
+            preload_nodes()
+        await http_pool.start()
+        await metrics_server.start()
+        process_modules = get_nodes().process_modules()
+        if process_modules:
+            executors.start(process_modules)
         await server.start()
         await server.wait_for_termination()
     except asyncio.CancelledError:
         print("\nServer shutdown requested...")
     finally:
-        await server.stop(grace=3)  # Graceful shutdown
+        await server.stop(grace=SHUTDOWN_GRACE)  # Graceful shutdown
+        await http_pool.close()
+        await metrics_server.close()
+        executors.shutdown()
+        log_pipeline.stop()
         print("Server stopped cleanly.")
 
+def run_worker(slot):
+    # Every worker owns its own process pool, the cores are split between them
+    if "NODE_PROCESS_POOL_SIZE" not in os.environ:
+        executors.process_workers = max(1, executors.process_workers // SERVER_WORKERS)
+    # Each worker is scraped on its own port, METRICS_PORT + slot
+    asyncio.run(serve(preload=False, metrics_port=METRICS_PORT + slot if METRICS_PORT else 0))
+
+def run_workers():
+    # Imported before fork so the workers share the pages of the heavy modules
+    preload_nodes(preload_names() or list(get_nodes()))
+    return Supervisor(SERVER_WORKERS, run_worker).run()
+
 if __name__ == "__main__":
+    if SERVER_MODE == "workers":
+        sys.exit(run_workers())
+
     try:
         asyncio.run(serve())
     except KeyboardInterrupt:
@@ -0,0 +1,103 @@
+import os
+import signal
+import sys
+import time
+import traceback
+from typing import Callable, Dict, Tuple
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+WORKER_RESTART_BACKOFF = float(os.getenv("WORKER_RESTART_BACKOFF", "1"))
+# How often exited workers are reaped while a restart is waiting for its backoff
+REAP_INTERVAL = 0.05
+
+class Supervisor:
+    # Forks the workers, restarts the ones that die and forwards shutdown signals.
+    # Workers share the listening port through SO_REUSEPORT, the kernel balances connections.
+
+    def __init__(self, workers: int, target: Callable[[int], None], backoff: float = WORKER_RESTART_BACKOFF):
+        self.workers = max(1, workers)
+        self.target = target
+        self.backoff = backoff
+        self.stopping = False
+        self.restarts = 0
+        self.children: Dict[int, int] = {}
+        self.started: Dict[int, float] = {}
+        # Slots waiting for their backoff, with the time they are restarted at
+        self.pending: Dict[int, float] = {}
+
+    def spawn(self, slot: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, signal.SIG_DFL)
+
+            code = 0
+            try:
+                self.target(slot)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        self.children[pid] = slot
+        self.started[slot] = time.monotonic()
+        return pid
+
+    def stop(self, signum: int, frame=None) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def wait(self) -> Tuple[int, int]:
+        # Blocks until a worker exits, or until the next restart is due. pid 0 means none exited.
+        if not self.pending:
+            return os.wait()
+        while True:
+            pid, status = os.waitpid(-1, os.WNOHANG) if self.children else (0, 0)
+            delay = min(self.pending.values()) - time.monotonic()
+            if pid or self.stopping or delay <= 0:
+                return pid, status
+            time.sleep(min(delay, REAP_INTERVAL))
+
+    def restart_due(self) -> None:
+        if self.stopping:
+            self.pending.clear()
+            return
+        now = time.monotonic()
+        for slot, restart_at in list(self.pending.items()):
+            if restart_at <= now:
+                del self.pending[slot]
+                self.restarts += 1
+                self.spawn(slot)
+
+    def run(self) -> int:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+        print(f"Supervisor {os.getpid()} starting {self.workers} workers...")
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while self.children or (self.pending and not self.stopping):
+            try:
+                pid, status = self.wait()
+            except ChildProcessError:
+                break
+
+            slot = self.children.pop(pid, None) if pid else None
+            if slot is not None and not self.stopping:
+                print(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}, restarting...")
+                # A worker that dies right after start would otherwise be forked in a tight loop.
+                # The restart is scheduled, the other workers are still reaped meanwhile.
+                uptime = time.monotonic() - self.started.get(slot, 0.0)
+                self.pending[slot] = time.monotonic() + max(0.0, self.backoff - uptime)
+            self.restart_due()
+
+        print("Supervisor stopped cleanly.")
+        return 0
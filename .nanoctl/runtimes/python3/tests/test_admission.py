@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from core.admission import AdmissionControl, AdmissionRejected, NodeLimits, parse_limits, queue_gauge, rejected_counter
+
+class TestAdmissionControl(unittest.TestCase):
+    def run_calls(self, control, node, count, duration=0.02):
+        running = {"now": 0, "max": 0}
+
+        async def call(index):
+            async with control.slot(node):
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+                await asyncio.sleep(duration)
+                running["now"] -= 1
+                return index
+
+        async def scenario():
+            return await asyncio.gather(*(call(index) for index in range(count)), return_exceptions=True)
+
+        return asyncio.run(scenario()), running["max"]
+
+    def test_concurrency_is_capped_and_queued_calls_run_in_order(self):
+        control = AdmissionControl(limits={"capped": NodeLimits(max_concurrency=2, max_queue=10, queue_timeout_ms=1000)})
+        results, max_running = self.run_calls(control, "capped", 6)
+
+        self.assertEqual(results, list(range(6)))
+        self.assertEqual(max_running, 2)
+        self.assertEqual(control.stats()["capped"]["active"], 0)
+        self.assertEqual(queue_gauge.value("capped"), 0)
+
+    def test_full_queue_rejects_immediately(self):
+        control = AdmissionControl(limits={"full": NodeLimits(max_concurrency=1, max_queue=1, queue_timeout_ms=1000)})
+        results, _ = self.run_calls(control, "full", 4)
+
+        rejected = [result for result in results if isinstance(result, AdmissionRejected)]
+        self.assertEqual(results[:2], [0, 1])
+        self.assertEqual(len(rejected), 2)
+        self.assertEqual(rejected[0].reason, "queue_full")
+        self.assertEqual(rejected_counter.value("full", "queue_full"), 2)
+
+    def test_queue_timeout_rejects(self):
+        control = AdmissionControl(limits={"slow-queue": NodeLimits(max_concurrency=1, max_queue=10, queue_timeout_ms=5)})
+        results, _ = self.run_calls(control, "slow-queue", 3, duration=0.05)
+
+        self.assertEqual(results[0], 0)
+        self.assertTrue(all(isinstance(result, AdmissionRejected) and result.reason == "timeout" for result in results[1:]))
+        self.assertEqual(control.stats()["slow-queue"], {"active": 0, "queued": 0, "max_concurrency": 1, "max_queue": 10})
+
+    def test_cancelled_waiters_give_their_slot_back(self):
+        control = AdmissionControl(limits={"cancel": NodeLimits(max_concurrency=1, max_queue=10, queue_timeout_ms=1000)})
+
+        async def scenario():
+            async def hold():
+                async with control.slot("cancel"):
+                    await asyncio.sleep(0.02)
+
+            holder = asyncio.ensure_future(hold())
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(hold())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(holder, waiter, return_exceptions=True)
+
+        asyncio.run(scenario())
+        self.assertEqual(control.stats()["cancel"]["active"], 0)
+        self.assertEqual(control.stats()["cancel"]["queued"], 0)
+
+    def test_unlimited_by_default(self):
+        control = AdmissionControl(NodeLimits(max_concurrency=0), limits={})
+        results, max_running = self.run_calls(control, "free", 5)
+
+        self.assertEqual(results, list(range(5)))
+        self.assertEqual(max_running, 5)
+
+    def test_parse_limits(self):
+        limits = parse_limits('{"generate-pdf": {"max_concurrency": 2, "queue_timeout_ms": 5000}}')["generate-pdf"]
+        self.assertEqual((limits.max_concurrency, limits.queue_timeout_ms), (2, 5000.0))
+        self.assertEqual(parse_limits(""), {})
+
+if __name__ == "__main__":
+    unittest.main()
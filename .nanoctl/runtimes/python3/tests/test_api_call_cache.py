@@ -0,0 +1,181 @@
+import asyncio
+import unittest
+from aiohttp import web # type: ignore
+from aiohttp.test_utils import TestServer # type: ignore
+from core.types.context import Context
+from nodes.api_call.cache import HttpResult, ResponseCache, freshness_ttl, response_cache
+from nodes.api_call.node import ApiCall
+from util.http_pool import http_pool
+
+class TestResponseCache(unittest.TestCase):
+    def test_freshness_ttl(self):
+        self.assertEqual(freshness_ttl({"Cache-Control": "public, max-age=120"}, 60), 120)
+        self.assertEqual(freshness_ttl({"Cache-Control": "no-cache"}, 60), 0)
+        self.assertIsNone(freshness_ttl({"Cache-Control": "no-store"}, 60))
+        self.assertEqual(freshness_ttl({}, 60), 60)
+
+    def test_key_uses_selected_headers_only(self):
+        cache = ResponseCache()
+        first = cache.key("GET", "http://host/a", {"Authorization": "a", "X-Trace": "1"}, ["authorization"])
+        second = cache.key("GET", "http://host/a", {"authorization": "a", "X-Trace": "2"}, ["Authorization"])
+        other = cache.key("GET", "http://host/a", {"Authorization": "b"}, ["Authorization"])
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_byte_size_lru_eviction(self):
+        # Each entry accounts for its body plus a fixed header overhead (356 bytes here)
+        cache = ResponseCache(max_bytes=1200, max_entry_bytes=1200)
+        for name in ["a", "b", "c"]:
+            cache.store(("GET", name, ()), HttpResult(200, {}, b"x" * 100), 60)
+        cache.lookup(("GET", "a", ()))
+        cache.store(("GET", "d", ()), HttpResult(200, {}, b"x" * 100), 60)
+
+        self.assertIsNotNone(cache.lookup(("GET", "a", ())))
+        self.assertIsNone(cache.lookup(("GET", "b", ())))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.stats()["bytes"], 1200)
+
+    def test_entries_above_the_limit_are_not_stored(self):
+        cache = ResponseCache(max_bytes=1000, max_entry_bytes=100)
+        self.assertIsNone(cache.store(("GET", "a", ()), HttpResult(200, {}, b"x" * 300), 60))
+
+    def test_revalidation_with_no_store_discards_the_entry(self):
+        cache = ResponseCache()
+        key = ("GET", "a", ())
+        entry = cache.store(key, HttpResult(200, {"ETag": '"v1"'}, b"x" * 100), 0, now=10)
+        cache.revalidate(key, entry, 30, now=20)
+        self.assertTrue(entry.is_fresh(40))
+
+        cache.revalidate(key, entry, freshness_ttl({"Cache-Control": "no-store"}, 60), now=50)
+        self.assertIsNone(cache.lookup(key))
+        self.assertEqual(cache.stats()["bytes"], 0)
+        self.assertEqual(cache.stats()["revalidations"], 2)
+
+    def test_header_bytes_count_towards_the_size(self):
+        cache = ResponseCache()
+        entry = cache.store(("GET", "a", ()), HttpResult(200, {"X-Large": "v" * 1000}, b"x" * 100), 60)
+        self.assertEqual(entry.size, 100 + len("X-Large") + 1000 + 256)
+
+    def test_vary_selects_the_request_headers_of_an_entry(self):
+        cache = ResponseCache()
+        result = HttpResult(200, {"Vary": "Accept-Language"}, b"hola")
+        entry = cache.store(("GET", "a", ()), result, 60, request_headers={"accept-language": "es"})
+
+        self.assertTrue(entry.matches({"Accept-Language": "es", "X-Trace": "1"}))
+        self.assertFalse(entry.matches({"Accept-Language": "en"}))
+        self.assertFalse(entry.matches({}))
+        self.assertIsNone(cache.store(("GET", "b", ()), HttpResult(200, {"Vary": "*"}, b"x"), 60))
+
+    def test_clear_resets_the_counters(self):
+        cache = ResponseCache()
+        cache.store(("GET", "a", ()), HttpResult(200, {}, b"x"), 60)
+        cache.hit()
+        cache.miss()
+        cache.clear()
+
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"], stats["stores"]), (0, 0, 0, 0))
+
+class TestApiCallCache(unittest.TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.calls = {"fresh": 0, "etag": 0, "not_modified": 0, "vary": 0}
+
+    def create_app(self) -> web.Application:
+        async def fresh(request: web.Request) -> web.Response:
+            self.calls["fresh"] += 1
+            return web.json_response({"calls": self.calls["fresh"]}, headers={"Cache-Control": "max-age=60"})
+
+        async def etag(request: web.Request) -> web.Response:
+            self.calls["etag"] += 1
+            if request.headers.get("If-None-Match") == '"v1"':
+                self.calls["not_modified"] += 1
+                return web.Response(status=304, headers={"ETag": '"v1"', "Cache-Control": "no-cache"})
+            return web.json_response({"version": 1}, headers={"ETag": '"v1"', "Cache-Control": "no-cache"})
+
+        async def vary(request: web.Request) -> web.Response:
+            self.calls["vary"] += 1
+            return web.json_response({"language": request.headers.get("Accept-Language")}, headers={"Cache-Control": "max-age=60", "Vary": "Accept-Language"})
+
+        app = web.Application()
+        app.router.add_get("/fresh", fresh)
+        app.router.add_get("/vary", vary)
+        app.router.add_get("/etag", etag)
+        return app
+
+    def call(self, server: TestServer, path: str, headers=None) -> asyncio.Future:
+        node = ApiCall()
+        ctx = Context()
+        inputs = {"url": str(server.make_url(path)), "method": "GET", "cache": True, "headers": headers or {}}
+        return node.handle(ctx, inputs)
+
+    def test_fresh_responses_are_served_from_cache(self):
+        async def scenario():
+            async with TestServer(self.create_app()) as server:
+                first = await self.call(server, "/fresh")
+                second = await self.call(server, "/fresh")
+            await http_pool.close()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first.data, {"calls": 1})
+        self.assertEqual(second.data, {"calls": 1})
+        self.assertEqual(self.calls["fresh"], 1)
+        self.assertEqual(response_cache.stats()["hits"], 1)
+
+    def test_stale_responses_are_revalidated_with_etag(self):
+        async def scenario():
+            async with TestServer(self.create_app()) as server:
+                first = await self.call(server, "/etag")
+                second = await self.call(server, "/etag")
+            await http_pool.close()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first.data, {"version": 1})
+        self.assertEqual(second.data, {"version": 1})
+        self.assertEqual(self.calls["not_modified"], 1)
+        self.assertEqual(response_cache.stats()["revalidations"], 1)
+
+    def test_responses_are_only_reused_for_the_headers_they_vary_on(self):
+        async def scenario():
+            async with TestServer(self.create_app()) as server:
+                results = [await self.call(server, "/vary", {"Accept-Language": language}) for language in ("es", "es", "en")]
+            await http_pool.close()
+            return results
+
+        results = asyncio.run(scenario())
+        self.assertEqual([result.data["language"] for result in results], ["es", "es", "en"])
+        self.assertEqual(self.calls["vary"], 2)
+        self.assertEqual(response_cache.stats()["hits"], 1)
+
+class TestApiCallCoalescing(unittest.TestCase):
+    def run_gets(self, inputs):
+        calls = []
+
+        async def slow(request: web.Request) -> web.Response:
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return web.json_response({"ok": True})
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/slow", slow)
+            async with TestServer(app) as server:
+                request = {"url": str(server.make_url("/slow")), "method": "GET", **inputs}
+                results = await asyncio.gather(*(ApiCall().handle(Context(), dict(request)) for _ in range(5)))
+            await http_pool.close()
+            return results
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(result.data == {"ok": True} for result in results))
+        return len(calls)
+
+    def test_identical_concurrent_gets_share_one_request(self):
+        self.assertEqual(self.run_gets({"coalesce": True}), 1)
+
+    def test_coalescing_is_opt_in(self):
+        self.assertEqual(self.run_gets({}), 5)
+
+if __name__ == '__main__':
+    unittest.main()
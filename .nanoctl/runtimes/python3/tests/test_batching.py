@@ -0,0 +1,153 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from core.batching import MicroBatcher, batch_size_histogram
+from core.nanoservice import NanoService
+from core.types.context import Context
+from core.types.nanoservice_response import NanoServiceResponse
+from core.util.metrics import Histogram, registry
+
+class BatchNode(NanoService):
+    def __init__(self):
+        NanoService.__init__(self)
+        self.batches = []
+
+    async def handle(self, ctx, inputs):
+        response = NanoServiceResponse()
+        response.setSuccess({"single": inputs["value"]})
+        return response
+
+    async def handle_batch(self, ctx_list, inputs_list):
+        self.batches.append(len(inputs_list))
+        responses = []
+        for inputs in inputs_list:
+            response = NanoServiceResponse()
+            response.setSuccess({"batched": inputs["value"]})
+            responses.append(response)
+        return responses
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_batches_flush_when_full(self):
+        sizes = []
+
+        async def handler(ctx_list, inputs_list):
+            sizes.append(len(inputs_list))
+            return [inputs["value"] * 2 for inputs in inputs_list]
+
+        async def scenario():
+            batcher = MicroBatcher("test-full", handler, max_size=4, max_wait_ms=1000)
+            return await asyncio.gather(*(batcher.submit(MagicMock(), {"value": i}) for i in range(8)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(results, [i * 2 for i in range(8)])
+        self.assertEqual(sizes, [4, 4])
+
+    def test_partial_batch_flushes_after_max_wait(self):
+        sizes = []
+
+        async def handler(ctx_list, inputs_list):
+            sizes.append(len(inputs_list))
+            return inputs_list
+
+        async def scenario():
+            batcher = MicroBatcher("test-wait", handler, max_size=100, max_wait_ms=5)
+            return await asyncio.gather(*(batcher.submit(MagicMock(), {"value": i}) for i in range(3)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(results), 3)
+        self.assertEqual(sizes, [3])
+        self.assertEqual(batch_size_histogram.value("test-wait").count, 1)
+
+    def test_errors_reach_every_caller(self):
+        async def handler(ctx_list, inputs_list):
+            raise RuntimeError("model unavailable")
+
+        async def scenario():
+            batcher = MicroBatcher("test-error", handler, max_size=2, max_wait_ms=5)
+            return await asyncio.gather(*(batcher.submit(MagicMock(), {}) for _ in range(2)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    def test_result_count_mismatch_is_an_error(self):
+        async def handler(ctx_list, inputs_list):
+            return []
+
+        async def scenario():
+            batcher = MicroBatcher("test-mismatch", handler, max_size=1, max_wait_ms=5)
+            return await batcher.submit(MagicMock(), {})
+
+        with self.assertRaises(ValueError):
+            asyncio.run(scenario())
+
+    def test_cancelled_batch_cancels_its_callers(self):
+        started = []
+
+        async def handler(ctx_list, inputs_list):
+            started.append(len(inputs_list))
+            await asyncio.sleep(10)
+
+        async def scenario():
+            batcher = MicroBatcher("test-cancel", handler, max_size=2, max_wait_ms=1000)
+            callers = [asyncio.ensure_future(batcher.submit(MagicMock(), {})) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            self.assertEqual(len(batcher._tasks), 1)
+            for task in list(batcher._tasks):
+                task.cancel()
+            return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1)
+
+        results = asyncio.run(scenario())
+        self.assertEqual(started, [2])
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results))
+
+class TestNanoServiceBatching(unittest.TestCase):
+    def create_context(self, value):
+        ctx = Context()
+        ctx.config = {"value": value}
+        return ctx
+
+    def test_concurrent_runs_share_handle_batch(self):
+        node = BatchNode()
+        node.batch_max_size = 5
+
+        async def scenario():
+            return await asyncio.gather(*(node.run(self.create_context(i)) for i in range(5)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual([result.data for result in results], [{"batched": i} for i in range(5)])
+        self.assertEqual(node.batches, [5])
+
+    def test_batching_is_off_by_default(self):
+        node = BatchNode()
+        self.assertTrue(node.supportsBatch())
+        self.assertFalse(NanoService.supportsBatch(MagicMock(handle_batch=None)))
+
+        result = asyncio.run(node.run(self.create_context(3)))
+        self.assertEqual(result.data, {"single": 3})
+        self.assertEqual(node.batches, [])
+
+    def test_batch_size_of_one_calls_handle(self):
+        node = BatchNode()
+        node.batch_max_size = 1
+
+        result = asyncio.run(node.run(self.create_context(7)))
+        self.assertEqual(result.data, {"single": 7})
+        self.assertEqual(node.batches, [])
+
+class TestHistogram(unittest.TestCase):
+    def test_observations_land_in_buckets(self):
+        histogram = registry.histogram("test_histogram_seconds", "Test histogram", ("name",), (0.1, 1.0))
+        histogram.observe(0.05, "a")
+        histogram.observe(0.5, "a")
+        histogram.observe(5, "a")
+
+        value = histogram.value("a")
+        self.assertEqual(value.counts, [1, 1, 1])
+        self.assertEqual(value.count, 3)
+        self.assertAlmostEqual(value.sum, 5.55)
+        self.assertIsInstance(registry.histogram("test_histogram_seconds", "Test histogram"), Histogram)
+        with self.assertRaises(ValueError):
+            registry.counter("test_histogram_seconds", "Test histogram")
+
+if __name__ == "__main__":
+    unittest.main()
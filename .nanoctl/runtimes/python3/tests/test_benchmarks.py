@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.suite import BASELINES_PATH, CASES, REFERENCE_CASE, compare, load_baselines, measure, median_results, run, same_platform, save_baselines
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_compare_flags_slower_cases(self):
+        baselines = {"case": {"ops_per_sec": 1000.0, "alloc_kb": 10.0}}
+
+        self.assertEqual(compare({"case": {"ops_per_sec": 800.0, "alloc_kb": 10.0}}, baselines, 0.25), [])
+        self.assertEqual(
+            compare({"case": {"ops_per_sec": 700.0, "alloc_kb": 10.0}}, baselines, 0.25),
+            [("case", "ops_per_sec", 700.0, 1000.0)],
+        )
+
+    def test_compare_flags_allocation_growth(self):
+        baselines = {"case": {"ops_per_sec": 1000.0, "alloc_kb": 100.0}}
+
+        regressions = compare({"case": {"ops_per_sec": 1000.0, "alloc_kb": 200.0}}, baselines, 0.25)
+
+        self.assertEqual(regressions, [("case", "alloc_kb", 200.0, 100.0)])
+
+    def test_compare_scales_by_the_reference_case(self):
+        baselines = {REFERENCE_CASE: {"ops_per_sec": 100.0, "alloc_kb": 1.0}, "case": {"ops_per_sec": 1000.0, "alloc_kb": 10.0}}
+        # A host half as fast runs everything at half the speed, that is no regression
+        slow_host = {REFERENCE_CASE: {"ops_per_sec": 50.0, "alloc_kb": 1.0}, "case": {"ops_per_sec": 500.0, "alloc_kb": 10.0}}
+        self.assertEqual(compare(slow_host, baselines, 0.25), [])
+
+        slow_host["case"]["ops_per_sec"] = 300.0
+        self.assertEqual(compare(slow_host, baselines, 0.25), [("case", "ops_per_sec", 300.0, 500.0)])
+
+    def test_allocations_are_only_checked_on_the_same_platform(self):
+        baselines = {"case": {"ops_per_sec": 1000.0, "alloc_kb": 100.0}}
+        results = {"case": {"ops_per_sec": 1000.0, "alloc_kb": 200.0}}
+
+        self.assertEqual(compare(results, baselines, 0.25, check_alloc=False), [])
+        self.assertFalse(same_platform({"python": "2.7.18", "machine": "x86_64"}))
+
+    def test_reference_runs_with_any_pattern(self):
+        self.assertEqual(set(run("no case matches this", repeat=1)), {REFERENCE_CASE})
+
+    def test_baselines_keep_the_median_of_rounds(self):
+        rounds = [{"case": {"ops_per_sec": ops, "alloc_kb": 10.0}} for ops in (900.0, 100.0, 1000.0)]
+
+        self.assertEqual(median_results(rounds), {"case": {"ops_per_sec": 900.0, "alloc_kb": 10.0}})
+
+    def test_compare_ignores_cases_without_baseline(self):
+        self.assertEqual(compare({"new": {"ops_per_sec": 1.0, "alloc_kb": 1.0}}, {}, 0.25), [])
+
+    def test_save_merges_baselines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baselines.json")
+            save_baselines(path, {"a": {"ops_per_sec": 1.0, "alloc_kb": 1.0}})
+            save_baselines(path, {"b": {"ops_per_sec": 2.0, "alloc_kb": 2.0}})
+
+            self.assertEqual(set(load_baselines(path)), {"a", "b"})
+            with open(path, "r", encoding="utf-8") as file:
+                self.assertIn("python", json.load(file))
+
+    def test_committed_baselines_cover_every_case(self):
+        self.assertEqual(set(load_baselines(BASELINES_PATH)), set(CASES))
+
+    def test_measure(self):
+        result = measure(lambda: [0] * 1000, 1)
+
+        self.assertGreater(result["ops_per_sec"], 0)
+        self.assertGreater(result["alloc_kb"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
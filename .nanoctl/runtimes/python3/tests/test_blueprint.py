@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core.nanoservice import NanoService
+from core.types.context import Context
+from core.types.nanoservice_response import NanoServiceResponse
+from core.util.blueprint import BlueprintPlan, PlanCache
+from core.util.mapper import Mapper
+
+class TestBlueprintPlan(unittest.TestCase):
+    def setUp(self):
+        self.mapper = Mapper()
+        self.config = {
+            "name": "get-countries",
+            "inputs": {
+                "url": "https://example.com/${path}",
+                "method": "GET",
+                "headers": {"Content-Type": "application/json"},
+                "items": ["${not_mapped}"],
+            },
+        }
+
+    def test_analyze_records_dynamic_paths_only(self):
+        plan = BlueprintPlan(self.config)
+        self.assertEqual(plan.tree, {"inputs": {"url": None}})
+
+    def test_resolve_shares_static_branches(self):
+        plan = BlueprintPlan(self.config)
+        result = plan.resolve(self.config, {}, {"path": "countries"}, self.mapper)
+
+        self.assertEqual(result["inputs"]["url"], "https://example.com/countries")
+        self.assertEqual(self.config["inputs"]["url"], "https://example.com/${path}")
+        self.assertIsNot(result["inputs"], self.config["inputs"])
+        self.assertIs(result["inputs"]["headers"], self.config["inputs"]["headers"])
+        self.assertIs(result["inputs"]["items"], self.config["inputs"]["items"])
+
+    def test_static_config_is_returned_as_is(self):
+        config = {"inputs": {"url": "https://example.com", "method": "GET"}}
+        plan = BlueprintPlan(config)
+        self.assertTrue(plan.is_static())
+        self.assertIs(plan.resolve(config, {}, {}, self.mapper), config)
+
+    def test_plan_cache_key(self):
+        cache = PlanCache(maxsize=4)
+        first = cache.plan("workflow", "step", self.config)
+        second = cache.plan("workflow", "step", dict(self.config))
+        other = cache.plan("workflow", "other-step", self.config)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_changed_step_config_replaces_its_own_plan(self):
+        cache = PlanCache(maxsize=2)
+        other = cache.plan("workflow", "other-step", self.config)
+        for index in range(5):
+            config = {"inputs": {"url": "https://example.com/${path}", "rows": [index]}}
+            cache.plan("workflow", "step", config)
+
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertIs(cache.plan("workflow", "other-step", self.config), other)
+
+class TestResolveOnce(unittest.TestCase):
+    def test_process_and_run_resolve_the_config_once(self):
+        class Step(NanoService):
+            async def handle(self, ctx, inputs):
+                response = NanoServiceResponse()
+                response.data = inputs
+                return response
+
+        ctx = Context()
+        ctx.config = {"url": "https://example.com/${path}"}
+        ctx.request = {"body": {"path": "countries"}}
+        node = Step().bind(ctx.config)
+
+        with patch.object(Step, "resolveBlueprint", wraps=node.resolveBlueprint) as resolve:
+            response = asyncio.run(node.process(ctx))
+
+        self.assertEqual(resolve.call_count, 1)
+        self.assertEqual(response.data, {"url": "https://example.com/countries"})
+        self.assertEqual(node.originalConfig, {"url": "https://example.com/${path}"})
+
+if __name__ == '__main__':
+    unittest.main()
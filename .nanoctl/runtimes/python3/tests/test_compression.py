@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import os
+import unittest
+import zlib
+from util.compression import CompressionPolicy, bytes_saved_counter, cpu_histogram, decompress, parse_accept, skipped_counter
+
+class TestCompression(unittest.TestCase):
+    def test_parse_accept(self):
+        self.assertEqual(parse_accept("gzip;level=9, br, DEFLATE"), [("gzip", 9), ("deflate", None)])
+        self.assertEqual(parse_accept("gzip;level=42"), [("gzip", 9)])
+        self.assertEqual(parse_accept(""), [])
+        self.assertEqual(parse_accept(None), [])
+
+    def test_choose_follows_caller_order_and_size(self):
+        policy = CompressionPolicy(level=6, fast_bytes=1000, codecs=("gzip", "deflate"))
+
+        self.assertEqual(policy.choose([("deflate", None), ("gzip", None)], 10), ("deflate", 6))
+        self.assertEqual(policy.choose([("gzip", None)], 5000), ("gzip", 1))
+        self.assertEqual(policy.choose([("gzip", 9)], 5000), ("gzip", 9))
+        self.assertIsNone(CompressionPolicy(codecs=("gzip",)).choose([("deflate", None)], 10))
+
+    def test_compress_above_threshold(self):
+        policy = CompressionPolicy(min_bytes=100)
+        data = b"repeated text " * 100
+        saved = bytes_saved_counter.value("node", "gzip")
+        samples = cpu_histogram.value("gzip").count
+
+        compressed, codec = asyncio.run(policy.compress("node", data, [("gzip", None)]))
+
+        self.assertEqual(codec, "gzip")
+        self.assertEqual(gzip.decompress(compressed), data)
+        self.assertEqual(bytes_saved_counter.value("node", "gzip") - saved, len(data) - len(compressed))
+        self.assertEqual(cpu_histogram.value("gzip").count - samples, 1)
+
+    def test_small_or_incompressible_bodies_are_sent_as_is(self):
+        policy = CompressionPolicy(min_bytes=100)
+        below = skipped_counter.value("node", "below_threshold")
+        not_smaller = skipped_counter.value("node", "not_smaller")
+        noise = os.urandom(1000)
+
+        self.assertEqual(asyncio.run(policy.compress("node", b"tiny", [("gzip", None)])), (b"tiny", ""))
+        self.assertEqual(asyncio.run(policy.compress("node", noise, [("gzip", None)])), (noise, ""))
+        self.assertEqual(asyncio.run(policy.compress("node", noise, [])), (noise, ""))
+        self.assertEqual(skipped_counter.value("node", "below_threshold") - below, 1)
+        self.assertEqual(skipped_counter.value("node", "not_smaller") - not_smaller, 1)
+
+    def test_large_bodies_are_compressed_off_the_loop(self):
+        policy = CompressionPolicy(min_bytes=10, offload_bytes=1000)
+        data = b"a" * 100000
+
+        compressed, codec = asyncio.run(policy.compress("node", data, [("deflate", 1)]))
+
+        self.assertEqual(codec, "deflate")
+        self.assertEqual(zlib.decompress(compressed), data)
+
+    def test_parts_share_one_codec(self):
+        policy = CompressionPolicy(min_bytes=100)
+        parts = [b"tiny", b"repeated text " * 100]
+
+        compressed, codec = asyncio.run(policy.compress_parts("node", parts, [("deflate", None)]))
+
+        self.assertEqual(codec, "deflate")
+        self.assertEqual([zlib.decompress(part) for part in compressed], parts)
+        self.assertEqual(asyncio.run(policy.compress_parts("node", [b"tiny", b"small"], [("deflate", None)])), ([b"tiny", b"small"], ""))
+
+    def test_decompress_rejects_unknown_codec(self):
+        self.assertEqual(decompress(zlib.compress(b"data"), "deflate"), b"data")
+        with self.assertRaises(ValueError):
+            decompress(b"data", "br")
+
+    def test_decompress_caps_the_inflated_size(self):
+        bomb = gzip.compress(b"\0" * 1000000)
+        self.assertEqual(len(decompress(bomb, "gzip", max_bytes=1000000)), 1000000)
+        with self.assertRaises(ValueError):
+            decompress(bomb, "gzip", max_bytes=1000)
+        with self.assertRaises(ValueError):
+            decompress(zlib.compress(b"data")[:-4], "deflate")
+        with self.assertRaises(ValueError):
+            decompress(b"not deflate", "deflate")
+
+    def test_large_bodies_are_inflated_off_the_loop(self):
+        policy = CompressionPolicy(max_decompressed_bytes=1000, decompress_offload_bytes=10)
+        body = zlib.compress(b"a" * 1000)
+        threads = []
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            run_in_executor = loop.run_in_executor
+            loop.run_in_executor = lambda *args: threads.append(args) or run_in_executor(*args)
+            data = await policy.decompress(body, "deflate")
+            with self.assertRaises(ValueError):
+                await policy.decompress(zlib.compress(b"a" * 1001), "deflate")
+            return data
+
+        self.assertEqual(asyncio.run(scenario()), b"a" * 1000)
+        self.assertEqual(len(threads), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import copy
+import pickle
+import unittest
+from core.types.context import LAZY_SECTIONS, Context
+from util.message_manager import context_sections, encode_sections, json_loads
+
+class CountingDecoder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, data):
+        self.calls += 1
+        return json_loads(data)
+
+class TestContext(unittest.TestCase):
+    def test_sections_decode_once_on_first_read(self):
+        decode = CountingDecoder()
+        ctx = Context()
+        ctx.setRawSection("env", b'{"PORT": "4000"}', decode)
+
+        self.assertEqual(decode.calls, 0)
+        self.assertEqual(ctx.getRawSection("env"), b'{"PORT": "4000"}')
+        self.assertEqual(ctx.env["PORT"], "4000")
+        self.assertEqual(ctx.env["PORT"], "4000")
+        self.assertEqual(decode.calls, 1)
+        self.assertIsNone(ctx.getRawSection("env"))
+
+    def test_assignment_replaces_raw_section(self):
+        ctx = Context()
+        ctx.setRawSection("vars", b'{"a": 1}', json_loads)
+
+        ctx.vars = {"b": 2}
+
+        self.assertEqual(ctx.vars, {"b": 2})
+        self.assertIsNone(ctx.getRawSection("vars"))
+
+    def test_slots_and_extra_attributes(self):
+        ctx = Context()
+        self.assertIn("id", Context.__slots__)
+
+        ctx.custom = "value"
+
+        self.assertEqual(ctx.custom, "value")
+
+    def test_copy_and_pickle_keep_raw_sections(self):
+        ctx = Context()
+        ctx.id = "1"
+        ctx.setRawSection("request", b'{"body": {"x": 1}}', json_loads)
+
+        clone = pickle.loads(pickle.dumps(copy.copy(ctx)))
+
+        self.assertEqual(clone.id, "1")
+        self.assertEqual(clone.getRawSection("request"), b'{"body": {"x": 1}}')
+        self.assertEqual(clone.request["body"]["x"], 1)
+
+    def test_encode_sections_and_passthrough(self):
+        message = {"id": "1", "config": {}, "env": {"A": "1"}, "vars": {"v": 1}}
+
+        rest, sections = encode_sections(message, "JSON")
+
+        self.assertEqual(rest, {"id": "1", "config": {}})
+        self.assertEqual(set(sections), {"env", "vars"})
+        self.assertTrue(set(sections) <= set(LAZY_SECTIONS))
+
+        ctx = Context()
+        ctx.setRawSection("env", sections["env"], json_loads)
+        ctx.setRawSection("vars", sections["vars"], json_loads)
+        ctx.vars["v"] = 2
+
+        result = context_sections(ctx, ["env", "vars", "unknown"], "JSON")
+
+        self.assertIs(result["env"], sections["env"])
+        self.assertEqual(json_loads(result["vars"]), {"v": 2})
+        self.assertNotIn("unknown", result)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import threading
+import unittest
+from core.executors import INLINE, PROCESS, THREAD, ExecutorPool, portable
+from core.nanoservice import NanoService
+from core.types.context import Context
+from core.types.nanoservice_response import NanoServiceResponse
+
+class WhereNode(NanoService):
+    async def handle(self, ctx, inputs):
+        response = NanoServiceResponse()
+        response.setSuccess({
+            "pid": os.getpid(),
+            "thread": threading.get_ident(),
+            "name": self.name,
+            "value": inputs["value"],
+            "logger": ctx.logger is None,
+        })
+        return response
+
+def create_context(value):
+    ctx = Context()
+    ctx.config = {"value": value}
+    ctx.logger = threading.Lock()
+    return ctx
+
+class TestExecutorPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ExecutorPool(thread_workers=2, process_workers=1, start_method="spawn")
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def run_mode(self, mode):
+        node = WhereNode()
+        node.name = "where"
+
+        async def scenario():
+            ctx = create_context(3)
+            return await self.pool.run(mode, node, "handle", ctx, ctx.config), threading.get_ident()
+
+        result, loop_thread = asyncio.run(scenario())
+        return result.data, loop_thread
+
+    def test_inline_runs_on_the_event_loop(self):
+        data, loop_thread = self.run_mode(INLINE)
+        self.assertEqual(data["pid"], os.getpid())
+        self.assertEqual(data["thread"], loop_thread)
+
+    def test_thread_mode_leaves_the_event_loop(self):
+        data, loop_thread = self.run_mode(THREAD)
+        self.assertEqual(data["pid"], os.getpid())
+        self.assertNotEqual(data["thread"], loop_thread)
+
+    def test_process_mode_runs_in_a_worker_process(self):
+        data, _ = self.run_mode(PROCESS)
+        self.assertNotEqual(data["pid"], os.getpid())
+        self.assertEqual(data["name"], "where")
+        self.assertEqual(data["value"], 3)
+        self.assertTrue(data["logger"])
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.run_mode("gpu")
+
+    def test_stream_relays_items_from_a_thread(self):
+        def produce(count):
+            for index in range(count):
+                yield (index, threading.get_ident())
+
+        async def scenario():
+            return threading.get_ident(), [item async for item in self.pool.stream(produce, 20)]
+
+        loop_thread, items = asyncio.run(scenario())
+        self.assertEqual([index for index, _ in items], list(range(20)))
+        self.assertTrue(all(thread != loop_thread for _, thread in items))
+
+    def test_stream_errors_and_early_exit(self):
+        produced = []
+
+        def failing():
+            yield 1
+            raise RuntimeError("render failed")
+
+        def endless():
+            while True:
+                produced.append(len(produced))
+                yield produced[-1]
+
+        async def scenario():
+            with self.assertRaises(RuntimeError):
+                async for _ in self.pool.stream(failing):
+                    pass
+
+            stream = self.pool.stream(endless)
+            async for item in stream:
+                if item == 2:
+                    break
+            await stream.aclose()
+
+        asyncio.run(scenario())
+        # The producer stopped shortly after the consumer left, bounded by the queue
+        self.assertLess(len(produced), 20)
+
+    def test_portable_strips_loggers_without_touching_the_original(self):
+        ctx = create_context(1)
+        copies = portable([ctx])
+        self.assertIsNone(copies[0].logger)
+        self.assertIsNotNone(ctx.logger)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import base64
+import os
+import re
+import tempfile
+import unittest
+from core.types.context import Context
+from nodes.generate_pdf.document import render_report
+from nodes.generate_pdf.node import GeneratePDF
+
+def sales_data(rows):
+    return [{"product": f"Product {index}", "quantity": index, "price": 1.5, "total": 1.5 * index} for index in range(rows)]
+
+def xref_offsets(pdf):
+    start = int(pdf.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+    lines = pdf[start:].split(b"\n")
+    count = int(lines[1].split()[1])
+    return [int(line.split()[0]) for line in lines[3:2 + count]]
+
+class TestGeneratePDF(unittest.TestCase):
+    def setUp(self):
+        self.node = GeneratePDF()
+        self.node.name = "generate-pdf"
+
+    def handle(self, inputs):
+        return asyncio.run(self.node.handle(Context(), inputs))
+
+    def test_renders_in_memory_without_touching_the_filesystem(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                response = self.handle({"title": "Report", "sales_data": sales_data(5)})
+                self.assertEqual(os.listdir(directory), [])
+            finally:
+                os.chdir(cwd)
+
+        self.assertTrue(response.success)
+        self.assertTrue(base64.b64decode(response.data["pdf_base64"]).startswith(b"%PDF-"))
+
+    def test_binary_output(self):
+        response = self.handle({"title": "Report", "sales_data": sales_data(5), "output": "binary"})
+        self.assertTrue(response.data.startswith(b"%PDF-"))
+        self.assertTrue(response.data.endswith(b"%%EOF\n"))
+
+    def test_large_tables_are_streamed_page_by_page(self):
+        chunks = list(render_report("Report", sales_data(500)))
+        pdf = b"".join(chunks)
+
+        self.assertGreater(len(chunks), 10)
+        # Every cross reference entry points at its object, across chunk boundaries
+        for number, offset in enumerate(xref_offsets(pdf), start=1):
+            self.assertTrue(pdf[offset:].startswith(f"{number} 0 obj".encode()), number)
+
+    def test_stream_matches_the_buffered_document(self):
+        async def collect():
+            return [chunk async for chunk in self.node.handle_stream(Context(), {"title": "Report", "sales_data": sales_data(100)})]
+
+        streamed = b"".join(asyncio.run(collect()))
+        buffered = self.handle({"title": "Report", "sales_data": sales_data(100), "output": "binary"}).data
+        strip = lambda pdf: re.sub(rb"D:\d+", b"", pdf)
+        self.assertEqual(strip(streamed), strip(buffered))
+
+    def test_event_loop_stays_responsive_while_a_large_report_streams(self):
+        async def scenario():
+            ticks = 0
+            streaming = True
+
+            async def ticker():
+                nonlocal ticks
+                while streaming:
+                    await asyncio.sleep(0.001)
+                    ticks += 1
+
+            task = asyncio.ensure_future(ticker())
+            seen = []
+            async for chunk in self.node.handle_stream(Context(), {"title": "Report", "sales_data": sales_data(20000)}):
+                seen.append(ticks)
+            streaming = False
+            await task
+            return seen
+
+        seen = asyncio.run(scenario())
+        self.assertGreater(len(seen), 1)
+        # A render blocking the loop leaves no room for the ticker between the first and last chunk
+        self.assertGreaterEqual(seen[-1] - seen[0], 5)
+
+    def test_invalid_rows_are_reported(self):
+        response = self.handle({"title": "Report", "sales_data": [{"product": "missing fields"}]})
+        self.assertFalse(response.success)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web # type: ignore
+from aiohttp.test_utils import TestServer # type: ignore
+from util.http_pool import HttpPool, connections_counter, sessions_gauge
+
+async def hello(request: web.Request) -> web.Response:
+    return web.json_response({"hello": "world"})
+
+class TestHttpPool(unittest.TestCase):
+    def test_session_is_shared_and_connections_are_reused(self):
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/", hello)
+            pool = HttpPool(limit=10, limit_per_host=2, resolver="threaded")
+
+            async with TestServer(app) as server:
+                await pool.start()
+                self.assertIs(pool.session(), pool.session())
+
+                for _ in range(3):
+                    async with pool.session().get(server.make_url("/")) as resp:
+                        self.assertEqual(await resp.json(), {"hello": "world"})
+
+                stats = pool.stats()
+                await pool.close()
+                return stats
+
+        created = connections_counter.value("created")
+        stats = asyncio.run(scenario())
+        self.assertEqual(stats["connections_created"], 1)
+        self.assertEqual(stats["connections_reused"], 2)
+        self.assertEqual(stats["requests"], 0)
+        self.assertEqual(stats["limit_per_host"], 2)
+        self.assertEqual(connections_counter.value("created") - created, 1)
+
+    def test_close_resets_the_session(self):
+        before = sessions_gauge.value()
+
+        async def scenario():
+            pool = HttpPool(resolver="threaded")
+            session = pool.session()
+            await pool.close()
+            return session, pool.stats()
+
+        session, stats = asyncio.run(scenario())
+        self.assertTrue(session.closed)
+        self.assertEqual(stats["sessions"], 0)
+        self.assertEqual(sessions_gauge.value(), before)
+
+    def test_each_loop_keeps_its_own_session(self):
+        pool = HttpPool(resolver="threaded")
+
+        async def first():
+            return pool.session()
+
+        async def second():
+            session = pool.session()
+            # Let the stale session of the first loop finish closing
+            await asyncio.sleep(0)
+            return session, pool.stats()
+
+        async def in_thread_loop():
+            return pool.session()
+
+        old = asyncio.run(first())
+        new, stats = asyncio.run(second())
+
+        self.assertIsNot(old, new)
+        self.assertTrue(old.closed)
+        self.assertFalse(new.closed)
+        self.assertEqual(stats["sessions"], 1)
+
+        async def main_loop():
+            session = pool.session()
+            with ThreadPoolExecutor(1) as executor:
+                other = await asyncio.get_running_loop().run_in_executor(executor, asyncio.run, in_thread_loop())
+            # The worker loop did not replace the session of this loop
+            self.assertIs(pool.session(), session)
+            self.assertIsNot(other, session)
+            await pool.close()
+            return session, other
+
+        session, other = asyncio.run(main_loop())
+        self.assertTrue(session.closed)
+        self.assertTrue(other.closed)
+        self.assertEqual(pool.stats()["sessions"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import unittest
+import aiohttp # type: ignore
+import grpc.aio # type: ignore
+import gen.node_pb2_grpc as node_pb2_grpc
+from loadtest.run import Recorder, closed_loop, drive, load_payload, open_loop, payload_names, percentile
+from loadtest.upstream import Upstream
+from server import NodeService
+from util.http_pool import http_pool
+
+class TestLoadTest(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile(values, 100), 100.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_summary_counts_errors(self):
+        recorder = Recorder()
+        recorder.latencies = [0.001, 0.002, 0.003, 0.004]
+        recorder.errors["UNAVAILABLE"] = 1
+
+        summary = recorder.summary(2.0)
+
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["throughput_rps"], 2.0)
+        self.assertEqual(summary["latency_ms"]["p50"], 2.0)
+        self.assertEqual(summary["latency_ms"]["max"], 4.0)
+
+    def test_closed_loop_keeps_concurrency(self):
+        running = []
+        peak = []
+
+        async def call():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.005)
+            running.pop()
+            return None
+
+        recorder = Recorder()
+        asyncio.run(closed_loop(call, recorder, 4, 0.1))
+
+        self.assertEqual(max(peak), 4)
+        self.assertGreater(len(recorder.latencies), 4)
+
+    def test_open_loop_sends_at_rate_and_drops_over_limit(self):
+        async def call():
+            await asyncio.sleep(0.2)
+            return "node_error"
+
+        recorder = Recorder()
+        asyncio.run(open_loop(call, recorder, 100, 0.2, 5))
+
+        self.assertEqual(len(recorder.latencies), 5)
+        self.assertEqual(recorder.dropped, 15)
+        self.assertEqual(recorder.errors["node_error"], 5)
+
+    def test_recorded_payloads(self):
+        self.assertEqual(payload_names(), ["api_call", "generate-pdf", "generate-sentiment"])
+
+        context = load_payload("api_call", "http://127.0.0.1:9999")
+
+        self.assertEqual(context["config"]["url"], "http://127.0.0.1:9999/api/v0.1/countries/capital")
+
+    def test_upstream_latency_and_size(self):
+        async def run():
+            upstream = Upstream(latency_ms=0, payload_bytes=4096)
+            await upstream.start()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{upstream.url}/any/path") as response:
+                        default = await response.read()
+                    async with session.get(f"{upstream.url}/?size=100&latency_ms=30") as response:
+                        small = await response.read()
+            finally:
+                await upstream.close()
+            return default, small, upstream.requests
+
+        default, small, requests = asyncio.run(run())
+
+        self.assertGreaterEqual(len(default), 4096)
+        self.assertLess(len(default), 4096 + 200)
+        self.assertIn("data", json.loads(small))
+        self.assertEqual(requests, 2)
+
+    def test_drive_api_call_over_grpc(self):
+        async def run():
+            upstream = Upstream(latency_ms=1)
+            await upstream.start()
+            server = grpc.aio.server()
+            node_pb2_grpc.add_NodeServiceServicer_to_server(NodeService(), server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            await server.start()
+            try:
+                context = load_payload("api_call", upstream.url)
+                return await drive(f"127.0.0.1:{port}", "api_call", context, concurrency=2, duration=0.3, warmup=0)
+            finally:
+                await server.stop(None)
+                await upstream.close()
+                await http_pool.close()
+
+        result = asyncio.run(run())
+
+        self.assertEqual(result["mode"], "concurrency")
+        self.assertGreater(result["requests"], 0)
+        self.assertEqual(result["errors"], 0)
+        self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import base64
+import io
+import json
+import logging
+import unittest
+from core.util.logger import Logger, LogPipeline, Sampler, dropped_counter
+from core.util.mapper import Mapper
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        Expensive.formatted = 0
+        self.stream = io.StringIO()
+
+    def start(self, level="DEBUG", sampler=None, log_format="json", queue_size=100):
+        pipeline = LogPipeline(level, log_format, queue_size, self.stream, sampler or Sampler({}, burst=0))
+        pipeline.start()
+        self.addCleanup(pipeline.stop)
+        return pipeline
+
+    def lines(self, pipeline):
+        pipeline.stop()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_carry_fields(self):
+        pipeline = self.start()
+
+        Logger().bind(id="abc").info("Executed node %s", "echo", node="echo", duration_ms=1.5)
+
+        [line] = self.lines(pipeline)
+        self.assertEqual(line["msg"], "Executed node echo")
+        self.assertEqual(line["level"], "INFO")
+        self.assertEqual(line["id"], "abc")
+        self.assertEqual(line["node"], "echo")
+        self.assertEqual(line["duration_ms"], 1.5)
+
+    def test_disabled_levels_are_never_formatted(self):
+        pipeline = self.start(level="INFO")
+
+        Logger().debug("Running node %s", Expensive(), config=Expensive())
+
+        self.assertEqual(self.lines(pipeline), [])
+        self.assertEqual(Expensive.formatted, 0)
+
+    def test_formatting_happens_in_the_writer(self):
+        pipeline = LogPipeline("DEBUG", "json", 100, self.stream, Sampler({}, burst=0))
+        pipeline.start()
+        pipeline._listener.stop()
+
+        Logger().info("value %s", Expensive())
+        self.assertEqual(Expensive.formatted, 0)
+
+        pipeline._listener.start()
+        [line] = self.lines(pipeline)
+        self.assertEqual(line["msg"], "value expensive")
+        self.assertEqual(Expensive.formatted, 1)
+
+    def test_sampling_per_level(self):
+        pipeline = self.start(sampler=Sampler({logging.INFO: 0.0}, burst=0))
+        dropped = dropped_counter.value("sampled")
+
+        for _ in range(5):
+            Logger().info("sampled away")
+        Logger().warning("kept")
+
+        self.assertEqual([line["msg"] for line in self.lines(pipeline)], ["kept"])
+        self.assertEqual(dropped_counter.value("sampled") - dropped, 5)
+
+    def test_repeated_errors_are_rate_limited(self):
+        now = [0.0]
+        pipeline = self.start(sampler=Sampler({}, burst=2, window=10, clock=lambda: now[0]))
+        logger = Logger()
+        fail = lambda: logger.error("upstream failed", node="api_call")
+
+        for _ in range(5):
+            fail()
+        logger.error("another call site")
+        now[0] = 11.0
+        fail()
+
+        lines = self.lines(pipeline)
+        self.assertEqual([line["msg"] for line in lines], ["upstream failed", "upstream failed", "another call site", "upstream failed"])
+        self.assertEqual(lines[-1]["suppressed"], 3)
+
+    def test_full_queue_drops_records(self):
+        pipeline = self.start(queue_size=2)
+        pipeline._listener.stop()
+        dropped = dropped_counter.value("queue_full")
+
+        for index in range(4):
+            Logger().info("record %s", index)
+
+        self.assertEqual(dropped_counter.value("queue_full") - dropped, 2)
+        pipeline._listener.start()
+        self.assertEqual([line["msg"] for line in self.lines(pipeline)], ["record 0", "record 1"])
+
+    def test_error_with_stack_and_exception(self):
+        pipeline = self.start()
+        logger = Logger()
+
+        logger.error("node failed", stack="Traceback ...", node="pdf")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("handler crashed")
+
+        first, second = self.lines(pipeline)
+        self.assertEqual(first["stack"], "Traceback ...")
+        self.assertIn("ValueError: boom", second["exc"])
+
+    def test_text_format(self):
+        pipeline = self.start(log_format="text")
+
+        Logger().info("Executed node %s", "echo", id="abc")
+
+        pipeline.stop()
+        self.assertRegex(self.stream.getvalue(), r"INFO +nanoservice Executed node echo id=abc")
+
+    def test_logger_context_interface(self):
+        self.start()
+        logger = Logger(keep=2)
+
+        logger.log("first")
+        logger.logLevel("warning", "second %s", 2)
+        logger.error("third", stack="trace")
+
+        self.assertEqual(logger.getLogs(), ["WARNING second 2", "ERROR third"])
+        self.assertEqual(logger.getLogsAsText(), "WARNING second 2\nERROR third")
+        self.assertEqual(base64.b64decode(logger.getLogsAsBase64()).decode("utf-8"), logger.getLogsAsText())
+
+    def test_mapper_errors_are_logged(self):
+        pipeline = self.start()
+
+        Mapper().replace_string("${missing.value}", {}, {})
+
+        [line] = self.lines(pipeline)
+        self.assertEqual(line["level"], "WARNING")
+        self.assertEqual(line["placeholder"], "missing.value")
+
+if __name__ == "__main__":
+    unittest.main()
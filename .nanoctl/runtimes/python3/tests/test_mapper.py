@@ -1,9 +1,9 @@
 import unittest
-from core.util.mapper import Mapper
+from core.util.mapper import Mapper, TemplateCache
 
 class TestMapper(unittest.TestCase):
     def setUp(self):
-        self.mapper = Mapper()
+        self.mapper = Mapper(TemplateCache(maxsize=2))
 
     def test_replace_object_strings(self):
         obj = {
@@ -47,5 +47,33 @@ class TestMapper(unittest.TestCase):
         result = self.mapper.js_mapper(str_, ctx, data)
         self.assertEqual(result, "no_js_prefix")
 
+    def test_replace_string_failed_placeholder_is_kept(self):
+        result = self.mapper.replace_string("a ${missing[} b", {}, {})
+        self.assertEqual(result, "a ${missing[} b")
+
+    def test_template_cache_hits(self):
+        data = {"replace_me": "replaced_value"}
+        self.mapper.replace_string("${replace_me}!", {}, data)
+        result = self.mapper.replace_string("${replace_me}!", {}, {"replace_me": "other"})
+        self.assertEqual(result, "other!")
+
+        stats = self.mapper.cache_stats()
+        self.assertEqual(stats["templates"]["misses"], 1)
+        self.assertEqual(stats["templates"]["hits"], 1)
+
+    def test_template_cache_evictions(self):
+        for str_data in ["a", "b", "c"]:
+            self.mapper.replace_string(str_data, {}, {})
+
+        stats = self.mapper.cache_stats()
+        self.assertEqual(stats["templates"]["size"], 2)
+        self.assertEqual(stats["templates"]["evictions"], 1)
+
+    def test_run_js_reuses_compiled_expression(self):
+        self.mapper.run_js("data['key'] * 2", {}, {"key": 1})
+        result = self.mapper.run_js("data['key'] * 2", {}, {"key": 4})
+        self.assertEqual(result, 8)
+        self.assertEqual(self.mapper.cache_stats()["expressions"]["hits"], 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
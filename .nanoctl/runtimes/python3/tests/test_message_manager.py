@@ -0,0 +1,71 @@
+import base64
+import json
+import unittest
+import gen.node_pb2 as node_pb2
+from util.message_manager import codecs, decode_message, encode_message, encode_payload, get_codec, register_codec
+
+class TestMessageManager(unittest.TestCase):
+    def test_decode_base64_json(self):
+        message = base64.b64encode(json.dumps({"key": "value"}).encode("utf-8")).decode("utf-8")
+        request = node_pb2.NodeRequest(Name="node", Message=message, Encoding="BASE64", Type="JSON")
+        self.assertEqual(decode_message(request), {"key": "value"})
+
+    def test_decode_raw_json(self):
+        request = node_pb2.NodeRequest(Name="node", Payload=b'{"key": "value"}', Encoding="RAW", Type="JSON")
+        self.assertEqual(decode_message(request), {"key": "value"})
+
+    def test_decode_raw_text(self):
+        request = node_pb2.NodeRequest(Name="node", Payload="héllo".encode("utf-8"), Encoding="RAW", Type="TEXT")
+        self.assertEqual(decode_message(request), "héllo")
+
+    def test_decode_raw_binary(self):
+        request = node_pb2.NodeRequest(Name="node", Payload=b"%PDF-1.3\x00\xff", Encoding="RAW", Type="BINARY")
+        self.assertEqual(decode_message(request), b"%PDF-1.3\x00\xff")
+
+    def test_encode_message_base64_json(self):
+        encoded = encode_message({"key": "value"}, "JSON")
+        self.assertEqual(json.loads(base64.b64decode(encoded)), {"key": "value"})
+
+    def test_encode_payload(self):
+        self.assertEqual(json.loads(encode_payload({"key": "value"}, "JSON")), {"key": "value"})
+        self.assertEqual(encode_payload(b"\x00\x01", "BINARY"), b"\x00\x01")
+        self.assertEqual(encode_payload("text", "TEXT"), b"text")
+
+    def test_raw_round_trip(self):
+        payload = encode_payload({"items": [1, 2, 3]}, "JSON")
+        response = node_pb2.NodeResponse(Payload=payload, Encoding="RAW", Type="JSON")
+        self.assertEqual(decode_message(response), {"items": [1, 2, 3]})
+
+    def test_unsupported_encoding(self):
+        request = node_pb2.NodeRequest(Name="node", Message="", Encoding="HEX", Type="JSON")
+        with self.assertRaises(ValueError):
+            decode_message(request)
+
+    def test_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            get_codec("YAML")
+
+    def test_register_codec(self):
+        register_codec("REVERSED", lambda message: message[::-1], lambda message: message.decode("utf-8")[::-1])
+        try:
+            payload = encode_payload("abc", "REVERSED")
+            request = node_pb2.NodeRequest(Payload=payload, Encoding="RAW", Type="REVERSED")
+            self.assertEqual(decode_message(request), "abc")
+        finally:
+            del codecs["REVERSED"]
+
+    def test_structured_codecs_round_trip(self):
+        message = {"id": "1", "items": [1, 2.5, None, True], "nested": {"key": "value"}}
+        for message_type in ["JSON", "MSGPACK", "CBOR"]:
+            if message_type not in codecs:
+                continue
+
+            with self.subTest(message_type=message_type):
+                raw = node_pb2.NodeRequest(Payload=encode_payload(message, message_type), Encoding="RAW", Type=message_type)
+                self.assertEqual(decode_message(raw), message)
+
+                encoded = node_pb2.NodeRequest(Message=encode_message(message, message_type), Encoding="BASE64", Type=message_type)
+                self.assertEqual(decode_message(encoded), message)
+
+if __name__ == '__main__':
+    unittest.main()
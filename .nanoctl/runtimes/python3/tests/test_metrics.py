@@ -0,0 +1,72 @@
+import asyncio
+import socket
+import unittest
+from unittest.mock import patch
+import aiohttp # type: ignore
+from core.util import metrics
+from core.util.metrics import MetricsRegistry, observe_phase, phase_histogram, render_prometheus
+from util.metrics_server import MetricsServer
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class TestPrometheusExposition(unittest.TestCase):
+    def test_render_counters_gauges_and_histograms(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests", ("node",)).inc('say "hi"')
+        registry.gauge("queue_depth", "Queue depth").set(3)
+        histogram = registry.histogram("latency_seconds", "Latency", ("node",), (0.1, 1.0))
+        histogram.observe(0.05, "pdf")
+        histogram.observe(0.5, "pdf")
+        histogram.observe(2, "pdf")
+
+        text = render_prometheus(registry)
+        self.assertIn("# TYPE requests_total counter\nrequests_total{node=\"say \\\"hi\\\"\"} 1\n", text)
+        self.assertIn("# TYPE queue_depth gauge\nqueue_depth 3\n", text)
+        self.assertIn('latency_seconds_bucket{node="pdf",le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{node="pdf",le="1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{node="pdf",le="+Inf"} 3\n', text)
+        self.assertIn('latency_seconds_sum{node="pdf"} 2.55\n', text)
+        self.assertIn('latency_seconds_count{node="pdf"} 3\n', text)
+
+class TestPhaseMetrics(unittest.TestCase):
+    def test_phases_are_not_recorded_when_disabled(self):
+        with patch.object(metrics, "METRICS_ENABLED", False):
+            observe_phase("disabled-node", "handle", 0.0)
+        self.assertEqual(phase_histogram.value("disabled-node", "handle").count, 0)
+
+    def test_phases_are_recorded_when_enabled(self):
+        with patch.object(metrics, "METRICS_ENABLED", True):
+            end = observe_phase("enabled-node", "handle", 0.0)
+        self.assertGreater(end, 0.0)
+        self.assertEqual(phase_histogram.value("enabled-node", "handle").count, 1)
+
+class TestMetricsServer(unittest.TestCase):
+    def test_scrape_endpoint(self):
+        port = free_port()
+        metrics.registry.counter("metrics_server_test_total", "Scrape test").inc()
+
+        async def scenario():
+            server = MetricsServer(port, host="127.0.0.1")
+            await server.start()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                        return response.status, response.headers["Content-Type"], await response.text()
+            finally:
+                await server.close()
+
+        status, content_type, body = asyncio.run(scenario())
+        self.assertEqual(status, 200)
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn("metrics_server_test_total 1", body)
+
+    def test_disabled_server_does_not_listen(self):
+        server = MetricsServer(0)
+        asyncio.run(server.start())
+        self.assertIsNone(server._runner)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -54,6 +54,15 @@ class TestNanoServiceMethods(unittest.TestCase):
         with self.assertRaises(ValidationError):
             asyncio.run(self.service.run(self.ctx))
 
+    def test_stream_hook_is_optional(self):
+        class Streaming(TestNanoService):
+            async def handle_stream(self, ctx, inputs):
+                yield b"chunk"
+
+        self.assertIsNone(self.service.handle_stream)
+        self.assertFalse(self.service.supportsStream())
+        self.assertTrue(Streaming().supportsStream())
+
     def test_validate_success(self):
         schema = {"type": "object", "properties": {"name": {"type": "string"}}}
         obj = {"name": "test"}
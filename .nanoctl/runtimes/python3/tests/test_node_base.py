@@ -41,6 +41,19 @@ class NodeBaseTest(unittest.TestCase):
             asyncio.run(self.node.process(self.ctx))
         self.assertEqual(str(context.exception), "Error occurred")
 
+    def test_bind_copies_invocation_state(self):
+        config = {'name': 'step', 'node': 'test-node', 'active': False, 'set_var': True}
+        bound = self.node.bind(config)
+
+        self.assertIsInstance(bound, TestNodeBase)
+        self.assertIsNot(bound, self.node)
+        self.assertIs(bound.definition, self.node)
+        self.assertEqual((bound.name, bound.node, bound.active, bound.set_var), ('step', 'test-node', False, True))
+        self.assertIs(bound.originalConfig, config)
+        # The shared definition is left untouched
+        self.assertEqual((self.node.name, self.node.node, self.node.active), ('', '', True))
+        self.assertIs(self.node.bind({}).definition, self.node)
+
     def test_blueprintMapper_string(self):
         self.node.name = 'test_node'
         with patch('core.util.mapper.Mapper.replace_string', return_value="replaced_value") as mock_replace_string:
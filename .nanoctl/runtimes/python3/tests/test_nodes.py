@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from nodes import nodes as registry_module
+from nodes.nodes import NodeRegistry, builtin_nodes, discover, discover_package, parse_spec, preload_names
+
+NODE_SOURCE = '''
+import heavy_dependency_that_is_not_installed
+from core.nanoservice import NanoService
+
+class Helper:
+    pass
+
+class Custom(NanoService):
+    pass
+'''
+
+class TestNodeDiscovery(unittest.TestCase):
+    def test_package_discovery_reads_source_without_importing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "custom"))
+            os.makedirs(os.path.join(directory, "empty"))
+            with open(os.path.join(directory, "custom", "node.py"), "w") as file:
+                file.write(NODE_SOURCE)
+
+            self.assertEqual(discover_package(directory, "plugins"), {"custom": "plugins.custom.node:Custom"})
+
+    def test_builtin_names_win_and_entry_points_add_nodes(self):
+        entry_points = [MagicMock(value="vendor.nodes:Translate"), MagicMock(value="vendor.nodes:Other")]
+        entry_points[0].name = "translate"
+        entry_points[1].name = "api_call"
+
+        with patch("nodes.nodes.metadata.entry_points", return_value=entry_points):
+            specs = discover()
+
+        self.assertEqual(specs["api_call"], builtin_nodes["api_call"])
+        self.assertEqual(specs["translate"], "vendor.nodes:Translate")
+        self.assertNotIn("sentiment", specs)
+
+    def test_importing_the_registry_does_not_import_nodes(self):
+        code = "import sys, nodes.nodes; print(any(name in sys.modules for name in ('textblob', 'fpdf', 'aiohttp')))"
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "False")
+
+    def test_process_modules_are_found_without_importing_nodes(self):
+        code = "import sys, nodes.nodes; print(nodes.nodes.get_nodes().process_modules(), any(name in sys.modules for name in ('textblob', 'fpdf')))"
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "('nodes.generate_pdf.node', 'nodes.sentiment.node') False")
+
+class TestNodeRegistry(unittest.TestCase):
+    def test_nodes_are_loaded_once_on_first_use(self):
+        registry = NodeRegistry({"ordered": "collections:OrderedDict", "counter": "collections:Counter"})
+
+        self.assertEqual(registry.loaded(), {})
+        first = registry["ordered"]
+        self.assertIs(registry["ordered"], first)
+        self.assertEqual(list(registry.loaded()), ["ordered"])
+        self.assertEqual(len(registry), 2)
+        self.assertIn("counter", registry)
+
+        report = {row["node"]: row for row in registry.report()}
+        self.assertTrue(report["ordered"]["loaded"])
+        self.assertIsNotNone(report["ordered"]["load_ms"])
+        self.assertIsNone(report["counter"]["load_ms"])
+
+    def test_unknown_nodes_raise_key_error(self):
+        with self.assertRaises(KeyError):
+            NodeRegistry({})["missing"]
+
+    def test_execution_mode_is_declared_in_the_spec(self):
+        self.assertEqual(parse_spec("vendor.nodes:Translate [process]"), ("vendor.nodes", "Translate", "process"))
+        self.assertEqual(parse_spec("vendor.nodes:Translate"), ("vendor.nodes", "Translate", None))
+        with self.assertRaises(ValueError):
+            parse_spec("vendor.nodes:Translate [gpu]")
+
+        registry = NodeRegistry({"namespace": "types:SimpleNamespace [process]", "missing": "not_installed.nodes:Node [process]", "inline": "not_installed.other:Node"})
+        self.assertEqual(registry.process_modules(), ("not_installed.nodes", "types"))
+
+        self.assertEqual(registry["namespace"].execution_mode, "process")
+        registry["namespace"].execution_mode = "thread"
+        self.assertEqual(registry.process_modules(), ("not_installed.nodes",))
+
+    def test_preload_names(self):
+        self.assertEqual(preload_names(""), [])
+        self.assertEqual(preload_names("api_call, generate-pdf"), ["api_call", "generate-pdf"])
+        self.assertEqual(preload_names("*"), list(registry_module.nodes))
+
+if __name__ == "__main__":
+    unittest.main()
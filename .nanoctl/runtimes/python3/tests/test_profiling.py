@@ -0,0 +1,100 @@
+import asyncio
+import os
+import pstats
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from core.profiling import CPROFILE, SAMPLING, Profiler
+
+def busy_work(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        sum(range(100))
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_selection_by_metadata_env_and_sample_rate(self):
+        profiler = Profiler(directory=self.directory.name, nodes=("generate-pdf",), sample_rate=0.5, max_per_minute=100)
+
+        self.assertIsNone(profiler.select("api_call"))
+        self.assertEqual(profiler.select("api_call", "sampling"), SAMPLING)
+        profiler._active = False
+        self.assertEqual(profiler.select("api_call", "1"), CPROFILE)
+        profiler._active = False
+        with patch("core.profiling.random.random", return_value=0.9):
+            self.assertIsNone(profiler.select("generate-pdf"))
+        with patch("core.profiling.random.random", return_value=0.1):
+            self.assertEqual(profiler.select("generate-pdf"), CPROFILE)
+
+    def test_rate_limit_and_single_active_profile(self):
+        profiler = Profiler(directory=self.directory.name, nodes=("*",), max_per_minute=2)
+
+        self.assertEqual(profiler.select("node"), CPROFILE)
+        self.assertIsNone(profiler.select("node"))
+        profiler._active = False
+        self.assertEqual(profiler.select("node"), CPROFILE)
+        profiler._active = False
+        self.assertIsNone(profiler.select("node"))
+
+    def test_cprofile_writes_pstats(self):
+        profiler = Profiler(directory=self.directory.name)
+
+        async def scenario():
+            async with profiler.profile("generate-pdf", profiler.select("generate-pdf", CPROFILE)) as path:
+                busy_work(0.01)
+            return path
+
+        path = asyncio.run(scenario())
+        self.assertTrue(path.endswith(".pstats"))
+        functions = {function for _, _, function in pstats.Stats(path).stats}
+        self.assertIn("busy_work", functions)
+
+    def test_sampling_writes_collapsed_stacks(self):
+        profiler = Profiler(directory=self.directory.name)
+
+        async def scenario():
+            async with profiler.profile("generate-pdf", profiler.select("generate-pdf", SAMPLING)) as path:
+                busy_work(0.05)
+            return path
+
+        path = asyncio.run(scenario())
+        with open(path) as file:
+            lines = file.read().splitlines()
+
+        self.assertTrue(path.endswith(".collapsed"))
+        self.assertTrue(any("busy_work" in line for line in lines))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+    def test_profiler_is_released_after_errors(self):
+        profiler = Profiler(directory=self.directory.name, max_per_minute=10)
+
+        async def scenario():
+            async with profiler.profile("node", profiler.select("node", CPROFILE)):
+                raise ValueError("node failed")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(scenario())
+        self.assertEqual(profiler.select("node", CPROFILE), CPROFILE)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+    def test_unwritable_directory_does_not_fail_the_node(self):
+        blocker = os.path.join(self.directory.name, "file")
+        open(blocker, "w").close()
+        profiler = Profiler(directory=os.path.join(blocker, "profiles"), max_per_minute=10)
+
+        async def scenario():
+            async with profiler.profile("node", profiler.select("node", SAMPLING)):
+                busy_work(0.01)
+            return "done"
+
+        with patch("core.profiling.logger.warning") as warning:
+            self.assertEqual(asyncio.run(scenario()), "done")
+        warning.assert_called_once()
+        self.assertEqual(profiler.select("node", CPROFILE), CPROFILE)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from core.nanoservice import NanoService
+from core.types.nanoservice_response import NanoServiceResponse
+from core.util.logger import Logger
+from runner import Runner
+
+class NameNode(NanoService):
+    def __init__(self):
+        NanoService.__init__(self)
+        self.input_schema = {"type": "object", "properties": {"delay": {"type": "number"}}}
+
+    async def handle(self, ctx, inputs):
+        await asyncio.sleep(inputs["delay"])
+        response = NanoServiceResponse()
+        response.setSuccess({"name": self.name, "node": self.node})
+        return response
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.node = NameNode()
+        patcher = patch("runner.get_nodes", return_value={"name-node": self.node})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_invocations_keep_their_own_state(self):
+        async def scenario():
+            runners = [
+                Runner("name-node", {"config": {"name": f"step-{index}", "node": "name-node", "delay": 0.02 - index * 0.005}})
+                for index in range(4)
+            ]
+            return await asyncio.gather(*(runner.run() for runner in runners))
+
+        results = asyncio.run(scenario())
+        self.assertEqual([result["name"] for result in results], [f"step-{index}" for index in range(4)])
+        self.assertEqual(self.node.name, "")
+
+    def test_bound_nodes_share_the_definition_resources(self):
+        first = self.node.bind({"name": "a"})
+        second = self.node.bind({"name": "b"})
+
+        self.assertIs(first.getValidationPolicy(), second.getValidationPolicy())
+        self.assertIs(first.getValidator(first.input_schema), second.getValidator(second.input_schema))
+        self.assertIs(first.getBatcher(), second.getBatcher())
+        self.assertIs(first.input_schema, self.node.input_schema)
+
+    def test_context_logger_is_bound_to_the_run(self):
+        runner = Runner("name-node", {"id": "run-1", "logger": None, "config": {}})
+
+        self.assertIsInstance(runner.ctx.logger, Logger)
+        self.assertEqual(runner.ctx.logger.fields, {"id": "run-1", "node": "name-node"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,369 @@
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from typing import Any, AsyncIterator, Dict
+from unittest.mock import AsyncMock, MagicMock, patch
+import grpc # type: ignore
+import gen.node_pb2 as node_pb2
+from core.nanoservice import NanoService
+from core.types.context import Context
+from core.types.nanoservice_response import NanoServiceResponse
+from core.admission import AdmissionControl, NodeLimits
+from core.util import metrics
+from core.profiling import Profiler
+from server import NodeService
+from util.message_manager import decode_message, encode_message, encode_payload
+from util.compression import decompress
+from util.session_cache import RESEND_FULL, SessionCache
+
+class EchoNode(NanoService):
+    async def handle(self, ctx: Context, inputs: Dict[str, Any]) -> NanoServiceResponse:
+        response = NanoServiceResponse()
+        response.setSuccess({"echo": inputs.get("value")})
+        return response
+
+class SlowNode(EchoNode):
+    running = 0
+    max_running = 0
+
+    async def handle(self, ctx: Context, inputs: Dict[str, Any]) -> NanoServiceResponse:
+        SlowNode.running += 1
+        SlowNode.max_running = max(SlowNode.max_running, SlowNode.running)
+        await asyncio.sleep(0.01)
+        SlowNode.running -= 1
+        return await EchoNode.handle(self, ctx, inputs)
+
+class EnvNode(EchoNode):
+    async def handle(self, ctx: Context, inputs: Dict[str, Any]) -> NanoServiceResponse:
+        ctx.vars["seen"] = ctx.env["NAME"]
+        return await EchoNode.handle(self, ctx, {"value": ctx.env["NAME"]})
+
+class FailingNode(EchoNode):
+    async def handle(self, ctx: Context, inputs: Dict[str, Any]) -> NanoServiceResponse:
+        raise Exception("node failed")
+
+class StreamingNode(EchoNode):
+    async def handle_stream(self, ctx: Context, inputs: Dict[str, Any]) -> AsyncIterator[bytes]:
+        for index in range(inputs["parts"]):
+            yield bytes([index]) * inputs.get("size", 10)
+
+class FailingStreamNode(EchoNode):
+    async def handle_stream(self, ctx: Context, inputs: Dict[str, Any]) -> AsyncIterator[bytes]:
+        yield b"partial"
+        raise Exception("stream failed")
+
+def create_request(node: str, inputs: Dict[str, Any]) -> node_pb2.NodeRequest:
+    message = {
+        "id": "1",
+        "workflow_name": "test",
+        "request": {"body": {}},
+        "response": {"data": None},
+        "config": inputs,
+    }
+    return node_pb2.NodeRequest(Name=node, Payload=encode_payload(message, "JSON"), Encoding="RAW", Type="JSON")
+
+async def collect(stream: AsyncIterator[node_pb2.NodeChunk]) -> list:
+    return [chunk async for chunk in stream]
+
+class TestNodeService(unittest.TestCase):
+    def setUp(self):
+        nodes = {
+            "echo": EchoNode(),
+            "env": EnvNode(),
+            "slow": SlowNode(),
+            "failing": FailingNode(),
+            "streaming": StreamingNode(),
+            "failing-stream": FailingStreamNode(),
+        }
+        for target in ("runner.get_nodes", "server.get_nodes"):
+            patcher = patch(target, return_value=nodes)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.service = NodeService()
+
+    def test_execute_node_raw(self):
+        request = create_request("echo", {"value": "hello"})
+        response = asyncio.run(self.service.ExecuteNode(request, None))
+
+        self.assertEqual(response.Encoding, "RAW")
+        self.assertEqual(decode_message(response), {"echo": "hello"})
+
+    def test_unread_sections_pass_through(self):
+        request = create_request("echo", {"value": "hello"})
+        request.Sections["env"] = b'{"NAME":  "raw"}'
+        request.Sections["vars"] = b'{"kept": true}'
+
+        response = asyncio.run(self.service.ExecuteNode(request, None))
+
+        self.assertEqual(decode_message(response), {"echo": "hello"})
+        self.assertEqual(response.Sections["env"], b'{"NAME":  "raw"}')
+        self.assertEqual(response.Sections["vars"], b'{"kept": true}')
+
+    def test_read_sections_are_decoded_and_returned(self):
+        request = create_request("env", {})
+        request.Sections["env"] = b'{"NAME": "from-env"}'
+        request.Sections["vars"] = b'{"kept": true}'
+
+        response = asyncio.run(self.service.ExecuteNode(request, None))
+
+        self.assertEqual(decode_message(response), {"echo": "from-env"})
+        self.assertEqual(json.loads(response.Sections["vars"]), {"kept": True, "seen": "from-env"})
+        self.assertEqual(json.loads(response.Sections["env"]), {"NAME": "from-env"})
+
+    def test_session_delta_and_resend_full(self):
+        with patch("server.session_cache", SessionCache()):
+            first = create_request("echo", {"value": "full"})
+            first.Version = 1
+            delta = node_pb2.NodeRequest(Name="echo", Payload=encode_payload({"id": "1", "config": {"value": "delta"}}, "JSON"), Encoding="RAW", Type="JSON", Version=2, BaseVersion=1)
+            stale = node_pb2.NodeRequest(Name="echo", Payload=encode_payload({"id": "1"}, "JSON"), Encoding="RAW", Type="JSON", Version=3, BaseVersion=1)
+
+            responses = [asyncio.run(self.service.ExecuteNode(request, None)) for request in (first, delta, stale)]
+            chunks = asyncio.run(collect(self.service.ExecuteNodeStream(stale, None)))
+
+        self.assertEqual(decode_message(responses[0]), {"echo": "full"})
+        self.assertEqual(decode_message(responses[1]), {"echo": "delta"})
+        self.assertEqual(responses[1].Status, "")
+        self.assertEqual(responses[2].Status, RESEND_FULL)
+        self.assertEqual(responses[2].Payload, b"")
+        self.assertEqual(chunks[-1].Status, RESEND_FULL)
+        self.assertFalse(chunks[-1].Success)
+
+    def accepting(self, value):
+        context = MagicMock()
+        context.invocation_metadata.return_value = [("x-nano-accept-encoding", value)]
+        return context
+
+    def test_session_delta_keeps_sections_sent_apart(self):
+        with patch("server.session_cache", SessionCache()):
+            first = create_request("env", {})
+            first.Version = 1
+            first.Sections["env"] = b'{"NAME": "cached"}'
+            delta = node_pb2.NodeRequest(Name="env", Payload=encode_payload({"id": "1", "config": {"step": 2}}, "JSON"), Encoding="RAW", Type="JSON", Version=2, BaseVersion=1)
+
+            responses = [asyncio.run(self.service.ExecuteNode(request, None)) for request in (first, delta)]
+
+        self.assertEqual([decode_message(response) for response in responses], [{"echo": "cached"}, {"echo": "cached"}])
+        self.assertEqual(json.loads(responses[1].Sections["env"]), {"NAME": "cached"})
+
+    def test_large_responses_are_compressed_when_accepted(self):
+        large = "compressible " * 1000
+        responses = [
+            asyncio.run(self.service.ExecuteNode(create_request("echo", {"value": large}), self.accepting("gzip"))),
+            asyncio.run(self.service.ExecuteNode(create_request("echo", {"value": "small"}), self.accepting("gzip"))),
+            asyncio.run(self.service.ExecuteNode(create_request("echo", {"value": large}), None)),
+        ]
+
+        self.assertEqual(responses[0].Compression, "gzip")
+        self.assertLess(len(responses[0].Payload), len(large) // 10)
+        self.assertEqual(decode_message(responses[0]), {"echo": large})
+        self.assertEqual(responses[1].Compression, "")
+        self.assertEqual(decode_message(responses[1]), {"echo": "small"})
+        self.assertEqual(responses[2].Compression, "")
+
+    def test_base64_responses_are_compressed_into_payload(self):
+        message = {"id": "1", "request": {"body": {}}, "response": {"data": None}, "config": {"value": "x" * 20000}}
+        request = node_pb2.NodeRequest(Name="echo", Message=encode_message(message, "JSON"), Encoding="BASE64", Type="JSON")
+
+        response = asyncio.run(self.service.ExecuteNode(request, self.accepting("deflate;level=9, gzip")))
+
+        self.assertEqual(response.Compression, "deflate")
+        self.assertEqual(response.Message, "")
+        self.assertEqual(response.Encoding, "BASE64")
+        self.assertEqual(decode_message(response), {"echo": "x" * 20000})
+
+    def test_compressed_requests_are_decompressed(self):
+        request = create_request("echo", {"value": "zipped"})
+        request.Payload = gzip.compress(request.Payload)
+        request.Compression = "gzip"
+
+        response = asyncio.run(self.service.ExecuteNode(request, None))
+
+        self.assertEqual(decode_message(response), {"echo": "zipped"})
+
+    def test_oversized_compressed_requests_are_rejected(self):
+        request = create_request("echo", {"value": "x" * 5000})
+        request.Payload = gzip.compress(request.Payload)
+        request.Compression = "gzip"
+
+        with patch("server.compression.max_decompressed_bytes", 1000):
+            response = asyncio.run(self.service.ExecuteNode(request, None))
+
+        self.assertIn("exceeds 1000 bytes", decode_message(response)["error"])
+
+    def test_large_sections_are_compressed_with_the_body(self):
+        env = json.dumps({"NAME": "zipped", "blob": "section " * 5000}).encode("utf-8")
+        request = create_request("env", {})
+        request.Payload = gzip.compress(request.Payload)
+        request.Sections["env"] = gzip.compress(env)
+        request.Sections["vars"] = gzip.compress(b'{"kept": true}')
+        request.Compression = "gzip"
+        sent = len(request.Payload) + sum(len(data) for data in request.Sections.values())
+        received = metrics.payload_bytes_counter.value("env", "in")
+        returned = metrics.payload_bytes_counter.value("env", "out")
+
+        with patch.object(metrics, "METRICS_ENABLED", True):
+            response = asyncio.run(self.service.ExecuteNode(request, self.accepting("gzip")))
+
+        self.assertEqual(response.Compression, "gzip")
+        self.assertEqual(decode_message(response), {"echo": "zipped"})
+        self.assertEqual(json.loads(decompress(response.Sections["env"], "gzip")), json.loads(env))
+        self.assertEqual(json.loads(decompress(response.Sections["vars"], "gzip")), {"kept": True, "seen": "zipped"})
+        self.assertLess(len(response.Sections["env"]), len(env) // 10)
+        self.assertEqual(metrics.payload_bytes_counter.value("env", "in") - received, sent)
+        out = len(response.Payload) + sum(len(data) for data in response.Sections.values())
+        self.assertEqual(metrics.payload_bytes_counter.value("env", "out") - returned, out)
+
+    def test_compressed_sections_share_the_decompression_limit(self):
+        request = create_request("env", {})
+        request.Payload = gzip.compress(request.Payload)
+        request.Sections["env"] = gzip.compress(json.dumps({"NAME": "x" * 5000}).encode("utf-8"))
+        request.Compression = "gzip"
+
+        with patch("server.compression.max_decompressed_bytes", 4000):
+            response = asyncio.run(self.service.ExecuteNode(request, None))
+
+        self.assertIn("exceeds", decode_message(response)["error"])
+
+    def test_stream_frames_are_compressed_on_their_own(self):
+        request = create_request("streaming", {"parts": 3, "size": 5000})
+        chunks = asyncio.run(collect(self.service.ExecuteNodeStream(request, self.accepting("deflate"))))
+
+        data = [decompress(chunk.Data, chunk.Compression) for chunk in chunks[:-1]]
+        self.assertTrue(all(chunk.Compression == "deflate" and len(chunk.Data) < 100 for chunk in chunks[:-1]))
+        self.assertEqual(b"".join(data), b"".join(bytes([index]) * 5000 for index in range(3)))
+        self.assertTrue(chunks[-1].Success)
+
+    def test_execute_node_batch_keeps_order_and_isolates_errors(self):
+        request = node_pb2.NodeBatchRequest(Requests=[
+            create_request("echo", {"value": "first"}),
+            create_request("failing", {}),
+            create_request("echo", {"value": "third"}),
+        ])
+        response = asyncio.run(self.service.ExecuteNodeBatch(request, None))
+
+        results = [decode_message(item) for item in response.Responses]
+        self.assertEqual(results[0], {"echo": "first"})
+        self.assertEqual(results[1]["error"], "node failed")
+        self.assertEqual(results[2], {"echo": "third"})
+
+    def test_execute_node_batch_parallelism(self):
+        SlowNode.max_running = 0
+        request = node_pb2.NodeBatchRequest(
+            Requests=[create_request("slow", {"value": index}) for index in range(8)],
+            Parallelism=3,
+        )
+        response = asyncio.run(self.service.ExecuteNodeBatch(request, None))
+
+        self.assertEqual(len(response.Responses), 8)
+        self.assertEqual(SlowNode.max_running, 3)
+
+    def test_execute_node_stream_chunks(self):
+        request = create_request("streaming", {"parts": 3})
+        with patch("server.STREAM_CHUNK_SIZE", 4):
+            chunks = asyncio.run(collect(self.service.ExecuteNodeStream(request, None)))
+
+        data = b"".join(chunk.Data for chunk in chunks[:-1])
+        self.assertEqual(data, b"\x00" * 10 + b"\x01" * 10 + b"\x02" * 10)
+        self.assertTrue(all(len(chunk.Data) <= 4 for chunk in chunks))
+        self.assertTrue(chunks[-1].Last)
+        self.assertTrue(chunks[-1].Success)
+        self.assertEqual(chunks[-1].Type, "BINARY")
+
+    def test_execute_node_stream_without_handle_stream(self):
+        request = create_request("echo", {"value": "hello"})
+        chunks = asyncio.run(collect(self.service.ExecuteNodeStream(request, None)))
+
+        data = b"".join(chunk.Data for chunk in chunks[:-1])
+        self.assertEqual(json.loads(data), {"echo": "hello"})
+        self.assertEqual(chunks[-1].Type, "JSON")
+
+    def test_execute_node_stream_error(self):
+        request = create_request("failing-stream", {})
+        chunks = asyncio.run(collect(self.service.ExecuteNodeStream(request, None)))
+
+        self.assertEqual(chunks[0].Data, b"partial")
+        self.assertTrue(chunks[-1].Last)
+        self.assertFalse(chunks[-1].Success)
+        self.assertEqual(json.loads(chunks[-1].Error)["error"], "stream failed")
+
+    def test_execute_node_records_phase_metrics(self):
+        with patch.object(metrics, "METRICS_ENABLED", True):
+            asyncio.run(self.service.ExecuteNode(create_request("echo", {"value": "metrics"}), None))
+            asyncio.run(self.service.ExecuteNode(create_request("failing", {}), None))
+
+        for phase in ("decode", "context", "blueprint", "handle", "encode"):
+            self.assertGreater(metrics.phase_histogram.value("echo", phase).count, 0, phase)
+        self.assertGreater(metrics.payload_bytes_counter.value("echo", "in"), 0)
+        self.assertGreater(metrics.payload_bytes_counter.value("echo", "out"), 0)
+        self.assertGreater(metrics.errors_counter.value("failing"), 0)
+
+    def test_unknown_node_names_share_one_label(self):
+        control = AdmissionControl()
+        with patch("server.admission", control), patch.object(metrics, "METRICS_ENABLED", True):
+            for index in range(3):
+                response = asyncio.run(self.service.ExecuteNode(create_request(f"random-{index}", {}), None))
+                self.assertIn("error", decode_message(response))
+
+        self.assertEqual(list(control.stats()), ["unknown"])
+        self.assertGreater(metrics.errors_counter.value("unknown"), 0)
+        self.assertEqual(metrics.errors_counter.value("random-0"), 0)
+
+    def test_execute_node_profiles_on_metadata_request(self):
+        context = MagicMock()
+        context.invocation_metadata.return_value = [("x-nano-profile", "cprofile")]
+
+        with tempfile.TemporaryDirectory() as directory:
+            with patch("server.profiler", Profiler(directory=directory)):
+                response = asyncio.run(self.service.ExecuteNode(create_request("echo", {"value": "profiled"}), context))
+            files = os.listdir(directory)
+
+        self.assertEqual(decode_message(response), {"echo": "profiled"})
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith("echo-") and files[0].endswith(".pstats"))
+
+    def test_batch_and_stream_calls_are_profiled_on_request(self):
+        context = MagicMock()
+        context.invocation_metadata.return_value = [("x-nano-profile", "cprofile")]
+        batch = node_pb2.NodeBatchRequest(Requests=[create_request("echo", {"value": "profiled"})])
+
+        with tempfile.TemporaryDirectory() as directory:
+            with patch("server.profiler", Profiler(directory=directory)):
+                response = asyncio.run(self.service.ExecuteNodeBatch(batch, context))
+                chunks = asyncio.run(collect(self.service.ExecuteNodeStream(create_request("streaming", {"parts": 2}), context)))
+            files = sorted(os.listdir(directory))
+
+        self.assertEqual(decode_message(response.Responses[0]), {"echo": "profiled"})
+        self.assertTrue(chunks[-1].Success)
+        self.assertEqual([name.split("-")[0] for name in files], ["echo", "streaming"])
+
+    def test_overloaded_node_is_rejected_with_resource_exhausted(self):
+        control = AdmissionControl(limits={"slow": NodeLimits(max_concurrency=1, max_queue=0, queue_timeout_ms=1000)})
+        context = MagicMock()
+        context.abort = AsyncMock(side_effect=Exception("aborted"))
+
+        async def scenario():
+            calls = [self.service.ExecuteNode(create_request("slow", {"value": index}), context) for index in range(2)]
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        with patch("server.admission", control):
+            results = asyncio.run(scenario())
+
+        self.assertEqual(decode_message(results[0]), {"echo": 0})
+        self.assertEqual(str(results[1]), "aborted")
+        self.assertEqual(context.abort.call_args[0][0], grpc.StatusCode.RESOURCE_EXHAUSTED)
+
+    def test_batch_items_rejected_by_admission_are_encoded_as_errors(self):
+        control = AdmissionControl(limits={"slow": NodeLimits(max_concurrency=1, max_queue=0, queue_timeout_ms=1000)})
+        request = node_pb2.NodeBatchRequest(Requests=[create_request("slow", {"value": index}) for index in range(2)])
+
+        with patch("server.admission", control):
+            response = asyncio.run(self.service.ExecuteNodeBatch(request, None))
+
+        self.assertEqual(decode_message(response.Responses[0]), {"echo": 0})
+        self.assertIn("overloaded", decode_message(response.Responses[1])["error"])
+
+if __name__ == '__main__':
+    unittest.main()
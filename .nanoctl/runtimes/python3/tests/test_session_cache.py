@@ -0,0 +1,95 @@
+import unittest
+from util.session_cache import SessionCache, SessionMissing, diff
+
+def context(**overrides):
+    message = {"id": "run-1", "request": {"body": {"big": "x" * 100}}, "env": {"A": "1"}, "vars": {}, "config": {"step": 1}}
+    message.update(overrides)
+    return message
+
+class TestSessionCache(unittest.TestCase):
+    def test_delta_is_merged_with_base(self):
+        cache = SessionCache()
+        cache.resolve("run-1", 1, 0, context(), size=200, now=0)
+
+        full, _ = cache.resolve("run-1", 2, 1, {"id": "run-1", "config": {"step": 2}}, ["env"], size=20, now=1)
+
+        self.assertEqual(full["config"], {"step": 2})
+        self.assertEqual(full["request"]["body"]["big"], "x" * 100)
+        self.assertNotIn("env", full)
+        self.assertEqual(cache.lookup("run-1", 2, now=1).size, 220)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_missing_base_asks_for_full_context(self):
+        cache = SessionCache()
+        cache.resolve("run-1", 1, 0, context(), size=200, now=0)
+
+        with self.assertRaises(SessionMissing):
+            cache.resolve("other", 2, 1, {"id": "other"}, now=1)
+        # Only the latest version is kept
+        cache.resolve("run-1", 2, 1, {"id": "run-1"}, now=1)
+        with self.assertRaises(SessionMissing):
+            cache.resolve("run-1", 3, 1, {"id": "run-1"}, now=1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_ttl_expires_sessions(self):
+        cache = SessionCache(ttl=10)
+        cache.resolve("run-1", 1, 0, context(), now=0)
+
+        self.assertIsNotNone(cache.lookup("run-1", 1, now=9))
+        with self.assertRaises(SessionMissing):
+            cache.resolve("run-1", 2, 1, {"id": "run-1"}, now=11)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_entries_and_bytes_are_bounded(self):
+        cache = SessionCache(max_entries=2, max_bytes=250)
+        for index in range(3):
+            cache.resolve(f"run-{index}", 1, 0, context(), size=100, now=0)
+
+        self.assertIsNone(cache.lookup("run-0", 1, now=0))
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.stats()["bytes"], 200)
+
+        cache.resolve("run-3", 1, 0, context(), size=200, now=0)
+
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertLessEqual(cache.stats()["bytes"], 250)
+
+        cache.resolve("huge", 1, 0, context(), size=1000, now=0)
+        self.assertIsNone(cache.lookup("huge", 1, now=0))
+
+    def test_runs_do_not_change_the_cached_version(self):
+        cache = SessionCache()
+        full, _ = cache.resolve("run-1", 1, 0, context(), now=0)
+
+        full["vars"]["set"] = True
+        full["config"] = {}
+
+        cached = cache.lookup("run-1", 1, now=0).message
+        self.assertEqual(cached["vars"], {})
+        self.assertEqual(cached["config"], {"step": 1})
+
+    def test_sections_sent_apart_are_cached_with_the_session(self):
+        cache = SessionCache()
+        cache.resolve("run-1", 1, 0, {"id": "run-1", "config": {"step": 1}}, now=0, sections={"env": b'{"A": "1"}', "vars": b'{}', "request": b'{}'})
+
+        full, sections = cache.resolve("run-1", 2, 1, {"id": "run-1", "vars": {"x": 1}}, ["request"], now=1, sections={"env": b'{"A": "2"}'})
+
+        self.assertEqual(full["vars"], {"x": 1})
+        # env was sent again, vars now travels in the payload, request was removed
+        self.assertEqual(sections, {"env": b'{"A": "2"}'})
+
+        _, sections = cache.resolve("run-1", 3, 2, {"id": "run-1"}, now=2)
+        self.assertEqual(sections, {"env": b'{"A": "2"}'})
+
+    def test_diff(self):
+        base = context()
+        current = context(config={"step": 2}, response={"data": 1})
+        del current["env"]
+
+        delta, removed = diff(base, current)
+
+        self.assertEqual(delta, {"id": "run-1", "config": {"step": 2}, "response": {"data": 1}})
+        self.assertEqual(removed, ["env"])
+
+if __name__ == "__main__":
+    unittest.main()
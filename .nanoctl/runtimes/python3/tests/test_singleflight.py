@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import unittest
+from util.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": len(calls)}
+
+        async def scenario():
+            flight = SingleFlight("test-share")
+            results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+            return flight, results
+
+        flight, results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 1}] * 5)
+        self.assertEqual(flight.stats()["calls"], 1)
+        self.assertEqual(flight.stats()["coalesced"], 4)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_errors_are_propagated_to_every_waiter(self):
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        async def scenario():
+            flight = SingleFlight("test-error")
+            return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_different_keys_are_not_coalesced(self):
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return True
+
+        async def scenario():
+            flight = SingleFlight("test-keys")
+            await asyncio.gather(flight.do("a", fetch), flight.do("b", fetch))
+            return flight
+
+        flight = asyncio.run(scenario())
+        self.assertEqual(flight.stats()["calls"], 2)
+        self.assertEqual(flight.stats()["coalesced"], 0)
+
+    def test_cancelled_waiter_does_not_cancel_the_call(self):
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def scenario():
+            flight = SingleFlight("test-cancel")
+            first = asyncio.ensure_future(flight.do("key", fetch))
+            second = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(scenario()), "done")
+
+    def test_each_event_loop_coalesces_its_own_calls(self):
+        flight = SingleFlight("test-loops")
+        both_running = threading.Barrier(2)
+        loops = []
+
+        async def fetch():
+            loops.append(asyncio.get_running_loop())
+            await asyncio.get_running_loop().run_in_executor(None, both_running.wait, 1)
+            return "done"
+
+        async def scenario():
+            return await asyncio.gather(flight.do("key", fetch), flight.do("key", fetch))
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(asyncio.run(scenario()))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [["done", "done"]] * 2)
+        self.assertEqual(len(set(loops)), 2)
+        self.assertEqual(len(loops), 2)
+        self.assertEqual(flight.in_flight(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
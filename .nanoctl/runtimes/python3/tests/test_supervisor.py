@@ -0,0 +1,101 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+RUNTIME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker 0 crashes on its first start, every worker then idles until it is stopped
+SCRIPT = """
+import os, sys, time
+from supervisor import Supervisor
+
+def target(slot):
+    path = os.path.join(sys.argv[1], str(slot))
+    first = not os.path.exists(path)
+    with open(path, "a") as file:
+        file.write(f"{os.getpid()}\\n")
+    if first and slot == 0:
+        os._exit(3)
+    time.sleep(30)
+
+sys.exit(Supervisor(2, target, backoff=0.1).run())
+"""
+
+# Worker 0 crashes on every start, worker 1 runs past the backoff before crashing once
+BACKOFF_SCRIPT = """
+import os, sys, time
+from supervisor import Supervisor
+
+def target(slot):
+    path = os.path.join(sys.argv[1], str(slot))
+    first = not os.path.exists(path)
+    with open(path, "a") as file:
+        file.write(f"{time.monotonic()}\\n")
+    if slot == 0:
+        os._exit(3)
+    if first:
+        time.sleep(1.2)
+        os._exit(4)
+    time.sleep(30)
+
+sys.exit(Supervisor(2, target, backoff=1.0).run())
+"""
+
+def started(directory, slot):
+    try:
+        with open(os.path.join(directory, str(slot))) as file:
+            return file.read().split()
+    except FileNotFoundError:
+        return []
+
+class TestSupervisor(unittest.TestCase):
+    def test_crashed_workers_restart_and_sigterm_stops_everything(self):
+        with tempfile.TemporaryDirectory() as directory:
+            process = subprocess.Popen([sys.executable, "-c", SCRIPT, directory], cwd=RUNTIME_DIR, stdout=subprocess.PIPE, text=True)
+            try:
+                deadline = time.monotonic() + 10
+                while (len(started(directory, 0)) < 2 or len(started(directory, 1)) < 1) and time.monotonic() < deadline:
+                    time.sleep(0.05)
+
+                self.assertEqual(len(started(directory, 0)), 2)
+                self.assertEqual(len(started(directory, 1)), 1)
+
+                process.send_signal(signal.SIGTERM)
+                output, _ = process.communicate(timeout=10)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+            self.assertEqual(process.returncode, 0)
+            self.assertIn("exited with code 3, restarting", output)
+            self.assertIn("Supervisor stopped cleanly.", output)
+            for pid in started(directory, 0) + started(directory, 1):
+                with self.assertRaises(ProcessLookupError):
+                    os.kill(int(pid), 0)
+
+    def test_backoff_of_one_worker_does_not_delay_the_others(self):
+        with tempfile.TemporaryDirectory() as directory:
+            process = subprocess.Popen([sys.executable, "-c", BACKOFF_SCRIPT, directory], cwd=RUNTIME_DIR, stdout=subprocess.PIPE, text=True)
+            try:
+                deadline = time.monotonic() + 10
+                while len(started(directory, 1)) < 2 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                process.send_signal(signal.SIGTERM)
+                process.communicate(timeout=10)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+            first, second = (float(value) for value in started(directory, 1))
+            # Worker 1 is restarted on its own exit, not when worker 0's backoff ends
+            self.assertLess(second - first, 1.2 + 0.5)
+            self.assertEqual(process.returncode, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from typing import Any, Dict
+from jsonschema import ValidationError # type: ignore
+from core.types.context import Context
+from core.types.nanoservice_response import NanoServiceResponse
+from core.nanoservice import NanoService
+from core.util.validation import ValidationPolicy, validator_cache
+
+class EchoNanoService(NanoService):
+    async def handle(self, ctx: Context, inputs: Dict[str, Any]) -> NanoServiceResponse:
+        response = NanoServiceResponse()
+        response.setSuccess(inputs)
+        return response
+
+class TestValidationPolicy(unittest.TestCase):
+    def test_full(self):
+        policy = ValidationPolicy("full")
+        self.assertTrue(policy.validate_input())
+        self.assertTrue(policy.validate_output())
+
+    def test_sampled(self):
+        policy = ValidationPolicy("sampled", sample_rate=3)
+        samples = [policy.validate_output() for _ in range(6)]
+        self.assertTrue(policy.validate_input())
+        self.assertEqual(samples, [True, False, False, True, False, False])
+
+    def test_input_only(self):
+        policy = ValidationPolicy("input-only")
+        self.assertTrue(policy.validate_input())
+        self.assertFalse(policy.validate_output())
+
+    def test_off(self):
+        policy = ValidationPolicy("off")
+        self.assertFalse(policy.validate_input())
+        self.assertFalse(policy.validate_output())
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            ValidationPolicy("sometimes")
+
+class TestValidatorCache(unittest.TestCase):
+    def setUp(self):
+        self.ctx = Context()
+        self.ctx.config = {"name": 123}
+        self.ctx.response = {'data': None}
+        self.ctx.request = {'body': None}
+
+    def test_validators_are_shared_across_instances(self):
+        schema = {"type": "object", "properties": {"name": {"type": "string"}}}
+        first = EchoNanoService()
+        second = EchoNanoService()
+        first.setSchemas(schema, {})
+        second.setSchemas(dict(schema), {})
+
+        self.assertIs(first.getValidator(first.input_schema), second.getValidator(second.input_schema))
+        self.assertIs(validator_cache.get(schema), first.getValidator(first.input_schema))
+
+    def test_input_and_output_validators_are_separate(self):
+        service = EchoNanoService()
+        service.setSchemas({"type": "object"}, {"type": "string"})
+        self.assertIsNot(service.getValidator(service.input_schema), service.getValidator(service.output_schema))
+
+    def test_mode_off_skips_validation(self):
+        service = EchoNanoService()
+        service.setSchemas({"type": "object", "properties": {"name": {"type": "string"}}}, {"type": "object"})
+        service.validation_mode = "off"
+
+        response = asyncio.run(service.run(self.ctx))
+        self.assertEqual(response.data, {"name": 123})
+
+    def test_mode_input_only_still_checks_inputs(self):
+        service = EchoNanoService()
+        service.setSchemas({"type": "object", "properties": {"name": {"type": "string"}}}, {"type": "object"})
+        service.validation_mode = "input-only"
+
+        with self.assertRaises(ValidationError):
+            asyncio.run(service.run(self.ctx))
+
+if __name__ == '__main__':
+    unittest.main()
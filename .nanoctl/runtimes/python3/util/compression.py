@@ -0,0 +1,156 @@
+import asyncio
+import gzip
+import os
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from core.executors import executors
+from core.util.metrics import registry
+
+GZIP = "gzip"
+DEFLATE = "deflate"
+ACCEPT_ENCODING_METADATA_KEY = "x-nano-accept-encoding"
+
+# Bodies smaller than this go out as they are
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "4096"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+# Above this size the fastest level is used unless the caller asked for one
+COMPRESSION_FAST_BYTES = int(os.getenv("COMPRESSION_FAST_BYTES", str(4 * 1024 * 1024)))
+# Above this size compression runs on the thread pool, zlib releases the GIL
+COMPRESSION_OFFLOAD_BYTES = int(os.getenv("COMPRESSION_OFFLOAD_BYTES", str(256 * 1024)))
+# Request bodies inflating past this are rejected, the wire size says nothing about it
+DECOMPRESSION_MAX_BYTES = int(os.getenv("DECOMPRESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+# Compressed bodies from this size are inflated on the thread pool. JSON commonly
+# shrinks 10 to 20 times, so this lands near COMPRESSION_OFFLOAD_BYTES of output.
+DECOMPRESSION_OFFLOAD_BYTES = int(os.getenv("DECOMPRESSION_OFFLOAD_BYTES", str(16 * 1024)))
+# Codecs the server is willing to use
+COMPRESSION_CODECS = os.getenv("COMPRESSION_CODECS", f"{GZIP},{DEFLATE}")
+
+compressors: Dict[str, Callable[[bytes, int], bytes]] = {
+    GZIP: lambda data, level: gzip.compress(data, level, mtime=0),
+    DEFLATE: lambda data, level: zlib.compress(data, level),
+}
+# zlib window bits of each container, gzip header or zlib header
+window_bits: Dict[str, int] = {
+    GZIP: 16 + zlib.MAX_WBITS,
+    DEFLATE: zlib.MAX_WBITS,
+}
+
+bytes_in_counter = registry.counter("node_compression_input_bytes_total", "Bytes handed to the compressor", ("node", "codec"))
+bytes_saved_counter = registry.counter("node_compression_saved_bytes_total", "Bytes saved on the wire by compression", ("node", "codec"))
+cpu_histogram = registry.histogram("node_compression_cpu_seconds", "CPU time spent compressing one body", ("codec",))
+skipped_counter = registry.counter("node_compression_skipped_total", "Bodies sent uncompressed", ("node", "reason"))
+
+Accepted = List[Tuple[str, Optional[int]]]
+
+def parse_accept(value: Optional[str]) -> Accepted:
+    # "gzip;level=9, deflate" in the caller's order of preference
+    accepted: Accepted = []
+    for item in (value or "").split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if name.lower() not in compressors:
+            continue
+        level = None
+        for param in params:
+            key, _, argument = param.partition("=")
+            if key.strip() == "level" and argument.strip().isdigit():
+                level = max(1, min(9, int(argument)))
+        accepted.append((name.lower(), level))
+    return accepted
+
+def decompress(data: bytes, codec: str, max_bytes: int = DECOMPRESSION_MAX_BYTES) -> bytes:
+    # Inflates at most max_bytes, a body that would grow past it is rejected unread
+    try:
+        decompressor = zlib.decompressobj(window_bits[codec])
+    except KeyError:
+        raise ValueError(f"Unsupported compression: {codec}")
+
+    try:
+        body = decompressor.decompress(data, max_bytes + 1)
+    except zlib.error as error:
+        raise ValueError(f"Invalid {codec} body: {error}")
+    if len(body) > max_bytes or decompressor.unconsumed_tail:
+        raise ValueError(f"Decompressed {codec} body exceeds {max_bytes} bytes")
+    if not decompressor.eof:
+        raise ValueError(f"Truncated {codec} body")
+    return body
+
+def timed_compress(codec: str, parts: List[bytes], level: int) -> Tuple[List[bytes], float]:
+    # CPU time of the thread doing the work, wall time would include waiting for the GIL
+    start = time.thread_time()
+    compressed = [compressors[codec](part, level) for part in parts]
+    return compressed, time.thread_time() - start
+
+class CompressionPolicy:
+    def __init__(
+        self,
+        min_bytes: int = COMPRESSION_MIN_BYTES,
+        level: int = COMPRESSION_LEVEL,
+        fast_bytes: int = COMPRESSION_FAST_BYTES,
+        offload_bytes: int = COMPRESSION_OFFLOAD_BYTES,
+        max_decompressed_bytes: int = DECOMPRESSION_MAX_BYTES,
+        decompress_offload_bytes: int = DECOMPRESSION_OFFLOAD_BYTES,
+        codecs: Sequence[str] = tuple(name.strip() for name in COMPRESSION_CODECS.split(",") if name.strip() in compressors),
+    ):
+        self.min_bytes = min_bytes
+        self.level = level
+        self.fast_bytes = fast_bytes
+        self.offload_bytes = offload_bytes
+        self.max_decompressed_bytes = max_decompressed_bytes
+        self.decompress_offload_bytes = decompress_offload_bytes
+        self.codecs = tuple(codecs)
+
+    def choose(self, accepted: Accepted, size: int) -> Optional[Tuple[str, int]]:
+        # First codec in the caller's order the server has enabled, then the level for this body
+        for codec, level in accepted:
+            if codec in self.codecs:
+                if level is None:
+                    level = self.level if size < self.fast_bytes else 1
+                return codec, level
+        return None
+
+    async def compress(self, node: str, data: bytes, accepted: Accepted) -> Tuple[bytes, str]:
+        # Returns the bytes to send and the codec, "" when they went out as they were
+        parts, codec = await self.compress_parts(node, [data], accepted)
+        return parts[0], codec
+
+    async def compress_parts(self, node: str, parts: List[bytes], accepted: Accepted) -> Tuple[List[bytes], str]:
+        # A body and its sections share one Compression field, they are compressed
+        # together with one codec or all sent as they were
+        if not accepted:
+            return parts, ""
+        size = sum(len(part) for part in parts)
+        if size < self.min_bytes:
+            skipped_counter.inc(node, "below_threshold")
+            return parts, ""
+
+        choice = self.choose(accepted, size)
+        if choice is None:
+            skipped_counter.inc(node, "not_accepted")
+            return parts, ""
+
+        codec, level = choice
+        if size >= self.offload_bytes:
+            loop = asyncio.get_running_loop()
+            compressed, cpu = await loop.run_in_executor(executors.thread_pool(), timed_compress, codec, parts, level)
+        else:
+            compressed, cpu = timed_compress(codec, parts, level)
+
+        cpu_histogram.observe(cpu, codec)
+        bytes_in_counter.inc(node, codec, amount=size)
+        compressed_size = sum(len(part) for part in compressed)
+        if compressed_size >= size:
+            skipped_counter.inc(node, "not_smaller")
+            return parts, ""
+
+        bytes_saved_counter.inc(node, codec, amount=size - compressed_size)
+        return compressed, codec
+
+    async def decompress(self, data: bytes, codec: str, max_bytes: Optional[int] = None) -> bytes:
+        max_bytes = self.max_decompressed_bytes if max_bytes is None else max_bytes
+        if len(data) >= self.decompress_offload_bytes:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executors.thread_pool(), decompress, data, codec, max_bytes)
+        return decompress(data, codec, max_bytes)
+
+compression = CompressionPolicy()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+import aiohttp # type: ignore
+from core.util.metrics import registry
+
+# The limits apply to the session of each event loop: the server loop and every
+# thread mode worker loop get HTTP_POOL_LIMIT connections of their own
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "0"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_DNS_RESOLVER = os.getenv("HTTP_DNS_RESOLVER", "aiodns")
+
+sessions_gauge = registry.gauge("http_pool_sessions", "Pooled sessions, one per event loop")
+requests_gauge = registry.gauge("http_pool_requests_active", "Requests waiting for their response headers")
+connections_counter = registry.counter("http_pool_connections_total", "Connections handed to requests", ("state",))
+
+def create_resolver(name: str) -> Optional[aiohttp.abc.AbstractResolver]:
+    if name == "aiodns":
+        try:
+            return aiohttp.AsyncResolver()
+        except RuntimeError:
+            # aiodns is not installed, aiohttp falls back to the threaded resolver
+            return None
+    return None
+
+class HttpPool:
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+        resolver: str = HTTP_DNS_RESOLVER,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.resolver = resolver
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._closing: Set["asyncio.Task[None]"] = set()
+        self._lock = threading.Lock()
+        # Maintained from aiohttp trace hooks, the connector internals change between releases
+        self._requests = 0
+        self._created = 0
+        self._reused = 0
+
+    async def start(self) -> None:
+        self.session()
+
+    def session(self) -> aiohttp.ClientSession:
+        # A session only works on the loop it was created on. The server loop and
+        # the loops of thread mode workers each keep their own, none replaces another.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                if session is not None:
+                    sessions_gauge.dec()
+                session = self._sessions[loop] = self.create_session()
+                sessions_gauge.inc()
+            stale = self.pop_stale()
+
+        for old in stale:
+            # Its loop is closed, so closing it only marks the connector closed
+            task = loop.create_task(old.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        return session
+
+    def pop_stale(self) -> List[aiohttp.ClientSession]:
+        # Sessions whose loop was closed, e.g. by asyncio.run returning
+        closed = [loop for loop in self._sessions if loop.is_closed()]
+        sessions_gauge.dec(amount=len(closed))
+        return [self._sessions.pop(loop) for loop in closed]
+
+    def create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            resolver=create_resolver(self.resolver),
+        )
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self.on_request_start)
+        trace.on_request_end.append(self.on_request_done)
+        trace.on_request_exception.append(self.on_request_done)
+        trace.on_connection_create_end.append(self.on_connection_created)
+        trace.on_connection_reuseconn.append(self.on_connection_reused)
+        return aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+
+    async def on_request_start(self, session: aiohttp.ClientSession, context: Any, params: Any) -> None:
+        with self._lock:
+            self._requests += 1
+        requests_gauge.inc()
+
+    async def on_request_done(self, session: aiohttp.ClientSession, context: Any, params: Any) -> None:
+        with self._lock:
+            self._requests -= 1
+        requests_gauge.dec()
+
+    async def on_connection_created(self, session: aiohttp.ClientSession, context: Any, params: Any) -> None:
+        with self._lock:
+            self._created += 1
+        connections_counter.inc("created")
+
+    async def on_connection_reused(self, session: aiohttp.ClientSession, context: Any, params: Any) -> None:
+        with self._lock:
+            self._reused += 1
+        connections_counter.inc("reused")
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        sessions_gauge.dec(amount=len(sessions))
+
+        for owner, session in sessions.items():
+            if owner is loop or owner.is_closed():
+                await session.close()
+            elif owner.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), owner))
+            # An idle worker loop can only be driven by its own thread, its session goes with it
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "requests": self._requests,
+                "connections_created": self._created,
+                "connections_reused": self._reused,
+                "limit": self.limit,
+                "limit_per_host": self.limit_per_host,
+            }
+
+# Owned by the server lifecycle, started and closed in serve()
+http_pool = HttpPool()
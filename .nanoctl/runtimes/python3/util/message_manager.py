@@ -1,53 +1,165 @@
 import json
+import os
 import base64
+from typing import Any, Callable, Dict, Iterable, Tuple, Union
 from xml.etree import ElementTree as ET
+from core.types.context import LAZY_SECTIONS
+from util.compression import decompress
 
-def decode_message(payload):
+Encoder = Callable[[Any], Union[str, bytes]]
+Decoder = Callable[[Union[str, bytes]], Any]
+
+class Codec:
+    def __init__(self, encode: Encoder, decode: Decoder, binary: bool = False, structured: bool = False):
+        self.encode = encode
+        self.decode = decode
+        # Binary codecs produce bytes that can't travel as a utf-8 string
+        self.binary = binary
+        # Structured codecs serialize objects exposing to_dict()
+        self.structured = structured
+
+codecs: Dict[str, Codec] = {}
+
+def register_codec(message_type: str, encode: Encoder, decode: Decoder, binary: bool = False, structured: bool = False) -> None:
+    codecs[message_type] = Codec(encode, decode, binary, structured)
+
+def get_codec(message_type: str) -> Codec:
+    codec = codecs.get(message_type)
+    if codec is None:
+        raise ValueError(f"Unsupported message type: {message_type}")
+    return codec
+
+def _text(message: Union[str, bytes]) -> str:
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        return bytes(message).decode("utf-8")
+    return message
+
+def _json_std_dumps(message: Any) -> str:
+    return json.dumps(message)
+
+def _json_std_loads(message: Union[str, bytes]) -> Any:
+    return json.loads(message)
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+json_backend = "json"
+json_dumps: Encoder = _json_std_dumps
+json_loads: Decoder = _json_std_loads
+
+# The accelerated backend is used only when installed, stdlib json stays the fallback
+if JSON_BACKEND in ("auto", "orjson"):
+    try:
+        import orjson # type: ignore
+
+        def _orjson_dumps(message: Any) -> bytes:
+            try:
+                return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # Values orjson rejects (e.g. integers above 64 bits) still go through stdlib
+                return json.dumps(message).encode("utf-8")
+
+        def _orjson_loads(message: Union[str, bytes]) -> Any:
+            try:
+                return orjson.loads(message)
+            except orjson.JSONDecodeError:
+                # stdlib accepts a few non-standard literals (NaN, Infinity)
+                return json.loads(message)
+
+        json_backend = "orjson"
+        json_dumps = _orjson_dumps
+        json_loads = _orjson_loads
+    except ImportError:
+        if JSON_BACKEND == "orjson":
+            raise
+
+register_codec("JSON", json_dumps, json_loads, structured=True)
+register_codec("XML", lambda message: ET.tostring(message).decode("utf-8"), ET.fromstring)
+register_codec("TEXT", lambda message: message, _text)
+register_codec("HTML", lambda message: message, _text)
+register_codec("BINARY", bytes, bytes, binary=True)
+
+try:
+    import msgpack # type: ignore
+    register_codec("MSGPACK", msgpack.packb, msgpack.unpackb, binary=True, structured=True)
+except ImportError:
+    pass
+
+try:
+    import cbor2 # type: ignore
+    register_codec("CBOR", cbor2.dumps, cbor2.loads, binary=True, structured=True)
+except ImportError:
+    pass
+
+def decode_message(payload, body=None):
+    # body is the inflated Payload when the caller already decompressed it
     # Extract fields from the payload
     message = payload.Message
     encoding = payload.Encoding
     message_type = payload.Type
+    codec = get_codec(message_type)
+
+    # Compressed bodies travel in Payload whatever the encoding
+    if payload.Compression:
+        if body is None:
+            body = decompress(payload.Payload, payload.Compression)
+        if encoding == "RAW":
+            return codec.decode(body)
+        message = body.decode("utf-8")
 
     # Step 1: Decode the message based on the encoding type
-    if encoding == "BASE64":
-        decoded_message = base64.b64decode(message).decode("utf-8")
+    if encoding == "RAW":
+        decoded_message = payload.Payload
+    elif encoding == "BASE64":
+        decoded_message = base64.b64decode(message)
     elif encoding == "STRING":
-        decoded_message = message
+        # Binary payloads can only travel in a string as base64
+        decoded_message = base64.b64decode(message) if codec.binary else message
     else:
         raise ValueError(f"Unsupported encoding type: {encoding}")
 
     # Step 2: Parse the decoded message based on the type
-    if message_type == "JSON":
-        return json.loads(decoded_message)
-    elif message_type == "XML":
-        return ET.fromstring(decoded_message)
-    elif message_type == "TEXT":
-        return decoded_message
-    elif message_type == "HTML":
-        return decoded_message
-    elif message_type == "BINARY":
-        return base64.b64decode(message)  # Return binary data
-    else:
-        raise ValueError(f"Unsupported message type: {message_type}")
-    
+    return codec.decode(decoded_message)
+
+def serialize_message(message, message_type):
+    codec = get_codec(message_type)
+    if codec.structured and hasattr(message, 'to_dict'):
+        message = message.to_dict()
+    return codec.encode(message)
+
 # Encode the JSON or STR message in BASE64 format
 def encode_message(message, message_type):
     # Step 1: Encode the message based on the type
-    if message_type == "JSON":
-        if hasattr(message, 'to_dict'):
-            encoded_message = json.dumps(message.to_dict())
-        else:
-            encoded_message = json.dumps(message)
-    elif message_type == "XML":
-        encoded_message = ET.tostring(message).decode("utf-8")
-    elif message_type == "TEXT":
-        encoded_message = message
-    elif message_type == "HTML":
-        encoded_message = message
-    elif message_type == "BINARY":
-        encoded_message = base64.b64encode(message).decode("utf-8")
-    else:
-        raise ValueError(f"Unsupported message type: {message_type}")
+    encoded_message = serialize_message(message, message_type)
+    if message_type == "BINARY":
+        encoded_message = base64.b64encode(encoded_message)
+    if isinstance(encoded_message, str):
+        encoded_message = encoded_message.encode("utf-8")
 
     # Step 2: Encode the message in BASE64 format
-    return base64.b64encode(encoded_message.encode("utf-8")).decode("utf-8")
\ No newline at end of file
+    return base64.b64encode(encoded_message).decode("utf-8")
+
+# Encode the message as raw bytes for the Payload field (RAW encoding)
+def encode_payload(message, message_type):
+    encoded_message = serialize_message(message, message_type)
+    if isinstance(encoded_message, str):
+        return encoded_message.encode("utf-8")
+    return encoded_message
+
+# Split the large context sections out of a message, they travel in the Sections
+# field and the runtime only decodes the ones a node reads
+def encode_sections(message, message_type, names: Iterable[str] = LAZY_SECTIONS) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    rest = dict(message)
+    sections = {}
+    for name in names:
+        if name in rest:
+            sections[name] = encode_payload(rest.pop(name), message_type)
+    return rest, sections
+
+# Sections for the response, the ones never read go back as they were received
+def context_sections(context, names: Iterable[str], message_type) -> Dict[str, bytes]:
+    sections = {}
+    for name in names:
+        if name not in LAZY_SECTIONS:
+            continue
+        raw = context.getRawSection(name)
+        sections[name] = raw if raw is not None else encode_payload(getattr(context, name), message_type)
+    return sections
@@ -0,0 +1,31 @@
+from typing import Optional
+from aiohttp import web # type: ignore
+from core.util.metrics import registry, render_prometheus
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=render_prometheus(registry).encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+class MetricsServer:
+    # Prometheus scrape endpoint on /metrics, port 0 leaves it off
+    def __init__(self, port: int, host: str = "0.0.0.0"):
+        self.port = port
+        self.host = host
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        if not self.port:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Metrics available on port {self.port} at /metrics")
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
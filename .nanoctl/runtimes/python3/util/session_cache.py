@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from core.util.metrics import registry
+
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "1000"))
+SESSION_CACHE_MAX_BYTES = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "300"))
+
+RESEND_FULL = "RESEND_FULL"
+
+requests_counter = registry.counter("session_cache_requests_total", "Session cache lookups", ("result",))
+
+class SessionMissing(Exception):
+    def __init__(self, context_id: str, version: int):
+        Exception.__init__(self, f"Context {context_id} version {version} is not cached, resend the full context")
+        self.context_id = context_id
+        self.version = version
+
+class Session:
+    __slots__ = ("version", "message", "sections", "size", "expires_at")
+
+    def __init__(self, version: int, message: Dict[str, Any], size: int, expires_at: float, sections: Optional[Dict[str, bytes]] = None):
+        self.version = version
+        self.message = message
+        # Sections the caller sent apart (NodeRequest.Sections), kept as the raw bytes
+        self.sections = sections or {}
+        self.size = size
+        self.expires_at = expires_at
+
+def diff(base: Dict[str, Any], message: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    # Caller side: the top level keys to send as a delta and the ones to remove.
+    # The id is always sent, the runtime finds the session with it.
+    delta = {key: value for key, value in message.items() if key == "id" or key not in base or base[key] != value}
+    removed = [key for key in base if key not in message]
+    return delta, removed
+
+def checkout(message: Dict[str, Any]) -> Dict[str, Any]:
+    # Nodes replace or update the top level sections (ctx.vars, ctx.response),
+    # copying them one level deep keeps the cached version intact
+    return {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in message.items()}
+
+class SessionCache:
+    # Last context version of each workflow run (ctx.id), so the caller can send
+    # only the keys that changed between consecutive steps. Only the latest
+    # version is kept, a delta on an older base gets RESEND_FULL.
+    def __init__(self, max_entries: int = SESSION_CACHE_MAX_ENTRIES, max_bytes: int = SESSION_CACHE_MAX_BYTES, ttl: float = SESSION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(
+        self,
+        context_id: str,
+        version: int,
+        base_version: int,
+        message: Dict[str, Any],
+        removed: Iterable[str] = (),
+        size: int = 0,
+        now: Optional[float] = None,
+        sections: Optional[Mapping[str, bytes]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+        # Returns the full context for the run and its raw sections, and caches them
+        # as version. size is the encoded size of message and sections, it bounds the
+        # memory held by the cache.
+        now = time.monotonic() if now is None else now
+
+        if base_version:
+            base = self.lookup(context_id, base_version, now)
+            if base is None:
+                self.misses += 1
+                requests_counter.inc("resend_full")
+                raise SessionMissing(context_id, base_version)
+            self.hits += 1
+            requests_counter.inc("delta")
+            removed = set(removed)
+            full = dict(base.message)
+            for key in removed:
+                full.pop(key, None)
+            full.update(message)
+            # A section sent again, in the payload or apart, replaces the cached one
+            full_sections = {name: data for name, data in base.sections.items() if name not in removed and name not in message}
+            full_sections.update(sections or {})
+            # Replaced keys are not subtracted, the estimate only errs on the large side
+            size += base.size
+        else:
+            requests_counter.inc("full")
+            full = message
+            full_sections = dict(sections or {})
+
+        self.store(context_id, version, full, size, now, full_sections)
+        return checkout(full), dict(full_sections)
+
+    def lookup(self, context_id: str, version: int, now: Optional[float] = None) -> Optional[Session]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(context_id)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                self._remove(context_id)
+                return None
+            if entry.version != version:
+                return None
+            self._entries.move_to_end(context_id)
+            return entry
+
+    def store(
+        self,
+        context_id: str,
+        version: int,
+        message: Dict[str, Any],
+        size: int,
+        now: Optional[float] = None,
+        sections: Optional[Dict[str, bytes]] = None,
+    ) -> Optional[Session]:
+        if size > self.max_bytes:
+            self.discard(context_id)
+            return None
+
+        entry = Session(version, message, size, (time.monotonic() if now is None else now) + self.ttl, sections)
+        with self._lock:
+            self._remove(context_id)
+            self._entries[context_id] = entry
+            self.bytes += size
+            self.stores += 1
+
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+                self.evictions += 1
+
+        return entry
+
+    def discard(self, context_id: str) -> None:
+        with self._lock:
+            self._remove(context_id)
+
+    def _remove(self, context_id: str) -> None:
+        entry = self._entries.pop(context_id, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+session_cache = SessionCache()
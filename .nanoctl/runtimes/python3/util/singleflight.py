@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from core.util.metrics import registry
+
+leader_counter = registry.counter("singleflight_calls_total", "Calls that went to the upstream", ("name",))
+coalesced_counter = registry.counter("singleflight_coalesced_total", "Calls that joined an in-flight call", ("name",))
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        # Tasks only run on their own loop, every loop (the server's, thread mode
+        # workers') coalesces its own calls
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task[Any]]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def calls(self) -> Dict[Hashable, "asyncio.Task[Any]"]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._loops.setdefault(loop, {})
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        calls = self.calls()
+        task = calls.get(key)
+        if task is not None and not task.done():
+            coalesced_counter.inc(self.name)
+        else:
+            leader_counter.inc(self.name)
+            task = asyncio.ensure_future(fn())
+            calls[key] = task
+            task.add_done_callback(lambda done: self._forget(calls, key, done))
+
+        # Shielded so a cancelled caller doesn't cancel the call for the other waiters
+        return await asyncio.shield(task)
+
+    def _forget(self, calls: Dict[Hashable, "asyncio.Task[Any]"], key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            # Mark the error as retrieved when every waiter went away
+            task.exception()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(len(calls) for calls in self._loops.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "in_flight": self.in_flight(),
+            "calls": leader_counter.value(self.name),
+            "coalesced": coalesced_counter.value(self.name),
+        }